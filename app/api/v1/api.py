@@ -1,8 +1,16 @@
 from fastapi import APIRouter
-from app.api.v1.endpoints import employees, branches, attendance, debug
+from app.core.config import settings
+from app.api.v1.endpoints import employees, branches, attendance, debug, photos, reports
 
 api_router = APIRouter()
+if settings.db_async:
+    # Registered first so the async hot paths take precedence over the sync routes
+    from app.api.v1.endpoints import employees_async, attendance_async
+    api_router.include_router(employees_async.router, prefix="/employees", tags=["employees"])
+    api_router.include_router(attendance_async.router, prefix="/attendance", tags=["attendance"])
 api_router.include_router(employees.router, prefix="/employees", tags=["employees"])
 api_router.include_router(branches.router, prefix="/branches", tags=["branches"])
 api_router.include_router(attendance.router, prefix="/attendance", tags=["attendance"])
+api_router.include_router(reports.router, prefix="/reports", tags=["reports"])
+api_router.include_router(photos.router, prefix="/photos", tags=["photos"])
 api_router.include_router(debug.router, prefix="/debug", tags=["debug"])
@@ -1,96 +1,556 @@
-from fastapi import APIRouter, Depends, HTTPException
-from sqlmodel import Session, select
-from typing import List
-from datetime import datetime
-from app.core.db import get_session
-from app.models.models import Attendance, AttendanceBase, Employee, Branch
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, Response
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import StreamingResponse
+from sqlalchemy import and_, or_
+from sqlalchemy.exc import SQLAlchemyError
+from sqlmodel import Session, SQLModel, select
+from typing import List, Optional
+from datetime import datetime, time, timedelta
+from itertools import islice
+import asyncio
+import base64
+import csv
+import io
+from app.core.archive import RowFilter, attendance_archive
+from app.core.cache import cached_branch, cached_employee, cached_employees
+from app.core.config import settings
+from app.core.db import engine, get_session, insert_ignore
+from app.core.events import attendance_events, sse_frame
+from app.core.geo import GeoIndex, geo_index, is_valid_point
+from app.core.punch_queue import punch_key, punch_queue
+from app.core.reports import punch_day, refresh_daily_summaries
+from app.core.serialization import FastJSONResponse, dumps, rows_to_dicts
+from app.core.timezones import branch_zones, from_local, get_zone, to_utc
+from app.models.models import Attendance, AttendanceBase
 
 router = APIRouter()
 
+MAX_BATCH_SIZE = 5000
+IDEMPOTENCY_KEY = ["employee_id", "timestamp", "type"]
+MAX_PAGE_SIZE = 5000
+# JSON listings are always paged; full dumps are an explicit export (format=csv/ndjson)
+DEFAULT_PAGE_SIZE = 500
+STREAM_CHUNK_SIZE = 1000
+# SSE reconnect delay suggested to browsers
+STREAM_RETRY_MS = 3000
+RESET_FRAME = b"event: reset\ndata: {}\n\n"
+EXPORT_COLUMNS = [
+    "timestamp", "id", "employee_id", "branch_id", "type", "status", "confidence_score", "biometric_verified",
+    "latitude", "longitude",
+]
+
 class AttendanceCreate(AttendanceBase):
     employee_id: int
     branch_id: int
 
-@router.post("/", response_model=Attendance)
+class AttendanceBatchItem(SQLModel):
+    index: int
+    status: str  # created, duplicate, rejected
+    id: Optional[int] = None
+    detail: Optional[str] = None
+
+class AttendanceBatchResponse(SQLModel):
+    created: int = 0
+    duplicates: int = 0
+    rejected: int = 0
+    results: List[AttendanceBatchItem]
+
+class QueuedPunch(SQLModel):
+    key: str
+    status: str  # queued, processing, created, duplicate, rejected, failed
+    attendance_id: Optional[int] = None
+    detail: Optional[str] = None
+
+class AttendanceRead(AttendanceBase):
+    id: int
+    employee_id: int
+    branch_id: int
+
+def localize(attendances, zones: dict) -> List[AttendanceRead]:
+    # Stored in UTC, rendered in each branch's local time (with its offset)
+    default = get_zone()
+    return [
+        AttendanceRead(
+            id=a.id,
+            employee_id=a.employee_id,
+            branch_id=a.branch_id,
+            timestamp=a.timestamp.astimezone(zones.get(a.branch_id, default)),
+            type=a.type,
+            status=a.status,
+            confidence_score=a.confidence_score,
+            biometric_verified=a.biometric_verified,
+            latitude=a.latitude,
+            longitude=a.longitude,
+        )
+        for a in attendances
+    ]
+
+def check_geofence(index: GeoIndex, punch: AttendanceCreate):
+    # Kiosk punches carry no coordinates; branches without a location can't be checked
+    if punch.latitude is None and punch.longitude is None:
+        return
+    if not is_valid_point(punch.latitude, punch.longitude):
+        raise HTTPException(status_code=422, detail="latitude and longitude must both be set and in range")
+    fence = index.fence(punch.branch_id)
+    if fence is None or not settings.geofence_enforce:
+        return
+    if not fence.contains(punch.latitude, punch.longitude):
+        distance = fence.distance_m(punch.latitude, punch.longitude)
+        raise HTTPException(status_code=403, detail=f"Outside branch geofence ({distance:.0f} m away, radius {fence.radius:.0f} m)")
+
+def publish_attendances(attendances: List[AttendanceRead]):
+    # Pushed to live dashboards (GET /attendance/stream) once committed
+    attendance_events.publish((a.id, a.branch_id, a.model_dump(mode="json")) for a in attendances)
+
+def update_daily_summaries(session: Session, keys, schedules: dict = None):
+    # Punches are already committed; a summary failure must not fail the punch.
+    # The next punch of that employee-day recomputes it from scratch.
+    try:
+        refresh_daily_summaries(session, keys, schedules)
+        session.commit()
+    except Exception as e:
+        session.rollback()
+        print(f"Error updating daily summaries: {e}")
+
+@router.post("/", response_model=AttendanceRead)
 def create_attendance(attendance: AttendanceCreate, session: Session = Depends(get_session)):
     # Verify employee and branch exist
     employee_id = attendance.employee_id
     branch_id = attendance.branch_id
     
-    employee = session.get(Employee, employee_id)
+    # Served from the in-process cache, a punch doesn't query either table
+    employee = cached_employee(session, employee_id)
     if not employee:
         raise HTTPException(status_code=404, detail="Employee not found")
     
-    branch = session.get(Branch, branch_id)
+    branch = cached_branch(session, branch_id)
     if not branch:
         raise HTTPException(status_code=404, detail="Branch not found")
 
-    # Check for duplicates (Idempotency)
-    # If the same employee has exact same timestamp and type, it's a sync retry.
-    statement = select(Attendance).where(
-        Attendance.employee_id == employee_id,
-        Attendance.timestamp == attendance.timestamp,
-        Attendance.type == attendance.type
-    )
-    existing = session.exec(statement).first()
-    if existing:
-        # Already exists, just return it (idempotent success)
-        print(f"Duplicate attendance detected/ignored: {employee.first_name} at {attendance.timestamp}")
-        return existing
+    if attendance.latitude is not None or attendance.longitude is not None:
+        check_geofence(geo_index(session), attendance)
+
+    # Idempotency: the unique (employee_id, timestamp, type) index turns a sync
+    # retry into a no-op insert instead of a read-then-write race.
+    values = attendance.dict()
+    values["timestamp"] = to_utc(attendance.timestamp)
+    schedules = {employee_id: employee.work_schedule}
+    zone = get_zone(branch.timezone)
+
+    # The unique index doesn't cover archived months: a replayed punch is matched there
+    key = (employee_id, values["timestamp"], attendance.type)
+    archived = attendance_archive.find([key]) if attendance_archive.covers(key[1]) else {}
+    if key in archived:
+        return localize([archived[key]], {branch_id: zone})[0]
 
     try:
-        # Create DB model from Input model
-        db_attendance = Attendance.from_orm(attendance)
-        
-        # TIMEZONE CORRECTION:
-        # Force conversion to Mexico City Time (CST/CDT)
-        # Server might be UTC, but we want to store naive local time.
-        import pytz
-        from datetime import timezone
-        
-        target_tz = pytz.timezone('America/Mexico_City')
-
-        if db_attendance.timestamp.tzinfo is not None:
-             # Convert aware to target timezone
-             db_attendance.timestamp = db_attendance.timestamp.astimezone(target_tz).replace(tzinfo=None)
-        else:
-             # Naive input. Assume it is UTC (standard for API JSON from Kiosk).
-             # 1. Attach UTC 
-             utc_dt = db_attendance.timestamp.replace(tzinfo=timezone.utc)
-             # 2. Convert to Mexico City
-             local_dt = utc_dt.astimezone(target_tz) 
-             # 3. Strip timezone for naive storage
-             db_attendance.timestamp = local_dt.replace(tzinfo=None)
-
-        # Explicitly set IDs just in case, though from_orm might handle it if fields match
-        db_attendance.employee_id = employee_id
-        db_attendance.branch_id = branch_id
-        
-        session.add(db_attendance)
+        statement = insert_ignore(Attendance, IDEMPOTENCY_KEY).values(**values).returning(Attendance.id)
+        attendance_id = session.execute(statement).scalar()
         session.commit()
-        session.refresh(db_attendance)
-        return db_attendance
     except Exception as e:
+        session.rollback()
         print(f"Error creating attendance: {e}")
         # Return 400 instead of 500
         raise HTTPException(status_code=400, detail=f"Error creating attendance record: {str(e)}")
 
-@router.get("/", response_model=List[Attendance])
+    if attendance_id is None:
+        # Already exists, just return it (idempotent success)
+        print(f"Duplicate attendance detected/ignored: {employee.first_name} at {attendance.timestamp}")
+        statement = select(Attendance).where(
+            Attendance.employee_id == employee_id,
+            Attendance.timestamp == values["timestamp"],
+            Attendance.type == attendance.type
+        )
+        return localize([session.exec(statement).one()], {branch_id: zone})[0]
+
+    # Every column is known already, no need to refresh from the DB
+    created = localize([Attendance(id=attendance_id, **values)], {branch_id: zone})[0]
+    publish_attendances([created])
+    update_daily_summaries(session, [(employee_id, punch_day(values["timestamp"], zone), zone)], schedules)
+    return created
+
+def insert_punches(session: Session, punches: List[AttendanceCreate]) -> List[AttendanceBatchItem]:
+    """
+    Validate, dedupe and insert punches in one transaction; one result per
+    punch. Database errors are raised as is (the queue retries outages).
+    """
+    results: List[Optional[AttendanceBatchItem]] = [None] * len(punches)
+    if not punches:
+        return []
+
+    # Cached lookups; at most one set-based query for the uncached employees
+    employees = cached_employees(session, {p.employee_id for p in punches})
+    zones = branch_zones.get(session)
+    fences = geo_index(session)
+
+    candidates = {}  # (employee_id, timestamp, type) -> first index in the batch
+    repeats = {}  # index -> key of an earlier copy in the same batch
+    for index, punch in enumerate(punches):
+        if punch.employee_id not in employees:
+            results[index] = AttendanceBatchItem(index=index, status="rejected", detail="Employee not found")
+            continue
+        if punch.branch_id not in zones:
+            results[index] = AttendanceBatchItem(index=index, status="rejected", detail="Branch not found")
+            continue
+        try:
+            check_geofence(fences, punch)
+        except HTTPException as e:
+            results[index] = AttendanceBatchItem(index=index, status="rejected", detail=e.detail)
+            continue
+        try:
+            timestamp = to_utc(punch.timestamp)
+        except Exception as e:
+            results[index] = AttendanceBatchItem(index=index, status="rejected", detail=f"Invalid timestamp: {e}")
+            continue
+        key = (punch.employee_id, timestamp, punch.type)
+        if key in candidates:
+            # Same punch replayed twice inside the batch
+            repeats[index] = key
+            continue
+        candidates[key] = index
+
+    # Single pass over existing rows in the batch's time window
+    existing = {}
+    if candidates:
+        timestamps = [key[1] for key in candidates]
+        statement = select(Attendance.id, Attendance.employee_id, Attendance.timestamp, Attendance.type).where(
+            Attendance.employee_id.in_({key[0] for key in candidates}),
+            Attendance.timestamp >= min(timestamps),
+            Attendance.timestamp <= max(timestamps),
+        )
+        for row in session.exec(statement).all():
+            existing[(row.employee_id, row.timestamp, row.type)] = row.id
+        # Punches of archived months are checked against the archive instead of the unique index
+        archived = attendance_archive.find(key for key in candidates if key not in existing)
+        existing.update({key: row.id for key, row in archived.items()})
+
+    new_rows = []
+    for key, index in candidates.items():
+        if key in existing:
+            results[index] = AttendanceBatchItem(index=index, status="duplicate", id=existing[key])
+            continue
+        values = punches[index].dict()
+        values["timestamp"] = key[1]
+        new_rows.append(values)
+
+    try:
+        if new_rows:
+            # Conflicts here mean another request inserted the punch after our select
+            statement = insert_ignore(Attendance, IDEMPOTENCY_KEY).returning(
+                Attendance.id, Attendance.employee_id, Attendance.timestamp, Attendance.type
+            )
+            inserted = {
+                (row.employee_id, row.timestamp, row.type): row.id
+                for row in session.execute(statement, new_rows)
+            }
+            session.commit()
+            for key, index in candidates.items():
+                if results[index] is not None:
+                    continue
+                if key in inserted:
+                    results[index] = AttendanceBatchItem(index=index, status="created", id=inserted[key])
+                else:
+                    results[index] = AttendanceBatchItem(index=index, status="duplicate")
+    except Exception:
+        session.rollback()
+        raise
+
+    created, created_keys = [], []
+    for key, index in candidates.items():
+        if results[index].status == "created":
+            zone = zones[punches[index].branch_id]
+            created_keys.append((key[0], punch_day(key[1], zone), zone))
+            created.append(Attendance(id=results[index].id, **dict(punches[index].dict(), timestamp=key[1])))
+    publish_attendances(localize(created, zones))
+    update_daily_summaries(session, created_keys, {e.id: e.work_schedule for e in employees.values()})
+
+    # Duplicates inside the batch point at the row created (or found) for the first copy
+    for index, key in repeats.items():
+        results[index] = AttendanceBatchItem(index=index, status="duplicate", id=results[candidates[key]].id)
+    return results
+
+@router.post("/batch", response_model=AttendanceBatchResponse)
+def create_attendance_batch(punches: List[AttendanceCreate], session: Session = Depends(get_session)):
+    # Offline-queue flush from a kiosk: validate, dedupe and insert in one round trip
+    if len(punches) > MAX_BATCH_SIZE:
+        raise HTTPException(status_code=413, detail=f"Batch too large (max {MAX_BATCH_SIZE} punches)")
+
+    try:
+        results = insert_punches(session, punches)
+    except SQLAlchemyError as e:
+        print(f"Error creating attendance batch: {e}")
+        raise HTTPException(status_code=400, detail=f"Error creating attendance records: {str(e)}")
+    return AttendanceBatchResponse(
+        created=sum(1 for r in results if r.status == "created"),
+        duplicates=sum(1 for r in results if r.status == "duplicate"),
+        rejected=sum(1 for r in results if r.status == "rejected"),
+        results=results,
+    )
+
+def drain_punch_queue(payloads: List[dict]):
+    # Punch queue handler: the whole claimed batch goes in one transaction
+    punches = [AttendanceCreate.model_validate(payload) for payload in payloads]
+    with Session(engine) as session:
+        results = insert_punches(session, punches)
+    return [(r.status, r.id, r.detail) for r in results]
+
+def require_queue():
+    if not settings.attendance_queue_enabled:
+        raise HTTPException(status_code=503, detail="Punch queue is disabled (ATTENDANCE_QUEUE_ENABLED)")
+
+@router.post("/queue", response_model=QueuedPunch, status_code=202)
+def enqueue_attendance(attendance: AttendanceCreate, request: Request, response: Response, session: Session = Depends(get_session)):
+    # Write-behind ingestion: a local fsync'd append instead of a transaction on
+    # the main database, so latency stays flat when every kiosk punches at once
+    require_queue()
+
+    # Cheap checks now (cached, no query when warm); the worker re-validates
+    if not cached_employee(session, attendance.employee_id):
+        raise HTTPException(status_code=404, detail="Employee not found")
+    if not cached_branch(session, attendance.branch_id):
+        raise HTTPException(status_code=404, detail="Branch not found")
+    if attendance.latitude is not None or attendance.longitude is not None:
+        check_geofence(geo_index(session), attendance)
+
+    key = punch_key(attendance.employee_id, to_utc(attendance.timestamp).isoformat(), attendance.type)
+    entry = punch_queue.enqueue(key, attendance.model_dump(mode="json"))
+    response.headers["Location"] = str(request.url_for("read_queued_attendance", key=key))
+    return QueuedPunch(**entry)
+
+@router.get("/queue/{key}", response_model=QueuedPunch)
+def read_queued_attendance(key: str):
+    require_queue()
+    entry = punch_queue.get(key)
+    if entry is None:
+        raise HTTPException(status_code=404, detail="Unknown punch key (never queued or already purged)")
+    return QueuedPunch(**entry)
+
+def parse_event_id(value: Optional[str]) -> Optional[int]:
+    try:
+        return int(value) if value else None
+    except ValueError:
+        return None
+
+def catch_up_events(branch_id: Optional[int], last_event_id: int, limit: int) -> Optional[List[AttendanceRead]]:
+    """Punches after last_event_id from the database, or None when more than `limit` were missed."""
+    with Session(engine) as session:
+        zones = branch_zones.get(session)
+        query = select(Attendance).where(Attendance.id > last_event_id)
+        if branch_id:
+            query = query.where(Attendance.branch_id == branch_id)
+        rows = session.exec(query.order_by(Attendance.id).limit(limit + 1)).all()
+        if len(rows) > limit:
+            return None
+        return localize(rows, zones)
+
+async def attendance_event_stream(branch_id: Optional[int], last_event_id: Optional[int]):
+    # Subscribed here rather than in the endpoint, so the finally always unsubscribes
+    subscriber, backlog = attendance_events.subscribe(branch_id, last_event_id)
+    try:
+        yield f"retry: {STREAM_RETRY_MS}\n\n".encode()
+        skip = set()
+        if backlog is not None:
+            if backlog:
+                yield b"".join(event.frame for event in backlog)
+        else:
+            # Older than the in-memory history (or issued before a restart): one query
+            missed = await run_in_threadpool(catch_up_events, branch_id, last_event_id, settings.attendance_stream_history)
+            if missed is None:
+                # Too much to replay: the dashboard reloads the list, then follows live
+                yield RESET_FRAME
+            elif missed:
+                # Committed while we were querying, they may come through live as well
+                skip = {a.id for a in missed}
+                yield b"".join(sse_frame(a.id, a.model_dump(mode="json")) for a in missed)
+
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + settings.attendance_stream_max_seconds
+        while (remaining := deadline - loop.time()) > 0:
+            try:
+                event = await asyncio.wait_for(subscriber.queue.get(), min(remaining, settings.attendance_stream_heartbeat_seconds))
+            except asyncio.TimeoutError:
+                yield b": keep-alive\n\n"
+                continue
+            if event is None:
+                # Fell a whole buffer behind: the client reconnects and resumes
+                break
+            # A burst goes out in one write
+            events = [event]
+            while not subscriber.queue.empty():
+                events.append(subscriber.queue.get_nowait())
+            frames = b"".join(e.frame for e in events if e is not None and e.id not in skip)
+            if frames:
+                yield frames
+            if events[-1] is None:
+                break
+    finally:
+        attendance_events.unsubscribe(subscriber)
+
+@router.get("/stream")
+async def stream_attendances_live(request: Request, branch_id: Optional[int] = None, last_event_id: Optional[int] = None):
+    """
+    Server-sent events: one `attendance` event per committed punch (of one
+    branch, or all), shaped like the list endpoint's items. The event id is
+    the attendance id; a reconnect with Last-Event-ID (or ?last_event_id=)
+    replays what was missed. Live events cost no database queries.
+    """
+    resume = parse_event_id(request.headers.get("last-event-id")) or last_event_id
+    return StreamingResponse(
+        attendance_event_stream(branch_id, resume),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+def encode_cursor(timestamp: datetime, attendance_id: int) -> str:
+    raw = f"{timestamp.isoformat()}|{attendance_id}".encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+def decode_cursor(cursor: str):
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)).decode()
+        timestamp, attendance_id = raw.rsplit("|", 1)
+        return datetime.fromisoformat(timestamp), int(attendance_id)
+    except Exception:
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+
+def stream_attendances(query, format: str, zones: dict, row_filter: RowFilter = None, limit: Optional[int] = None):
+    # Runs after the request session is gone, so it owns its connection.
+    # yield_per keeps a server-side cursor open and only CHUNK rows in memory.
+    query = row_columns(query)
+
+    default = get_zone()
+
+    def local(row):
+        return row.timestamp.astimezone(zones.get(row.branch_id, default)).isoformat()
+
+    with engine.connect() as conn:
+        result = conn.execution_options(yield_per=STREAM_CHUNK_SIZE).execute(query)
+        rows = (row for partition in result.partitions() for row in partition)
+        if row_filter is not None:
+            rows = merge_archived(rows, row_filter, limit)
+        chunks = iter(lambda: list(islice(rows, STREAM_CHUNK_SIZE)), [])
+        if format == "csv":
+            buffer = io.StringIO()
+            writer = csv.writer(buffer)
+            writer.writerow(EXPORT_COLUMNS)
+            for partition in chunks:
+                writer.writerows(
+                    [(local(row), *row[1:]) for row in partition]
+                )
+                yield buffer.getvalue()
+                buffer.seek(0)
+                buffer.truncate()
+            yield buffer.getvalue()
+        else:
+            for partition in chunks:
+                lines = []
+                for row in partition:
+                    item = dict(zip(EXPORT_COLUMNS, row))
+                    item["timestamp"] = local(row)
+                    lines.append(dumps(item))
+                yield b"\n".join(lines) + b"\n"
+
+def attendance_filter(branch_id=None, employee_id=None, date=None, date_from=None, date_to=None, cursor=None, zone=None) -> RowFilter:
+    # Naive filter values are wall-clock times in `zone` (the branch's, or the default)
+    zone = zone or get_zone()
+    row_filter = RowFilter(branch_id=branch_id, employee_id=employee_id)
+    starts = []
+    if date:
+        # Whole local day containing `date`
+        day = date.astimezone(zone).date() if date.tzinfo else date.date()
+        starts.append(datetime.combine(day, time.min, tzinfo=zone))
+        row_filter.end = datetime.combine(day + timedelta(days=1), time.min, tzinfo=zone)
+    if date_from:
+        starts.append(from_local(date_from, zone))
+    row_filter.start = max(starts) if starts else None
+    if date_to:
+        row_filter.until = from_local(date_to, zone)
+    if cursor:
+        row_filter.cursor = decode_cursor(cursor)
+    return row_filter
+
+def filter_query(row_filter: RowFilter):
+    query = select(Attendance)
+    if row_filter.branch_id:
+        query = query.where(Attendance.branch_id == row_filter.branch_id)
+    if row_filter.employee_id:
+        query = query.where(Attendance.employee_id == row_filter.employee_id)
+    if row_filter.start is not None:
+        query = query.where(Attendance.timestamp >= row_filter.start)
+    if row_filter.end is not None:
+        query = query.where(Attendance.timestamp < row_filter.end)
+    if row_filter.until is not None:
+        query = query.where(Attendance.timestamp <= row_filter.until)
+    if row_filter.cursor:
+        # Keyset pagination: continue strictly after the last (timestamp, id) seen
+        cursor_timestamp, cursor_id = row_filter.cursor
+        query = query.where(or_(
+            Attendance.timestamp < cursor_timestamp,
+            and_(Attendance.timestamp == cursor_timestamp, Attendance.id < cursor_id),
+        ))
+
+    # Order by timestamp desc (id breaks ties so pages are stable)
+    return query.order_by(Attendance.timestamp.desc(), Attendance.id.desc())
+
+def merge_archived(rows, row_filter: RowFilter, limit: Optional[int] = None):
+    # Hot rows plus the archived months the filter reaches, still newest first
+    merged = attendance_archive.merge(rows, row_filter)
+    return islice(merged, limit) if limit else merged
+
+def export_response(query, format: str, limit: Optional[int], zones: dict, row_filter: RowFilter = None):
+    # row_filter is only passed when it reaches archived months
+    if limit:
+        query = query.limit(limit)
+    media_type = "text/csv" if format == "csv" else "application/x-ndjson"
+    headers = {"Content-Disposition": "attachment; filename=attendance.csv"} if format == "csv" else None
+    return StreamingResponse(stream_attendances(query, format, zones, row_filter, limit), media_type=media_type, headers=headers)
+
+def paginate(rows, limit: int):
+    # Callers fetch limit + 1 rows to know whether there is a next page
+    headers = {}
+    if len(rows) > limit:
+        rows = rows[:limit]
+        last = rows[-1]
+        headers["X-Next-Cursor"] = encode_cursor(last.timestamp, last.id)
+    return rows, headers
+
+def row_columns(query):
+    # Plain row tuples: no ORM identity map, no model construction
+    return query.with_only_columns(*[getattr(Attendance, name) for name in EXPORT_COLUMNS])
+
+def rows_json_response(rows, zones: dict, headers: dict = None):
+    default = get_zone()
+    items = rows_to_dicts(rows, EXPORT_COLUMNS)
+    for item in items:
+        item["timestamp"] = item["timestamp"].astimezone(zones.get(item["branch_id"], default))
+    return FastJSONResponse(items, headers=headers)
+
+@router.get("/", response_model=List[AttendanceRead])
 def read_attendances(
     branch_id: int = None, 
     employee_id: int = None, 
     date: datetime = None,
+    date_from: datetime = None,
+    date_to: datetime = None,
+    limit: Optional[int] = Query(default=None, ge=1, le=MAX_PAGE_SIZE),
+    cursor: Optional[str] = None,
+    format: str = Query(default="json", pattern="^(json|ndjson|csv)$"),
     session: Session = Depends(get_session)
 ):
-    query = select(Attendance)
-    if branch_id:
-        query = query.where(Attendance.branch_id == branch_id)
-    if employee_id:
-        query = query.where(Attendance.employee_id == employee_id)
-    # Date filtering logic can be added here
-    
-    # Order by timestamp desc
-    query = query.order_by(Attendance.timestamp.desc())
-    
-    attendances = session.exec(query).all()
-    return attendances
+    zones = branch_zones.get(session)
+    row_filter = attendance_filter(branch_id, employee_id, date, date_from, date_to, cursor, zones.get(branch_id))
+    query = filter_query(row_filter)
+    # Ranges starting (date / date_from) in archived months transparently read
+    # those too; open-ended listings only see the hot table
+    archived = attendance_archive.reaches(row_filter)
+
+    if format != "json":
+        # Full dumps: an export streams every matching row unless ?limit= is given
+        return export_response(query, format, limit, zones, row_filter if archived else None)
+
+    limit = limit or DEFAULT_PAGE_SIZE
+    rows = session.execute(row_columns(query).limit(limit + 1)).all()
+    if archived:
+        rows = list(merge_archived(rows, row_filter, limit + 1))
+    rows, headers = paginate(rows, limit)
+    return rows_json_response(rows, zones, headers)
@@ -0,0 +1,112 @@
+from fastapi import APIRouter, Depends, HTTPException, Query
+from fastapi.concurrency import run_in_threadpool
+from sqlmodel import select
+from sqlmodel.ext.asyncio.session import AsyncSession
+from typing import List, Optional
+from datetime import datetime
+from app.core.archive import attendance_archive
+from app.core.cache import branch_cache, employee_cache, snapshot
+from app.core.db import get_async_session, insert_ignore
+from app.core.geo import geo_index
+from app.core.reports import punch_day
+from app.core.timezones import branch_zones, get_zone, to_utc
+from app.models.models import Attendance, Employee, Branch
+from app.api.v1.endpoints.attendance import (
+    AttendanceCreate, AttendanceRead, DEFAULT_PAGE_SIZE, IDEMPOTENCY_KEY, MAX_PAGE_SIZE, attendance_filter, check_geofence, export_response,
+    filter_query, localize, merge_archived, paginate, publish_attendances, row_columns, rows_json_response,
+    update_daily_summaries,
+)
+
+# Async twins of the attendance hot paths (enabled with DB_ASYNC=true).
+# Routes not defined here fall through to the sync router.
+router = APIRouter()
+
+@router.post("/", response_model=AttendanceRead)
+async def create_attendance(attendance: AttendanceCreate, session: AsyncSession = Depends(get_async_session)):
+    # Verify employee and branch exist
+    employee_id = attendance.employee_id
+    branch_id = attendance.branch_id
+
+    async def load_employee():
+        return snapshot(await session.get(Employee, employee_id))
+
+    async def load_branch():
+        return snapshot(await session.get(Branch, branch_id))
+
+    # Served from the in-process cache, a punch doesn't query either table
+    employee = await employee_cache.get_or_load_async(employee_id, load_employee)
+    if not employee:
+        raise HTTPException(status_code=404, detail="Employee not found")
+
+    branch = await branch_cache.get_or_load_async(branch_id, load_branch)
+    if not branch:
+        raise HTTPException(status_code=404, detail="Branch not found")
+
+    if attendance.latitude is not None or attendance.longitude is not None:
+        check_geofence(await session.run_sync(geo_index), attendance)
+
+    values = attendance.dict()
+    values["timestamp"] = to_utc(attendance.timestamp)
+    zone = get_zone(branch.timezone)
+
+    # The unique index doesn't cover archived months: a replayed punch is matched there
+    key = (employee_id, values["timestamp"], attendance.type)
+    if attendance_archive.covers(key[1]):
+        archived = await run_in_threadpool(attendance_archive.find, [key])
+        if key in archived:
+            return localize([archived[key]], {branch_id: zone})[0]
+
+    try:
+        statement = insert_ignore(Attendance, IDEMPOTENCY_KEY).values(**values).returning(Attendance.id)
+        attendance_id = (await session.execute(statement)).scalar()
+        await session.commit()
+    except Exception as e:
+        await session.rollback()
+        print(f"Error creating attendance: {e}")
+        # Return 400 instead of 500
+        raise HTTPException(status_code=400, detail=f"Error creating attendance record: {str(e)}")
+
+    if attendance_id is None:
+        # Already exists, just return it (idempotent success)
+        print(f"Duplicate attendance detected/ignored: {employee.first_name} at {attendance.timestamp}")
+        statement = select(Attendance).where(
+            Attendance.employee_id == employee_id,
+            Attendance.timestamp == values["timestamp"],
+            Attendance.type == attendance.type
+        )
+        return localize([(await session.exec(statement)).one()], {branch_id: zone})[0]
+
+    created = localize([Attendance(id=attendance_id, **values)], {branch_id: zone})[0]
+    publish_attendances([created])
+    day_key = [(employee_id, punch_day(values["timestamp"], zone), zone)]
+    await session.run_sync(update_daily_summaries, day_key, {employee_id: employee.work_schedule})
+    return created
+
+@router.get("/", response_model=List[AttendanceRead])
+async def read_attendances(
+    branch_id: int = None,
+    employee_id: int = None,
+    date: datetime = None,
+    date_from: datetime = None,
+    date_to: datetime = None,
+    limit: Optional[int] = Query(default=None, ge=1, le=MAX_PAGE_SIZE),
+    cursor: Optional[str] = None,
+    format: str = Query(default="json", pattern="^(json|ndjson|csv)$"),
+    session: AsyncSession = Depends(get_async_session)
+):
+    zones = await session.run_sync(branch_zones.get)
+    row_filter = attendance_filter(branch_id, employee_id, date, date_from, date_to, cursor, zones.get(branch_id))
+    query = filter_query(row_filter)
+    archived = attendance_archive.reaches(row_filter)
+
+    if format != "json":
+        # Exports stream from a sync server-side cursor in the threadpool
+        return export_response(query, format, limit, zones, row_filter if archived else None)
+
+    limit = limit or DEFAULT_PAGE_SIZE
+    rows = (await session.execute(row_columns(query).limit(limit + 1))).all()
+    if archived:
+        # Archive files are read (and decoded) off the event loop
+        rows = await run_in_threadpool(lambda: list(merge_archived(rows, row_filter, limit + 1)))
+    rows, headers = paginate(rows, limit)
+    return rows_json_response(rows, zones, headers)
@@ -1,13 +1,27 @@
-from fastapi import APIRouter, Depends, HTTPException
-from sqlmodel import Session, select
-from typing import List
+from datetime import datetime
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, Response
+from sqlmodel import Session, SQLModel, select
+from typing import List, Optional
 from app.core.db import get_session
+from app.core.geo import geo_index
+from app.core.http_cache import body_etag, cache_headers, not_modified, not_modified_response
+from app.core.serialization import dumps
+from app.core.cache import branch_cache, cached_branches, invalidate_branches
+from app.core.timezones import is_valid_zone
 from app.models.models import Branch, BranchBase
 
 router = APIRouter()
 
+class NearestBranch(SQLModel):
+    branch: Branch
+    distance_m: float
+    inside: bool  # within the branch's geofence radius
+
 @router.post("/", response_model=Branch)
 def create_branch(branch: BranchBase, session: Session = Depends(get_session)):
+    if branch.timezone and not is_valid_zone(branch.timezone):
+        raise HTTPException(status_code=422, detail=f"Unknown timezone: {branch.timezone}")
+
     # Check if branch with same name already exists
     statement = select(Branch).where(Branch.name == branch.name)
     existing_branch = session.exec(statement).first()
@@ -21,22 +35,52 @@ def create_branch(branch: BranchBase, session: Session = Depends(get_session)):
         existing_branch.radius = branch.radius
         existing_branch.latitude = branch.latitude
         existing_branch.longitude = branch.longitude
+        existing_branch.timezone = branch.timezone
+        existing_branch.updated_at = datetime.now()
         
         session.add(existing_branch)
         session.commit()
         session.refresh(existing_branch)
+        invalidate_branches()
         return existing_branch
 
     db_branch = Branch.from_orm(branch)
     session.add(db_branch)
     session.commit()
     session.refresh(db_branch)
+    invalidate_branches()
     return db_branch
 
+def encode_branches(session: Session):
+    branches = cached_branches(session)
+    body = dumps([b.model_dump() for b in branches])
+    last_modified = max((b.updated_at for b in branches if b.updated_at), default=None)
+    return body, body_etag(body), last_modified
+
 @router.get("/", response_model=List[Branch])
-def read_branches(session: Session = Depends(get_session)):
-    branches = session.exec(select(Branch)).all()
-    return branches
+def read_branches(request: Request, session: Session = Depends(get_session)):
+    # Kiosks poll this constantly; branches change about once a month, so
+    # the encoded body itself is cached until the next branch write
+    body, etag, last_modified = branch_cache.get_or_load("json", lambda: encode_branches(session))
+    headers = cache_headers(etag, last_modified)
+    # Deletes don't move max(updated_at): ETag only
+    if not_modified(request, etag):
+        return not_modified_response(headers)
+    return Response(body, media_type="application/json", headers=headers)
+
+@router.get("/nearest", response_model=NearestBranch)
+def read_nearest_branch(
+    latitude: float = Query(ge=-90, le=90),
+    longitude: float = Query(ge=-180, le=180),
+    max_distance_m: Optional[float] = Query(default=None, gt=0),
+    session: Session = Depends(get_session)
+):
+    # Grid index over the cached branch list, no query per lookup
+    match = geo_index(session).nearest(latitude, longitude, max_distance_m)
+    if match is None:
+        raise HTTPException(status_code=404, detail="No branch nearby")
+    fence, distance = match
+    return NearestBranch(branch=fence.branch, distance_m=round(distance, 1), inside=fence.contains(latitude, longitude))
 
 @router.delete("/{branch_id}")
 def delete_branch(branch_id: int, session: Session = Depends(get_session)):
@@ -45,4 +89,5 @@ def delete_branch(branch_id: int, session: Session = Depends(get_session)):
         raise HTTPException(status_code=404, detail="Branch not found")
     session.delete(branch)
     session.commit()
+    invalidate_branches()
     return {"ok": True}
@@ -1,7 +1,12 @@
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, Depends, HTTPException, Request
 from sqlmodel import Session, delete, select
-from app.core.db import get_session
-from app.models.models import Attendance, AttendanceBase, Employee, Branch
+from app.core.archive import attendance_archive
+from app.core.cache import caches
+from app.core.db import get_session, pool_status
+from app.core.events import attendance_events
+from app.core.punch_queue import punch_queue
+from app.core.config import settings
+from app.models.models import Attendance, AttendanceBase, AttendanceDailySummary, Employee, Branch
 
 router = APIRouter()
 
@@ -10,7 +15,34 @@ def clear_all_attendance(key: str, session: Session = Depends(get_session)):
     if key != "silveronics-secret-key-123":
         raise HTTPException(status_code=403, detail="Forbidden")
     
+    # Summaries are derived from the punches, drop them too
+    session.exec(delete(AttendanceDailySummary))
     statement = delete(Attendance)
     result = session.exec(statement)
     session.commit()
-    return {"status": "ok", "deleted_rows": result.rowcount}
+    # Archived months too, or reads would bring them back
+    archived_months = attendance_archive.clear()
+    return {"status": "ok", "deleted_rows": result.rowcount, "deleted_archived_months": archived_months}
+
+@router.get("/db-pool")
+def read_pool_status():
+    return pool_status()
+
+@router.get("/cache")
+def read_cache_stats():
+    return caches.stats()
+
+@router.get("/queue")
+def read_queue_stats():
+    # Entries per status in the write-behind punch queue
+    return punch_queue.stats() if settings.attendance_queue_enabled else {}
+
+@router.get("/stream")
+def read_stream_stats():
+    # Open live attendance streams and broker counters
+    return attendance_events.stats()
+
+@router.get("/startup")
+def read_startup_timings(request: Request):
+    # Seconds spent in each startup phase of this worker
+    return getattr(request.app.state, "startup", {})
@@ -1,11 +1,27 @@
-from fastapi import APIRouter, Depends, HTTPException
-from sqlmodel import Session, select, SQLModel
+from fastapi import APIRouter, Depends, HTTPException, Request, Response
+from fastapi.concurrency import run_in_threadpool
+from pydantic import ValidationError
+from sqlalchemy import func
+from sqlmodel import Session, select, SQLModel, Field
 from typing import List, Optional, Any
-from app.core.db import get_session
-from app.models.models import Employee, EmployeeBase, Branch
+from datetime import datetime
+import csv
+import hashlib
+import io
+import json
+from app.core.cache import cached_branch, cached_branches, cached_employee, invalidate_employee, roster_cache
+from app.core.config import settings
+from app.core.db import get_session, insert_or_update_many
+from app.core.face_index import face_index
+from app.core.http_cache import cache_headers, not_modified, not_modified_response
+from app.core.photo_store import store_inline_photo
+from app.core.serialization import rows_response
+from app.models.models import Employee, EmployeeBase
 
 router = APIRouter()
 
+EMPLOYEE_COLUMNS = list(Employee.__table__.columns.keys())
+
 class EmployeeUpsert(SQLModel):
     employee_number: str
     first_name: Optional[str] = None
@@ -18,11 +34,48 @@ class EmployeeUpsert(SQLModel):
     is_active: Optional[bool] = None
     face_embedding: Optional[List[float]] = None
 
+class EmployeeBulkRow(EmployeeUpsert):
+    branch_id: Optional[int] = None  # falls back to the ?branch_id= of the request
+
+class EmployeeBulkItem(SQLModel):
+    index: int
+    employee_number: Optional[str] = None
+    status: str  # created, updated, unchanged, rejected
+    id: Optional[int] = None
+    detail: Optional[str] = None
+
+class EmployeeBulkResponse(SQLModel):
+    created: int = 0
+    updated: int = 0
+    unchanged: int = 0
+    rejected: int = 0
+    results: List[EmployeeBulkItem]
+
+class IdentifyRequest(SQLModel):
+    embedding: List[float]
+    branch_id: Optional[int] = None
+    top_k: int = Field(default=5, ge=1, le=100)
+    min_score: Optional[float] = None
+
+class IdentifyMatch(SQLModel):
+    employee_id: int
+    employee_number: str
+    first_name: str
+    last_name: str
+    branch_id: Optional[int] = None
+    score: float
+
 @router.post("/", response_model=Employee)
 def create_or_update_employee(employee: EmployeeUpsert, branch_id: int, session: Session = Depends(get_session)):
-    branch = session.get(Branch, branch_id)
+    branch = cached_branch(session, branch_id)
     if not branch:
         raise HTTPException(status_code=404, detail="Branch not found")
+
+    # Inline base64 photos go to the blob store; the row only keeps its URL
+    try:
+        employee.photo_url = store_inline_photo(employee.photo_url)
+    except ValueError as e:
+        raise HTTPException(status_code=422, detail=str(e))
     
     # Check if employee exists
     statement = select(Employee).where(Employee.employee_number == employee.employee_number)
@@ -42,10 +95,14 @@ def create_or_update_employee(employee: EmployeeUpsert, branch_id: int, session:
         
         # Always update branch if provided
         existing_employee.branch_id = branch_id
+        # Drives roster delta sync (updated_since) and the roster ETag
+        existing_employee.updated_at = datetime.now()
         
         session.add(existing_employee)
         session.commit()
         session.refresh(existing_employee)
+        invalidate_employee(existing_employee.id)
+        face_index.upsert(existing_employee.id, existing_employee.branch_id, existing_employee.face_embedding, existing_employee.is_active)
         return existing_employee
 
     # For new creation, ensure required fields are present
@@ -61,21 +118,277 @@ def create_or_update_employee(employee: EmployeeUpsert, branch_id: int, session:
     session.add(db_employee)
     session.commit()
     session.refresh(db_employee)
+    invalidate_employee(db_employee.id)
+    face_index.upsert(db_employee.id, db_employee.branch_id, db_employee.face_embedding, db_employee.is_active)
     return db_employee
 
-@router.get("/", response_model=List[Employee])
-def read_employees(branch_id: int = None, session: Session = Depends(get_session)):
-    query = select(Employee)
+MAX_BULK_SIZE = 20000
+# Lookup/write chunk, well under the SQLite and Postgres bind parameter limits
+BULK_CHUNK_SIZE = 1000
+UPSERT_FIELDS = [f for f in EmployeeUpsert.model_fields if f != "employee_number"]
+JSON_FIELDS = ("work_schedule", "face_embedding")
+
+def same_value(field: str, a, b) -> bool:
+    if field == "face_embedding":
+        # Stored as float32, compare at that precision
+        return Employee.__table__.c.face_embedding.type.compare_values(a, b)
+    return a == b
+
+def parse_bulk_csv(text: str) -> List[Any]:
+    """CSV rows as dicts (empty cell = not provided), or an error string for a bad row."""
+    rows = []
+    for record in csv.DictReader(io.StringIO(text)):
+        row = {}
+        for key, value in record.items():
+            if key is None or value is None or not value.strip():
+                continue
+            key, value = key.strip(), value.strip()
+            if key in JSON_FIELDS:
+                try:
+                    value = json.loads(value)
+                except ValueError:
+                    row = f"{key} is not valid JSON"
+                    break
+            row[key] = value
+        rows.append(row)
+    return rows
+
+def merge_employees(session: Session, rows: List[Any], default_branch_id: Optional[int]) -> List[EmployeeBulkItem]:
+    """
+    Set-based version of create_or_update_employee: one lookup per chunk of
+    employee_numbers, partial-field merge in memory, then a single
+    INSERT ... ON CONFLICT DO UPDATE per chunk in one transaction. Rows that
+    would not change anything are not written (updated_at, and with it the
+    roster ETag, stays put).
+    """
+    results: List[Optional[EmployeeBulkItem]] = [None] * len(rows)
+    branch_ids = {b.id for b in cached_branches(session)}
+    if default_branch_id is not None and default_branch_id not in branch_ids:
+        raise HTTPException(status_code=404, detail="Branch not found")
+
+    def reject(index, detail, number=None):
+        results[index] = EmployeeBulkItem(index=index, employee_number=number, status="rejected", detail=detail)
+
+    valid = {}  # employee_number -> (index, row)
+    for index, raw in enumerate(rows):
+        if isinstance(raw, str):
+            reject(index, raw)
+            continue
+        try:
+            row = EmployeeBulkRow.model_validate(raw)
+        except ValidationError as e:
+            number = raw.get("employee_number") if isinstance(raw, dict) else None
+            reject(index, "; ".join(f"{'.'.join(map(str, err['loc'])) or 'row'}: {err['msg']}" for err in e.errors()), number)
+            continue
+        number = row.employee_number
+        if number in valid:
+            reject(index, f"Duplicate employee_number (first seen at index {valid[number][0]})", number)
+            continue
+        if row.branch_id is None:
+            row.branch_id = default_branch_id
+        if row.branch_id is not None and row.branch_id not in branch_ids:
+            reject(index, "Branch not found", number)
+            continue
+        try:
+            row.photo_url = store_inline_photo(row.photo_url)
+        except ValueError as e:
+            reject(index, str(e), number)
+            continue
+        valid[number] = (index, row)
+
+    existing = {}
+    columns = [Employee.id, Employee.employee_number, Employee.branch_id] + [getattr(Employee, f) for f in UPSERT_FIELDS]
+    numbers = list(valid)
+    for first in range(0, len(numbers), BULK_CHUNK_SIZE):
+        statement = select(*columns).where(Employee.employee_number.in_(numbers[first:first + BULK_CHUNK_SIZE]))
+        for current in session.execute(statement):
+            existing[current.employee_number] = current._asdict()
+
+    now = datetime.now()
+    writes = []  # (index, values)
+    for number, (index, row) in valid.items():
+        provided = {f: getattr(row, f) for f in UPSERT_FIELDS if getattr(row, f) is not None}
+        current = existing.get(number)
+        if current is None:
+            if not row.first_name or not row.last_name:
+                reject(index, "first_name and last_name are required for new employees", number)
+                continue
+            if row.branch_id is None:
+                reject(index, "branch_id is required for new employees", number)
+                continue
+            values = dict({f: None for f in UPSERT_FIELDS}, is_active=True)
+            values.update(provided)
+            branch_id = row.branch_id
+        else:
+            # Only provided fields change, as in the single upsert
+            values = dict({f: current[f] for f in UPSERT_FIELDS}, **provided)
+            branch_id = row.branch_id if row.branch_id is not None else current["branch_id"]
+            if branch_id == current["branch_id"] and all(same_value(f, v, current[f]) for f, v in provided.items()):
+                results[index] = EmployeeBulkItem(index=index, employee_number=number, status="unchanged", id=current["id"])
+                continue
+        values.update(employee_number=number, branch_id=branch_id, created_at=now, updated_at=now)
+        writes.append((index, values))
+
+    if writes:
+        statement = insert_or_update_many(
+            Employee, ["employee_number"], list(writes[0][1]), skip_on_update=["created_at"]
+        ).returning(Employee.id, Employee.employee_number)
+        ids = {}
+        try:
+            for first in range(0, len(writes), BULK_CHUNK_SIZE):
+                chunk = [values for _, values in writes[first:first + BULK_CHUNK_SIZE]]
+                ids.update({row.employee_number: row.id for row in session.execute(statement, chunk)})
+            session.commit()
+        except Exception as e:
+            session.rollback()
+            print(f"Error in bulk employee upsert: {e}")
+            raise HTTPException(status_code=400, detail=f"Error upserting employees: {str(e)}")
+
+        invalidate_employee()
+        for index, values in writes:
+            number = values["employee_number"]
+            status = "updated" if number in existing else "created"
+            results[index] = EmployeeBulkItem(index=index, employee_number=number, status=status, id=ids.get(number))
+            face_index.upsert(ids.get(number), values["branch_id"], values["face_embedding"], values["is_active"])
+        print(f"👥 Bulk upsert: {len(writes)} employees written, {len(rows) - len(writes)} unchanged or rejected")
+    return results
+
+@router.post("/bulk", response_model=EmployeeBulkResponse)
+async def bulk_upsert_employees(request: Request, branch_id: Optional[int] = None, session: Session = Depends(get_session)):
+    """
+    Upsert many employees at once. Body is a JSON array of employees (each
+    may carry its own branch_id), a text/csv body, or a multipart upload
+    with the CSV in a `file` field. work_schedule and face_embedding CSV
+    cells are JSON. ?branch_id= is the default branch.
+    """
+    content_type = request.headers.get("content-type", "")
+    try:
+        if content_type.startswith("multipart/form-data"):
+            upload = (await request.form()).get("file")
+            if upload is None or isinstance(upload, str):
+                raise HTTPException(status_code=422, detail="Upload the CSV in a 'file' field")
+            rows = parse_bulk_csv((await upload.read()).decode("utf-8-sig"))
+        elif content_type.startswith("text/csv"):
+            rows = parse_bulk_csv((await request.body()).decode("utf-8-sig"))
+        else:
+            rows = json.loads(await request.body())
+    except (UnicodeDecodeError, ValueError, csv.Error) as e:
+        raise HTTPException(status_code=422, detail=f"Unreadable body: {e}")
+    if not isinstance(rows, list):
+        raise HTTPException(status_code=422, detail="Expected a JSON array of employees")
+    if len(rows) > MAX_BULK_SIZE:
+        raise HTTPException(status_code=413, detail=f"Too many employees (max {MAX_BULK_SIZE})")
+
+    results = await run_in_threadpool(merge_employees, session, rows, branch_id)
+    return EmployeeBulkResponse(
+        created=sum(1 for r in results if r.status == "created"),
+        updated=sum(1 for r in results if r.status == "updated"),
+        unchanged=sum(1 for r in results if r.status == "unchanged"),
+        rejected=sum(1 for r in results if r.status == "rejected"),
+        results=results,
+    )
+
+@router.post("/identify", response_model=List[IdentifyMatch])
+def identify_employee(request: IdentifyRequest, session: Session = Depends(get_session)):
+    # 1:N match against the in-memory embedding index (loaded on first use)
+    face_index.ensure_loaded(session)
+    face_index.refresh(session, settings.face_index_refresh_seconds)
+    try:
+        matches = face_index.search(request.embedding, top_k=request.top_k, branch_id=request.branch_id, min_score=request.min_score)
+    except ValueError as e:
+        raise HTTPException(status_code=422, detail=str(e))
+    if not matches:
+        return []
+
+    scores = dict(matches)
+    # Deleted or deactivated since the index last refreshed: never returned
+    statement = select(Employee.id, Employee.employee_number, Employee.first_name, Employee.last_name, Employee.branch_id).where(
+        Employee.id.in_(scores.keys()), Employee.is_active == True  # noqa: E712
+    )
+    rows = {row.id: row for row in session.exec(statement).all()}
+    return [
+        IdentifyMatch(
+            employee_id=employee_id,
+            employee_number=rows[employee_id].employee_number,
+            first_name=rows[employee_id].first_name,
+            last_name=rows[employee_id].last_name,
+            branch_id=rows[employee_id].branch_id,
+            score=score,
+        )
+        for employee_id, score in matches
+        if employee_id in rows
+    ]
+
+def parse_fields(fields: Optional[str]) -> Optional[List[str]]:
+    """Comma separated column projection for the roster, `id` is always included."""
+    if not fields:
+        return None
+    requested = [f.strip() for f in fields.split(",") if f.strip()]
+    unknown = [f for f in requested if f not in EMPLOYEE_COLUMNS]
+    if unknown:
+        raise HTTPException(status_code=422, detail=f"Unknown employee fields: {', '.join(unknown)}")
+    if "id" not in requested:
+        requested.insert(0, "id")
+    return requested
+
+def roster_query(branch_id: Optional[int], updated_since: Optional[datetime], columns: List[str]):
+    query = select(*[getattr(Employee, c) for c in columns])
+    if branch_id:
+        query = query.where(Employee.branch_id == branch_id)
+    if updated_since:
+        # Inclusive: a row committed after the client's last pull can share its mark
+        query = query.where(Employee.updated_at >= updated_since)
+    return query
+
+def roster_fingerprint_query(branch_id: Optional[int]):
+    # Any insert, delete or upsert changes at least one of these
+    query = select(func.count(Employee.id), func.max(Employee.updated_at), func.sum(Employee.id))
     if branch_id:
         query = query.where(Employee.branch_id == branch_id)
-    employees = session.exec(query).all()
-    return employees
+    return query
+
+def roster_fingerprint(session: Session, branch_id: Optional[int]):
+    return roster_cache.get_or_load(branch_id, lambda: tuple(session.exec(roster_fingerprint_query(branch_id)).one()))
+
+def roster_etag(fingerprint, branch_id, updated_since, columns) -> str:
+    raw = f"{branch_id}|{updated_since}|{columns}|{tuple(fingerprint)}"
+    return 'W/"' + hashlib.sha1(raw.encode()).hexdigest() + '"'
+
+def roster_response(rows, columns: List[str], etag: str, last_modified: Optional[datetime] = None):
+    # Rows are plain column tuples (see roster_query), serialized without building models
+    return rows_response(rows, columns, headers=cache_headers(etag, last_modified))
+
+def employee_etag(employee: Employee) -> str:
+    return f'W/"{employee.id}-{employee.updated_at.timestamp() if employee.updated_at else 0}"'
+
+@router.get("/", response_model=List[Employee])
+def read_employees(
+    request: Request,
+    branch_id: int = None,
+    updated_since: datetime = None,
+    fields: Optional[str] = None,
+    session: Session = Depends(get_session)
+):
+    columns = parse_fields(fields)
+    fingerprint = roster_fingerprint(session, branch_id)
+    etag = roster_etag(fingerprint, branch_id, updated_since, columns)
+    # max(updated_at) misses deletes, so only the ETag decides a 304 here
+    if not_modified(request, etag):
+        return not_modified_response(cache_headers(etag, fingerprint[1]))
+
+    columns = columns or EMPLOYEE_COLUMNS
+    rows = session.execute(roster_query(branch_id, updated_since, columns)).all()
+    return roster_response(rows, columns, etag, fingerprint[1])
 
 @router.get("/{employee_id}", response_model=Employee)
-def read_employee(employee_id: int, session: Session = Depends(get_session)):
-    employee = session.get(Employee, employee_id)
+def read_employee(employee_id: int, request: Request, response: Response, session: Session = Depends(get_session)):
+    employee = cached_employee(session, employee_id)
     if not employee:
         raise HTTPException(status_code=404, detail="Employee not found")
+    headers = cache_headers(employee_etag(employee), employee.updated_at)
+    if not_modified(request, headers["ETag"], employee.updated_at):
+        return not_modified_response(headers)
+    response.headers.update(headers)
     return employee
 
 @router.delete("/{employee_id}")
@@ -85,4 +398,6 @@ def delete_employee(employee_id: int, session: Session = Depends(get_session)):
         raise HTTPException(status_code=404, detail="Employee not found")
     session.delete(employee)
     session.commit()
+    invalidate_employee(employee_id)
+    face_index.remove(employee_id)
     return {"ok": True}
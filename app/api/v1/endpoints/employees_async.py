@@ -0,0 +1,50 @@
+from fastapi import APIRouter, Depends, HTTPException, Request, Response
+from sqlmodel.ext.asyncio.session import AsyncSession
+from typing import List, Optional
+from datetime import datetime
+from app.core.cache import employee_cache, roster_cache, snapshot
+from app.core.db import get_async_session
+from app.core.http_cache import cache_headers, not_modified, not_modified_response
+from app.models.models import Employee
+from app.api.v1.endpoints.employees import (
+    EMPLOYEE_COLUMNS, employee_etag, parse_fields, roster_etag, roster_fingerprint_query, roster_query, roster_response,
+)
+
+# Async twins of the roster reads kiosks poll (enabled with DB_ASYNC=true).
+# Routes not defined here fall through to the sync router.
+router = APIRouter()
+
+@router.get("/", response_model=List[Employee])
+async def read_employees(
+    request: Request,
+    branch_id: int = None,
+    updated_since: datetime = None,
+    fields: Optional[str] = None,
+    session: AsyncSession = Depends(get_async_session)
+):
+    columns = parse_fields(fields)
+    async def load_fingerprint():
+        return tuple((await session.exec(roster_fingerprint_query(branch_id))).one())
+
+    fingerprint = await roster_cache.get_or_load_async(branch_id, load_fingerprint)
+    etag = roster_etag(fingerprint, branch_id, updated_since, columns)
+    if not_modified(request, etag):
+        return not_modified_response(cache_headers(etag, fingerprint[1]))
+
+    columns = columns or EMPLOYEE_COLUMNS
+    rows = (await session.execute(roster_query(branch_id, updated_since, columns))).all()
+    return roster_response(rows, columns, etag, fingerprint[1])
+
+@router.get("/{employee_id}", response_model=Employee)
+async def read_employee(employee_id: int, request: Request, response: Response, session: AsyncSession = Depends(get_async_session)):
+    async def load_employee():
+        return snapshot(await session.get(Employee, employee_id))
+
+    employee = await employee_cache.get_or_load_async(employee_id, load_employee)
+    if not employee:
+        raise HTTPException(status_code=404, detail="Employee not found")
+    headers = cache_headers(employee_etag(employee), employee.updated_at)
+    if not_modified(request, headers["ETag"], employee.updated_at):
+        return not_modified_response(headers)
+    response.headers.update(headers)
+    return employee
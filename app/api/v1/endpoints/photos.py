@@ -0,0 +1,52 @@
+from fastapi import APIRouter, HTTPException, Request, Response
+from typing import Optional, Tuple
+from app.core.photo_store import get_photo_store
+
+router = APIRouter()
+
+# Content-addressed: a digest's bytes never change, so clients may cache forever
+CACHE_CONTROL = "public, max-age=31536000, immutable"
+
+def parse_range(header: str, size: int) -> Optional[Tuple[int, int]]:
+    """
+    Single `bytes=` range -> inclusive (start, end). None means serve the whole
+    photo (no header, or a multi-range request we don't bother with).
+    """
+    if not header or not header.startswith("bytes=") or "," in header:
+        return None
+    start, _, end = header[len("bytes="):].strip().partition("-")
+    try:
+        if start == "":
+            # Suffix range: the last N bytes
+            length = int(end)
+            if length <= 0:
+                raise ValueError
+            return max(size - length, 0), size - 1
+        first = int(start)
+        last = int(end) if end else size - 1
+    except ValueError:
+        raise HTTPException(status_code=416, headers={"Content-Range": f"bytes */{size}"})
+    if first >= size or last < first:
+        raise HTTPException(status_code=416, headers={"Content-Range": f"bytes */{size}"})
+    return first, min(last, size - 1)
+
+@router.get("/{digest}")
+def read_photo(digest: str, request: Request):
+    store = get_photo_store()
+    info = store.stat(digest)
+    if not info:
+        raise HTTPException(status_code=404, detail="Photo not found")
+    size, content_type = info
+
+    etag = f'"{digest}"'
+    headers = {"ETag": etag, "Cache-Control": CACHE_CONTROL, "Accept-Ranges": "bytes"}
+    if request.headers.get("if-none-match") in (etag, f"W/{etag}"):
+        return Response(status_code=304, headers=headers)
+
+    byte_range = parse_range(request.headers.get("range"), size)
+    if byte_range is None:
+        return Response(store.read(digest), media_type=content_type, headers=headers)
+
+    start, end = byte_range
+    headers["Content-Range"] = f"bytes {start}-{end}/{size}"
+    return Response(store.read(digest, start, end), status_code=206, media_type=content_type, headers=headers)
@@ -0,0 +1,95 @@
+from fastapi import APIRouter, Depends, HTTPException
+from sqlalchemy import case, func
+from sqlmodel import Session, SQLModel, select
+from typing import List, Optional
+from datetime import date
+from app.core.cache import cached_branch
+from app.core.db import get_session
+from app.models.models import AttendanceDailySummary, DailySummaryBase, Employee
+
+router = APIRouter()
+
+MAX_REPORT_DAYS = 366
+
+class DailySummaryRead(DailySummaryBase):
+    employee_id: int
+    branch_id: int
+
+class EmployeePunctuality(SQLModel):
+    employee_id: int
+    employee_number: str
+    first_name: str
+    last_name: str
+    days_worked: int
+    late_days: int
+    incomplete_days: int
+    worked_minutes: int
+    late_minutes: int
+    early_leave_minutes: int
+
+class BranchReport(SQLModel):
+    branch_id: int
+    date_from: date
+    date_to: date
+    employees: List[EmployeePunctuality]
+
+def check_range(date_from: date, date_to: date):
+    if date_to < date_from:
+        raise HTTPException(status_code=422, detail="date_to must not be before date_from")
+    if (date_to - date_from).days >= MAX_REPORT_DAYS:
+        raise HTTPException(status_code=422, detail=f"Date range too large (max {MAX_REPORT_DAYS} days)")
+
+@router.get("/daily", response_model=List[DailySummaryRead])
+def read_daily_summaries(
+    date_from: date,
+    date_to: date,
+    branch_id: Optional[int] = None,
+    employee_id: Optional[int] = None,
+    session: Session = Depends(get_session)
+):
+    # Answered from the precomputed summaries, never from raw punches
+    check_range(date_from, date_to)
+    query = select(AttendanceDailySummary).where(
+        AttendanceDailySummary.day >= date_from,
+        AttendanceDailySummary.day <= date_to,
+    )
+    if branch_id:
+        query = query.where(AttendanceDailySummary.branch_id == branch_id)
+    if employee_id:
+        query = query.where(AttendanceDailySummary.employee_id == employee_id)
+    query = query.order_by(AttendanceDailySummary.day, AttendanceDailySummary.employee_id)
+    return session.exec(query).all()
+
+@router.get("/branches/{branch_id}", response_model=BranchReport)
+def read_branch_report(branch_id: int, date_from: date, date_to: date, session: Session = Depends(get_session)):
+    check_range(date_from, date_to)
+    if not cached_branch(session, branch_id):
+        raise HTTPException(status_code=404, detail="Branch not found")
+
+    summary = AttendanceDailySummary
+    # One grouped query over the (branch_id, day) index
+    statement = (
+        select(
+            summary.employee_id,
+            Employee.employee_number,
+            Employee.first_name,
+            Employee.last_name,
+            func.count(summary.id).label("days_worked"),
+            func.sum(case((summary.status == "late", 1), else_=0)).label("late_days"),
+            func.sum(case((summary.complete == False, 1), else_=0)).label("incomplete_days"),  # noqa: E712
+            func.sum(summary.worked_minutes).label("worked_minutes"),
+            func.sum(summary.late_minutes).label("late_minutes"),
+            func.sum(summary.early_leave_minutes).label("early_leave_minutes"),
+        )
+        .join(Employee, Employee.id == summary.employee_id)
+        .where(summary.branch_id == branch_id, summary.day >= date_from, summary.day <= date_to)
+        .group_by(summary.employee_id, Employee.employee_number, Employee.first_name, Employee.last_name)
+        .order_by(Employee.last_name, Employee.first_name)
+    )
+    rows = session.exec(statement).all()
+    return BranchReport(
+        branch_id=branch_id,
+        date_from=date_from,
+        date_to=date_to,
+        employees=[EmployeePunctuality(**row._mapping) for row in rows],
+    )
@@ -0,0 +1,308 @@
+import heapq
+import os
+import re
+import tempfile
+import threading
+from collections import OrderedDict, namedtuple
+from dataclasses import dataclass
+from datetime import datetime, timedelta, timezone
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple
+
+import numpy as np
+from sqlalchemy import column, func, select, table
+from sqlalchemy.engine import Engine
+
+from app.core.config import settings
+from app.core.partitions import Month, add_months, current_month, detach_partition, month_of, month_range, month_start
+from app.models.models import Attendance
+
+# Same order as the attendance export columns, so archived rows and hot rows are interchangeable
+ARCHIVE_COLUMNS = [
+    "timestamp", "id", "employee_id", "branch_id", "type", "status", "confidence_score", "biometric_verified",
+    "latitude", "longitude",
+]
+ArchivedRow = namedtuple("ArchivedRow", ARCHIVE_COLUMNS)
+# (employee_id, UTC timestamp, type), like the attendance unique index
+PunchKey = Tuple[int, datetime, str]
+
+# Stored as small dictionaries + integer codes
+CATEGORY_COLUMNS = ("type", "status")
+# NaN stands for NULL
+FLOAT_COLUMNS = ("confidence_score", "latitude", "longitude")
+INT_COLUMNS = ("id", "employee_id", "branch_id")
+
+FILE_NAME = re.compile(r"^attendance-(\d{4})-(\d{2})\.npz$")
+EPOCH = datetime(1970, 1, 1, tzinfo=timezone.utc)
+MICROSECOND = timedelta(microseconds=1)
+
+
+def to_micros(ts: datetime) -> int:
+    if ts.tzinfo is None:
+        ts = ts.replace(tzinfo=timezone.utc)
+    return (ts - EPOCH) // MICROSECOND
+
+
+@dataclass
+class RowFilter:
+    """Attendance read filters, applied both as SQL and to archived months."""
+    branch_id: Optional[int] = None
+    employee_id: Optional[int] = None
+    start: Optional[datetime] = None  # inclusive
+    end: Optional[datetime] = None  # exclusive
+    until: Optional[datetime] = None  # inclusive
+    cursor: Optional[Tuple[datetime, int]] = None  # strictly older than (timestamp, id)
+
+    def bounds(self) -> Tuple[Optional[datetime], Optional[datetime]]:
+        upper = [t for t in (self.end, self.until, self.cursor[0] if self.cursor else None) if t is not None]
+        return self.start, min(upper) if upper else None
+
+
+def encode_rows(rows: List[tuple]) -> Dict[str, np.ndarray]:
+    """Row tuples (ARCHIVE_COLUMNS order) -> column arrays sorted by (timestamp, id)."""
+    columns = {name: [row[i] for row in rows] for i, name in enumerate(ARCHIVE_COLUMNS)}
+    arrays = {"timestamp": np.array([to_micros(ts) for ts in columns["timestamp"]], dtype=np.int64)}
+    for name in INT_COLUMNS:
+        arrays[name] = np.array(columns[name], dtype=np.int64)
+    for name in FLOAT_COLUMNS:
+        arrays[name] = np.array([np.nan if v is None else v for v in columns[name]], dtype=np.float64)
+    arrays["biometric_verified"] = np.array([bool(v) for v in columns["biometric_verified"]], dtype=bool)
+    for name in CATEGORY_COLUMNS:
+        values, codes = np.unique(np.array(["" if v is None else v for v in columns[name]], dtype=str), return_inverse=True)
+        arrays[f"{name}_values"] = values
+        arrays[f"{name}_codes"] = codes.astype(np.int32)
+    order = np.lexsort((arrays["id"], arrays["timestamp"]))
+    return {name: array if name.endswith("_values") else array[order] for name, array in arrays.items()}
+
+
+def decode_rows(data: Dict[str, np.ndarray], index: np.ndarray) -> List[ArchivedRow]:
+    timestamps = [EPOCH + timedelta(microseconds=v) for v in data["timestamp"][index].tolist()]
+    columns = {name: data[name][index].tolist() for name in INT_COLUMNS}
+    for name in FLOAT_COLUMNS:
+        columns[name] = [None if v != v else v for v in data[name][index].tolist()]
+    columns["biometric_verified"] = data["biometric_verified"][index].tolist()
+    for name in CATEGORY_COLUMNS:
+        columns[name] = data[f"{name}_values"][data[f"{name}_codes"][index]].tolist()
+    return [
+        ArchivedRow(*values)
+        for values in zip(timestamps, *(columns[name] for name in ARCHIVE_COLUMNS[1:]))
+    ]
+
+
+class AttendanceArchive:
+    """
+    Closed months of attendance moved out of the hot table into one
+    compressed columnar file per UTC month (NumPy .npz: a column per array,
+    strings dictionary-encoded, sorted by timestamp). Reads filter whole
+    columns at once and recently used months stay decoded in memory.
+    """
+
+    def __init__(self, directory: str = None, cache_months: int = None):
+        self.directory = directory or settings.attendance_archive_dir
+        self.cache_months = settings.attendance_archive_cache_months if cache_months is None else cache_months
+        self._loaded: "OrderedDict[Tuple[str, int], Dict[str, np.ndarray]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def path(self, month: Month) -> str:
+        return os.path.join(self.directory, f"attendance-{month[0]}-{month[1]:02d}.npz")
+
+    def months(self) -> List[Month]:
+        """Archived months, newest first."""
+        try:
+            names = os.listdir(self.directory)
+        except FileNotFoundError:
+            return []
+        months = [(int(m.group(1)), int(m.group(2))) for m in map(FILE_NAME.match, names) if m]
+        return sorted(months, reverse=True)
+
+    def months_for(self, row_filter: RowFilter) -> List[Month]:
+        lower, upper = row_filter.bounds()
+        return [
+            month for month in self.months()
+            if (upper is None or month_start(month) <= upper) and (lower is None or month_start(add_months(month, 1)) > lower)
+        ]
+
+    def covers(self, timestamp: datetime) -> bool:
+        """Whether the month of `timestamp` has been archived (one stat, no read)."""
+        return os.path.exists(self.path(month_of(timestamp)))
+
+    def reaches(self, row_filter: RowFilter) -> bool:
+        # Only explicitly bounded ranges: an open-ended listing would decode every file
+        return row_filter.start is not None and bool(self.months_for(row_filter))
+
+    # --- Reading ----------------------------------------------------------
+
+    def load(self, month: Month) -> Dict[str, np.ndarray]:
+        path = self.path(month)
+        key = (path, os.stat(path).st_mtime_ns)
+        with self._lock:
+            if key in self._loaded:
+                self._loaded.move_to_end(key)
+                return self._loaded[key]
+        with np.load(path) as npz:
+            data = {name: npz[name] for name in npz.files}
+        with self._lock:
+            self._loaded[key] = data
+            while len(self._loaded) > self.cache_months:
+                self._loaded.popitem(last=False)
+        return data
+
+    def scan(self, month: Month, row_filter: RowFilter) -> List[ArchivedRow]:
+        """Matching rows of one month, newest first."""
+        data = self.load(month)
+        timestamps, ids = data["timestamp"], data["id"]
+        mask = np.ones(len(timestamps), dtype=bool)
+        if row_filter.branch_id:
+            mask &= data["branch_id"] == row_filter.branch_id
+        if row_filter.employee_id:
+            mask &= data["employee_id"] == row_filter.employee_id
+        if row_filter.start is not None:
+            mask &= timestamps >= to_micros(row_filter.start)
+        if row_filter.end is not None:
+            mask &= timestamps < to_micros(row_filter.end)
+        if row_filter.until is not None:
+            mask &= timestamps <= to_micros(row_filter.until)
+        if row_filter.cursor is not None:
+            cursor_ts, cursor_id = to_micros(row_filter.cursor[0]), row_filter.cursor[1]
+            mask &= (timestamps < cursor_ts) | ((timestamps == cursor_ts) & (ids < cursor_id))
+        return decode_rows(data, np.flatnonzero(mask)[::-1])
+
+    def merge(self, hot_rows: Iterable, row_filter: RowFilter) -> Iterator:
+        """
+        Hot rows (newest first, as filter_query orders them) merged with
+        the archived months the filter reaches. Each month is only opened
+        once the merge gets to it, so a short page reads at most one file.
+        """
+        archived = (row for month in self.months_for(row_filter) for row in self.scan(month, row_filter))
+        timestamp, seen = None, set()
+        for row in heapq.merge(hot_rows, archived, key=lambda r: (r.timestamp, r.id), reverse=True):
+            if row.timestamp != timestamp:
+                timestamp, seen = row.timestamp, set()
+            key = (row.employee_id, row.type)
+            if key in seen:
+                # Same punch twice: left in the hot table by an interrupted
+                # archive run, or re-inserted before archived months were checked
+                continue
+            seen.add(key)
+            yield row
+
+    def find(self, keys: Iterable[PunchKey]) -> Dict[PunchKey, ArchivedRow]:
+        """
+        Archived rows for (employee_id, timestamp, type) punch keys. The hot
+        table's unique index doesn't cover archived months, so inserts into
+        them check here first; only months that have a file are opened.
+        """
+        by_month: Dict[Month, List[PunchKey]] = {}
+        for key in keys:
+            by_month.setdefault(month_of(key[1]), []).append(key)
+        found = {}
+        for month, month_keys in by_month.items():
+            if not self.covers(month_start(month)):
+                continue
+            data = self.load(month)
+            timestamps = data["timestamp"]
+            for key in month_keys:
+                employee_id, timestamp, type = key
+                codes = np.flatnonzero(data["type_values"] == type)
+                if not codes.size:
+                    continue
+                # Sorted by timestamp: only the rows at that exact instant are compared
+                micros = to_micros(timestamp)
+                first, last = np.searchsorted(timestamps, micros, "left"), np.searchsorted(timestamps, micros, "right")
+                match = np.flatnonzero(
+                    (data["employee_id"][first:last] == employee_id) & (data["type_codes"][first:last] == codes[0])
+                )
+                if match.size:
+                    found[key] = decode_rows(data, first + match[:1])[0]
+        return found
+
+    # --- Writing ----------------------------------------------------------
+
+    def write(self, month: Month, rows: List[tuple]) -> int:
+        """Store a month (merged with what is already archived for it); returns its row count."""
+        path = self.path(month)
+        if os.path.exists(path):
+            # Keyed like the unique index; a punch already archived keeps its row
+            archived = {(row.employee_id, row.timestamp, row.type): tuple(row) for row in self.scan(month, RowFilter())}
+            for row in rows:
+                archived.setdefault((row[2], row[0], row[4]), tuple(row))
+            rows = list(archived.values())
+        arrays = encode_rows(rows)
+        os.makedirs(self.directory, exist_ok=True)
+        # Durable before the hot rows are deleted: temp file, fsync, atomic rename
+        fd, tmp = tempfile.mkstemp(dir=self.directory, suffix=".tmp")
+        try:
+            with os.fdopen(fd, "wb") as f:
+                np.savez_compressed(f, **arrays)
+                f.flush()
+                os.fsync(f.fileno())
+            os.replace(tmp, path)
+        except BaseException:
+            if os.path.exists(tmp):
+                os.remove(tmp)
+            raise
+        if hasattr(os, "O_DIRECTORY"):
+            dir_fd = os.open(self.directory, os.O_DIRECTORY)
+            try:
+                os.fsync(dir_fd)
+            finally:
+                os.close(dir_fd)
+        return len(rows)
+
+    def clear(self) -> int:
+        """Delete every archived month; returns how many files were removed."""
+        months = self.months()
+        for month in months:
+            os.remove(self.path(month))
+        with self._lock:
+            self._loaded.clear()
+        return len(months)
+
+
+attendance_archive = AttendanceArchive()
+
+
+def archive_cutoff(hot_months: int = None) -> Month:
+    """First month that stays hot; everything before it is closed and archivable."""
+    hot_months = settings.attendance_hot_months if hot_months is None else hot_months
+    return add_months(current_month(), -max(1, hot_months) + 1)
+
+
+def archive_month(engine: Engine, month: Month, archive: AttendanceArchive = attendance_archive) -> int:
+    """
+    Move one month from the hot table into the archive in a single
+    transaction: the file is written (and fsync'd) before the rows go, and
+    a failure rolls the deletion back. Returns the number of rows moved.
+    """
+    start, end = month_start(month), month_start(add_months(month, 1))
+    columns = [getattr(Attendance, name) for name in ARCHIVE_COLUMNS]
+    with engine.begin() as conn:
+        # Postgres: detach the month's partition first, so it is frozen and
+        # dropping it is instant. Elsewhere the month's range is deleted and
+        # the deleted rows are what gets archived (DELETE ... RETURNING), so
+        # a punch committed meanwhile is either in the file or still hot.
+        partition = detach_partition(conn, month)
+        if partition is None:
+            rows = [tuple(row) for row in conn.execute(
+                Attendance.__table__.delete()
+                .where(Attendance.timestamp >= start, Attendance.timestamp < end)
+                .returning(*columns)
+            )]
+        else:
+            detached = table(partition, *[column(c.name, c.type) for c in columns])
+            rows = [tuple(row) for row in conn.execute(select(*detached.columns))]
+        if not rows:
+            return 0
+        # A failure here rolls the deletion back
+        archive.write(month, rows)
+        if partition is not None:
+            conn.exec_driver_sql(f"DROP TABLE {partition}")
+    return len(rows)
+
+
+def archivable_months(engine: Engine, hot_months: int = None) -> List[Month]:
+    cutoff = archive_cutoff(hot_months)
+    with engine.connect() as conn:
+        oldest = conn.execute(select(func.min(Attendance.timestamp)).where(Attendance.timestamp < month_start(cutoff))).scalar()
+    if oldest is None:
+        return []
+    return month_range(month_of(oldest), add_months(cutoff, -1))
@@ -0,0 +1,254 @@
+import multiprocessing
+import os
+import threading
+import time
+import uuid
+from abc import ABC, abstractmethod
+from collections import OrderedDict
+from typing import Any, Awaitable, Callable, Dict, Hashable, Iterable, List, Optional
+
+from sqlmodel import Session, SQLModel, select
+
+from app.core.config import settings
+from app.models.models import Branch, Employee
+
+
+class LRUCache:
+    """
+    Bounded in-process cache: least recently used entries are evicted past
+    `maxsize` and every entry expires after `ttl` seconds, which also bounds
+    how stale a worker can be if an invalidation never reaches it.
+    None is never cached, so a miss always goes back to the database.
+    """
+
+    def __init__(self, name: str, maxsize: int, ttl: float):
+        self.name = name
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._lock = threading.Lock()
+        self._entries: "OrderedDict[Hashable, tuple]" = OrderedDict()  # key -> (expires_at, value)
+        # Bumped by every invalidation so an in-flight load can't store stale data
+        self._generation = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    @property
+    def generation(self) -> int:
+        return self._generation
+
+    def get(self, key: Hashable) -> Optional[Any]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or entry[0] < time.monotonic():
+                if entry is not None:
+                    del self._entries[key]
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry[1]
+
+    def set(self, key: Hashable, value: Any, generation: Optional[int] = None):
+        if value is None:
+            return
+        with self._lock:
+            if generation is not None and generation != self._generation:
+                # Invalidated while the caller was loading, the value may be stale
+                return
+            self._entries[key] = (time.monotonic() + self.ttl, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def get_or_load(self, key: Hashable, loader: Callable[[], Any]) -> Optional[Any]:
+        value = self.get(key)
+        if value is None:
+            generation = self._generation
+            value = loader()
+            self.set(key, value, generation)
+        return value
+
+    async def get_or_load_async(self, key: Hashable, loader: Callable[[], Awaitable[Any]]) -> Optional[Any]:
+        value = self.get(key)
+        if value is None:
+            generation = self._generation
+            value = await loader()
+            self.set(key, value, generation)
+        return value
+
+    def invalidate(self, key: Optional[Hashable] = None):
+        """Drop one key, or everything when `key` is None."""
+        with self._lock:
+            self._generation += 1
+            if key is None:
+                self._entries.clear()
+            else:
+                self._entries.pop(key, None)
+
+    def stats(self) -> dict:
+        lookups = self.hits + self.misses
+        return {
+            "size": len(self._entries),
+            "maxsize": self.maxsize,
+            "ttl_seconds": self.ttl,
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "hit_ratio": round(self.hits / lookups, 4) if lookups else None,
+        }
+
+
+# --- Cross-worker invalidation ----------------------------------------------
+
+class InvalidationChannel(ABC):
+    """
+    Fans invalidations out to every worker. Messages are small JSON-able
+    dicts ({"origin", "cache", "key"}), so a broker (Redis pub/sub, Postgres
+    LISTEN/NOTIFY, ...) can carry them as-is.
+    """
+
+    @abstractmethod
+    def publish(self, message: dict):
+        ...
+
+    @abstractmethod
+    def subscribe(self, callback: Callable[[dict], None]):
+        ...
+
+
+class LocalChannel(InvalidationChannel):
+    """In-process fan-out. Stand-in for a real broker (e.g. two registries sharing one channel)."""
+
+    def __init__(self):
+        self._subscribers: List[Callable[[dict], None]] = []
+
+    def publish(self, message: dict):
+        for callback in list(self._subscribers):
+            callback(message)
+
+    def subscribe(self, callback: Callable[[dict], None]):
+        self._subscribers.append(callback)
+
+
+# Invalidation channels by name (settings.cache_invalidation_channel). Without
+# one, other workers pick up changes when their entries expire (CACHE_TTL_SECONDS,
+# capped to CACHE_TTL_MULTI_WORKER_SECONDS when running several workers).
+INVALIDATION_CHANNELS: Dict[str, Callable[[], Optional[InvalidationChannel]]] = {
+    "none": lambda: None,
+    "local": LocalChannel,
+}
+
+
+def register_invalidation_channel(name: str, factory: Callable[[], Optional[InvalidationChannel]]):
+    INVALIDATION_CHANNELS[name] = factory
+
+
+class CacheRegistry:
+    def __init__(self, channel: Optional[InvalidationChannel] = None):
+        self.origin = uuid.uuid4().hex
+        self.caches: Dict[str, LRUCache] = {}
+        self.channel = channel
+        if channel is not None:
+            channel.subscribe(self._on_message)
+
+    def register(self, cache: LRUCache) -> LRUCache:
+        self.caches[cache.name] = cache
+        return cache
+
+    def invalidate(self, name: str, key: Optional[Hashable] = None):
+        self.caches[name].invalidate(key)
+        if self.channel is not None:
+            try:
+                self.channel.publish({"origin": self.origin, "cache": name, "key": key})
+            except Exception as e:
+                # The write already happened; other workers fall back to the TTL
+                print(f"⚠️ Cache invalidation publish failed: {e}")
+
+    def _on_message(self, message: dict):
+        if message.get("origin") == self.origin:
+            return
+        cache = self.caches.get(message.get("cache"))
+        if cache is not None:
+            cache.invalidate(message.get("key"))
+
+    def stats(self) -> dict:
+        return {name: cache.stats() for name, cache in self.caches.items()}
+
+
+# Channels that only reach caches in the same process
+IN_PROCESS_CHANNELS = {"none", "local"}
+
+
+def multi_worker() -> bool:
+    # uvicorn --workers (WEB_CONCURRENCY) runs each worker as a spawned child process
+    return multiprocessing.parent_process() is not None or int(os.environ.get("WEB_CONCURRENCY") or 1) > 1
+
+
+def cache_ttl() -> float:
+    if settings.cache_invalidation_channel in IN_PROCESS_CHANNELS and multi_worker():
+        return min(settings.cache_ttl_seconds, settings.cache_ttl_multi_worker_seconds)
+    return settings.cache_ttl_seconds
+
+
+caches = CacheRegistry(INVALIDATION_CHANNELS[settings.cache_invalidation_channel]())
+CACHE_TTL = cache_ttl()
+if CACHE_TTL < settings.cache_ttl_seconds:
+    print(f"⚠️ Several workers and no cross-worker invalidation channel: cache TTL capped to {CACHE_TTL:g}s")
+
+# Branches are few and change rarely: per-id entries plus derived views
+# ("all", "zones", "geo", "json"), all dropped together on any change
+branch_cache = caches.register(LRUCache("branches", settings.cache_max_entries, CACHE_TTL))
+employee_cache = caches.register(LRUCache("employees", settings.cache_max_entries, CACHE_TTL))
+# branch_id -> roster fingerprint, so an unchanged roster answers 304 without a query
+roster_cache = caches.register(LRUCache("rosters", settings.cache_max_entries, CACHE_TTL))
+
+
+def snapshot(instance: Optional[SQLModel]) -> Optional[SQLModel]:
+    # Detached copy: a cached instance must never belong to (or be expired by) a session
+    if instance is None:
+        return None
+    return type(instance).model_validate(instance.model_dump())
+
+
+def cached_branch(session: Session, branch_id: int) -> Optional[Branch]:
+    return branch_cache.get_or_load(branch_id, lambda: snapshot(session.get(Branch, branch_id)))
+
+
+def cached_branches(session: Session) -> List[Branch]:
+    return branch_cache.get_or_load("all", lambda: [snapshot(b) for b in session.exec(select(Branch)).all()])
+
+
+def cached_employee(session: Session, employee_id: int) -> Optional[Employee]:
+    return employee_cache.get_or_load(employee_id, lambda: snapshot(session.get(Employee, employee_id)))
+
+
+def cached_employees(session: Session, employee_ids: Iterable[int]) -> Dict[int, Employee]:
+    """Cached employees by id; the missing ones are loaded with a single query."""
+    found, missing = {}, []
+    for employee_id in set(employee_ids):
+        employee = employee_cache.get(employee_id)
+        if employee is None:
+            missing.append(employee_id)
+        else:
+            found[employee_id] = employee
+    if missing:
+        generation = employee_cache.generation
+        for employee in session.exec(select(Employee).where(Employee.id.in_(missing))).all():
+            found[employee.id] = snapshot(employee)
+            employee_cache.set(employee.id, found[employee.id], generation)
+    return found
+
+
+def invalidate_branches():
+    caches.invalidate("branches")
+
+
+def invalidate_employee(employee_id: Optional[int] = None):
+    # Any employee write can change a roster (employees also move branches)
+    caches.invalidate("employees", employee_id)
+    caches.invalidate("rosters")
@@ -0,0 +1,143 @@
+import zlib
+from typing import Optional
+
+from starlette.datastructures import Headers, MutableHeaders
+
+from app.core.config import settings
+
+try:
+    import brotli
+except ImportError:  # gzip only
+    brotli = None
+
+# Already compressed (or not worth it); image/svg+xml is text and still compressed
+SKIP_TYPES = (
+    "image/", "video/", "audio/", "application/zip", "application/gzip", "application/octet-stream",
+    # Events must reach the client as they happen, not when a compressor block fills
+    "text/event-stream",
+)
+
+
+def choose_encoding(accept_encoding: str) -> Optional[str]:
+    """Best encoding we support from an Accept-Encoding header (q-values honoured)."""
+    offered = {}
+    for part in accept_encoding.lower().split(","):
+        name, _, params = part.strip().partition(";")
+        q = 1.0
+        for param in params.split(";"):
+            key, _, value = param.strip().partition("=")
+            if key == "q":
+                try:
+                    q = float(value)
+                except ValueError:
+                    q = 0.0
+        offered[name.strip()] = q
+    wildcard = offered.get("*", 0.0)
+    candidates = (["br"] if brotli is not None else []) + ["gzip"]
+    best, best_q = None, 0.0
+    for encoding in candidates:
+        q = offered.get(encoding, wildcard)
+        # Ties keep server preference order (br first)
+        if q > best_q:
+            best, best_q = encoding, q
+    return best
+
+
+class Compressor:
+    def __init__(self, encoding: str):
+        self.encoding = encoding
+        if encoding == "br":
+            self._br = brotli.Compressor(quality=settings.brotli_quality)
+        else:
+            # wbits 31 = gzip container
+            self._gz = zlib.compressobj(settings.gzip_level, zlib.DEFLATED, 31)
+
+    def compress(self, data: bytes) -> bytes:
+        return self._br.process(data) if self.encoding == "br" else self._gz.compress(data)
+
+    def flush(self) -> bytes:
+        return self._br.finish() if self.encoding == "br" else self._gz.flush()
+
+
+class CompressionMiddleware:
+    """
+    Brotli/gzip response compression negotiated from Accept-Encoding.
+
+    Bodies below COMPRESSION_MIN_BYTES, already-encoded responses, media
+    types that are compressed already, partial content and bodiless
+    statuses pass through untouched, so tiny responses cost nothing.
+    Streaming responses are compressed chunk by chunk.
+    """
+
+    def __init__(self, app, minimum_size: int = None):
+        self.app = app
+        self.minimum_size = settings.compression_min_bytes if minimum_size is None else minimum_size
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        encoding = choose_encoding(Headers(scope=scope).get("accept-encoding", ""))
+        if encoding is None:
+            await self.app(scope, receive, send)
+            return
+
+        start_message = None
+        compressor: Optional[Compressor] = None
+        passthrough = False
+
+        async def send_wrapper(message):
+            nonlocal start_message, compressor, passthrough
+            if message["type"] == "http.response.start":
+                headers = Headers(raw=message["headers"])
+                content_type = headers.get("content-type", "")
+                passthrough = (
+                    message["status"] in (204, 206, 304) or message["status"] < 200
+                    or "content-encoding" in headers
+                    or content_type.startswith(SKIP_TYPES)
+                )
+                if passthrough:
+                    await send(message)
+                else:
+                    # Wait for the first body chunk to know whether it's worth it
+                    start_message = message
+                return
+
+            if message["type"] != "http.response.body" or passthrough:
+                await send(message)
+                return
+
+            body = message.get("body", b"")
+            more_body = message.get("more_body", False)
+
+            if start_message is not None:
+                start, start_message = start_message, None
+                headers = MutableHeaders(raw=start["headers"])
+                if not more_body and len(body) < self.minimum_size:
+                    passthrough = True
+                    await send(start)
+                    await send(message)
+                    return
+                compressor = Compressor(encoding)
+                headers["Content-Encoding"] = encoding
+                headers.add_vary_header("Accept-Encoding")
+                if "content-length" in headers:
+                    del headers["content-length"]
+                etag = headers.get("etag")
+                if etag and not etag.startswith("W/"):
+                    # The encoded bytes differ, so a strong validator must not be reused
+                    headers["ETag"] = "W/" + etag
+                if not more_body:
+                    body = compressor.compress(body) + compressor.flush()
+                    headers["Content-Length"] = str(len(body))
+                    await send(start)
+                    await send({"type": "http.response.body", "body": body})
+                    return
+                await send(start)
+
+            chunk = compressor.compress(body)
+            if not more_body:
+                chunk += compressor.flush()
+            await send({"type": "http.response.body", "body": chunk, "more_body": more_body})
+
+        await self.app(scope, receive, send_wrapper)
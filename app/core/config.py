@@ -0,0 +1,121 @@
+from pydantic_settings import BaseSettings, SettingsConfigDict
+
+
+class Settings(BaseSettings):
+    """Runtime configuration, read from environment variables (or a .env file)."""
+
+    model_config = SettingsConfigDict(env_file=".env", extra="ignore")
+
+    # Use sqlite for local dev
+    database_url: str = "sqlite:///./biometric.db"
+    # Serve the hot endpoints with async def + AsyncSession (asyncpg on Postgres)
+    db_async: bool = False
+    # Log every SQL statement (very noisy, local debugging only)
+    db_echo: bool = False
+
+    # Worker startup. "migrate": each worker applies pending migrations (one at a
+    # time, under the migration lock). "verify": workers only check the schema
+    # version stamp and refuse to start when it is behind; run `python migrate.py`
+    # once as the pre-start command.
+    schema_setup: str = "migrate"
+    # Face index: built "background" after startup, at "startup" before serving,
+    # or "lazy" on the first /employees/identify
+    face_index_load: str = "background"
+    # How often /employees/identify pulls other workers' enrolments and deletes
+    # into this worker's face index (0: before every identify)
+    face_index_refresh_seconds: float = 1.0
+
+    # Request/SQL instrumentation and the Prometheus /metrics endpoint
+    metrics_enabled: bool = True
+    # Log requests slower than this with the statements they ran (0 disables)
+    slow_request_ms: float = 0
+    slow_request_max_statements: int = 50
+
+    # Postgres connection pool
+    db_pool_size: int = 10
+    db_max_overflow: int = 20
+    db_pool_timeout: float = 30.0  # seconds to wait for a free connection
+    db_pool_recycle: int = 1800  # seconds, stay under provider idle timeouts
+    db_pool_pre_ping: bool = True
+
+    # SQLite
+    sqlite_wal: bool = True
+    sqlite_busy_timeout_ms: int = 5000
+
+    # Branches without their own timezone use this one (IANA name)
+    default_timezone: str = "America/Mexico_City"
+    # Zone the old naive attendance timestamps were written in (backfill to UTC)
+    legacy_timezone: str = "America/Mexico_City"
+
+    # Reject punches whose coordinates fall outside the branch radius
+    # (when false they are only stored)
+    geofence_enforce: bool = True
+
+    # Write-behind punch ingestion (POST /attendance/queue): local durable queue
+    # drained into the main database in batches by a background worker
+    attendance_queue_enabled: bool = False
+    attendance_queue_path: str = "./attendance_queue.db"
+    attendance_queue_batch_size: int = 500
+    attendance_queue_poll_ms: int = 200
+    # Failed drains back off exponentially from the poll interval up to this
+    attendance_queue_retry_max_seconds: float = 60
+    # Processed entries stay queryable by key this long
+    attendance_queue_retention_hours: float = 24
+
+    # Attendance archival: months older than the newest HOT_MONTHS (current one
+    # included) move from the table into compressed columnar files here
+    attendance_archive_dir: str = "./archive"
+    attendance_hot_months: int = 3
+    # Archived months kept decoded in memory for reads
+    attendance_archive_cache_months: int = 6
+    # Postgres: monthly partitions created ahead of time
+    attendance_partition_months_ahead: int = 3
+
+    # Live attendance stream (GET /attendance/stream, server-sent events)
+    # Recent events kept in memory so a reconnecting dashboard resumes from Last-Event-ID
+    attendance_stream_history: int = 10000
+    # Per-dashboard buffer; one that falls this far behind is disconnected and resumes
+    attendance_stream_buffer: int = 1000
+    attendance_stream_heartbeat_seconds: float = 15
+    # Streams end after this and the client reconnects (also bounds a graceful shutdown)
+    attendance_stream_max_seconds: float = 300
+    # Relay events to the other workers: "none", "local" or a registered channel
+    attendance_stream_channel: str = "none"
+
+    # Punctuality reports: minutes after the scheduled check-in still counted as on time
+    report_grace_minutes: int = 10
+
+    # In-process read cache for branch/employee lookups
+    cache_max_entries: int = 10000
+    cache_ttl_seconds: float = 300.0
+    # Cross-worker invalidation: "none" (TTL only), "local" or a registered channel
+    cache_invalidation_channel: str = "none"
+    # Without a cross-process channel the other workers only see a change (a
+    # deleted employee, a new roster) when their entry expires, so with several
+    # workers the TTL is capped to this
+    cache_ttl_multi_worker_seconds: float = 2.0
+
+    # Response compression (br when the client accepts it and brotli is installed, else gzip)
+    compression_enabled: bool = True
+    # Smaller bodies are sent as is, compressing them costs more than it saves
+    compression_min_bytes: int = 1024
+    # Low levels: most of the ratio for a fraction of the CPU of the max settings
+    gzip_level: int = 5
+    brotli_quality: int = 4
+    # max-age for kiosk-facing reads (branches, roster); 0 = always revalidate
+    http_cache_max_age: int = 0
+
+    # Employee photos (content-addressed blob store)
+    photo_store_backend: str = "local"
+    photo_store_dir: str = "./photos"
+    photo_max_bytes: int = 5 * 1024 * 1024
+
+    @property
+    def sqlalchemy_database_url(self) -> str:
+        # Fix for postgres protocol if needed (some providers use postgres:// instead of postgresql://)
+        if self.database_url.startswith("postgres://"):
+            return self.database_url.replace("postgres://", "postgresql://", 1)
+        return self.database_url
+
+
+settings = Settings()
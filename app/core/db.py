@@ -1,124 +1,148 @@
-from sqlmodel import create_engine, SQLModel, Session
-import os
-
-# Get DB URL from env or use sqlite for local dev
-DATABASE_URL = os.getenv("DATABASE_URL", "sqlite:///./biometric.db")
-
-# Fix for postgres protocol if needed (some providers use postgres:// instead of postgresql://)
-if DATABASE_URL and DATABASE_URL.startswith("postgres://"):
-    DATABASE_URL = DATABASE_URL.replace("postgres://", "postgresql://", 1)
-
-engine = create_engine(DATABASE_URL, echo=True)
-
-from sqlalchemy import text
-
-def run_migrations():
-    results = []
-    
-    # Run cleanup in its own transaction first
-    try:
-        with engine.connect() as conn:
-            if "postgres" in str(engine.url) or "postgresql" in str(engine.url):
-                try:
-                    # Fix: Cast to TEXT before using LIKE operator since work_schedule might be JSON or UNKNOWN
-                    conn.execute(text("UPDATE employee SET work_schedule = NULL WHERE work_schedule::text NOT LIKE '{%' AND work_schedule::text NOT LIKE '[%';"))
-                    conn.commit()
-                    results.append("🧹 Cleaned up invalid work_schedule data (set to NULL)")
-                except Exception as e_clean:
-                    results.append(f"⚠️ Cleanup warning: {e_clean}")
-    except Exception as e:
-        results.append(f"⚠️ Cleanup Connection error: {e}")
-
-    # Run remaining migrations in a new connection/transaction
-    try:
-        with engine.connect() as conn:
-            # Branches
-            try:
-                conn.execute(text("ALTER TABLE branch ADD COLUMN IF NOT EXISTS phone VARCHAR;"))
-                conn.commit()
-                results.append("✅ Added phone to branch")
-            except Exception as e: 
-                results.append(f"⚠️ phone error: {e}")
-                # Don't abort entire block, continue
-
-            try:
-                conn.execute(text("ALTER TABLE branch ADD COLUMN IF NOT EXISTS city VARCHAR;"))
-                conn.commit()
-                results.append("✅ Added city to branch")
-            except Exception as e: results.append(f"⚠️ city error: {e}")
-
-            try:
-                conn.execute(text("ALTER TABLE branch ADD COLUMN IF NOT EXISTS code VARCHAR;"))
-                conn.commit()
-                results.append("✅ Added code to branch")
-            except Exception as e: results.append(f"⚠️ code error: {e}")
-            
-            # Employees
-            try:
-                conn.execute(text("ALTER TABLE employee ADD COLUMN IF NOT EXISTS position VARCHAR;"))
-                conn.commit()
-                results.append("✅ Added position to employee")
-            except Exception as e: results.append(f"⚠️ position error: {e}")
-
-            try:
-                conn.execute(text("ALTER TABLE employee ADD COLUMN IF NOT EXISTS department VARCHAR;"))
-                conn.commit()
-                results.append("✅ Added department to employee")
-            except Exception as e: results.append(f"⚠️ department error: {e}")
-
-            try:
-                # 1. work_schedule
-                conn.execute(text("ALTER TABLE employee ADD COLUMN IF NOT EXISTS work_schedule JSON;"))
-                conn.commit()
-                results.append("✅ Added work_schedule (JSON) to employee")
-            except Exception as e: results.append(f"⚠️ work_schedule error: {e}")
-
-            try:
-                # 2. photo_url
-                conn.execute(text("ALTER TABLE employee ADD COLUMN IF NOT EXISTS photo_url TEXT;"))
-                conn.commit()
-                results.append("✅ Added photo_url (TEXT) to employee")
-            except Exception as e: results.append(f"⚠️ photo_url error: {e}")
-
-            try:
-                # 3. face_embedding
-                conn.execute(text("ALTER TABLE employee ADD COLUMN IF NOT EXISTS face_embedding JSON;"))
-                conn.commit()
-                results.append("✅ Added face_embedding (JSON) to employee")
-            except Exception as e: results.append(f"⚠️ face_embedding error: {e}")
-
-            # FIX: Force ALTER columns
-            if "postgres" in str(engine.url) or "postgresql" in str(engine.url):
-                try:
-                    conn.execute(text("ALTER TABLE employee ALTER COLUMN photo_url TYPE TEXT;"))
-                    conn.commit()
-                    results.append("✅ photo_url forced to TEXT")
-                except Exception as e: results.append(f"⚠️ photo_url type error: {e}")
-
-                try:
-                    conn.execute(text("ALTER TABLE employee ALTER COLUMN work_schedule TYPE JSON USING work_schedule::json;"))
-                    conn.commit()
-                    results.append("✅ work_schedule forced to JSON")
-                except Exception as e: results.append(f"⚠️ work_schedule type error: {e}")
-                
-                try:
-                    conn.execute(text("ALTER TABLE employee ALTER COLUMN face_embedding TYPE JSON USING face_embedding::json;"))
-                    conn.commit()
-                    results.append("✅ face_embedding forced to JSON")
-                except Exception as e: results.append(f"⚠️ face_embedding type error: {e}")
-
-            results.append("🏁 Migration run complete")
-    except Exception as e:
-        results.append(f"❌ Critical migration error: {e}")
-    
-    return results
-
-def init_db():
-    SQLModel.metadata.create_all(engine)
-    logs = run_migrations()
+from sqlalchemy import event
+from sqlalchemy.pool import QueuePool
+from sqlalchemy.ext.asyncio import create_async_engine
+from sqlmodel import create_engine, Session
+from sqlmodel.ext.asyncio.session import AsyncSession
+from app.core.config import Settings, settings
+
+DATABASE_URL = settings.sqlalchemy_database_url
+
+def sqlite_pragmas(config: Settings, url: str):
+    in_memory = url.split("?")[0].endswith((":memory:", "sqlite://"))
+
+    def set_sqlite_pragmas(dbapi_connection, connection_record):
+        cursor = dbapi_connection.cursor()
+        # WAL lets readers proceed while a punch is being written
+        if config.sqlite_wal and not in_memory:
+            cursor.execute("PRAGMA journal_mode=WAL")
+            cursor.execute("PRAGMA synchronous=NORMAL")
+        cursor.execute(f"PRAGMA busy_timeout={int(config.sqlite_busy_timeout_ms)}")
+        cursor.close()
+
+    return set_sqlite_pragmas
+
+def make_engine(config: Settings = settings, url: str = None):
+    url = url or config.sqlalchemy_database_url
+
+    if url.startswith("sqlite"):
+        engine = create_engine(
+            url,
+            echo=config.db_echo,
+            connect_args={"check_same_thread": False, "timeout": config.sqlite_busy_timeout_ms / 1000},
+        )
+        event.listen(engine, "connect", sqlite_pragmas(config, url))
+        return engine
+
+    return create_engine(
+        url,
+        echo=config.db_echo,
+        pool_size=config.db_pool_size,
+        max_overflow=config.db_max_overflow,
+        pool_timeout=config.db_pool_timeout,
+        pool_recycle=config.db_pool_recycle,
+        pool_pre_ping=config.db_pool_pre_ping,
+    )
+
+engine = make_engine()
+
+def async_database_url(url: str) -> str:
+    for prefix in ("postgresql+psycopg2://", "postgresql://"):
+        if url.startswith(prefix):
+            return url.replace(prefix, "postgresql+asyncpg://", 1)
+    if url.startswith("sqlite://"):
+        # Needs the optional aiosqlite package; production runs on Postgres
+        return url.replace("sqlite://", "sqlite+aiosqlite://", 1)
+    return url
+
+def make_async_engine(config: Settings = settings):
+    url = async_database_url(config.sqlalchemy_database_url)
+
+    if url.startswith("sqlite"):
+        async_engine = create_async_engine(url, echo=config.db_echo, connect_args={"timeout": config.sqlite_busy_timeout_ms / 1000})
+        event.listen(async_engine.sync_engine, "connect", sqlite_pragmas(config, url))
+        return async_engine
+
+    return create_async_engine(
+        url,
+        echo=config.db_echo,
+        pool_size=config.db_pool_size,
+        max_overflow=config.db_max_overflow,
+        pool_timeout=config.db_pool_timeout,
+        pool_recycle=config.db_pool_recycle,
+        pool_pre_ping=config.db_pool_pre_ping,
+    )
+
+# Only built when async mode is on, so the sync deployment never imports asyncpg
+async_engine = make_async_engine() if settings.db_async else None
+
+def pool_status():
+    """Snapshot of connection pool usage, to spot saturation under load."""
+    pool = engine.pool
+    if not isinstance(pool, QueuePool):
+        return {"pool": type(pool).__name__}
+    max_overflow = pool._max_overflow
+    # A negative max_overflow means the pool may grow without limit
+    capacity = pool.size() + max_overflow if max_overflow >= 0 else None
+    checked_out = pool.checkedout()
+    return {
+        "pool": type(pool).__name__,
+        "size": pool.size(),
+        "max_overflow": max_overflow,
+        "checked_in": pool.checkedin(),
+        "checked_out": checked_out,
+        "overflow": pool.overflow(),
+        "utilization": round(checked_out / capacity, 3) if capacity else None,
+        "saturated": bool(capacity) and checked_out >= capacity,
+    }
+
+from app.core.migrations import run_migrations, verify_schema
+from app.core.partitions import ensure_partitions
+
+def init_db(setup: str = None):
+    if (setup or settings.schema_setup) == "verify":
+        # Migrations ran once before the workers started (migrate.py)
+        for log in verify_schema(engine):
+            print(log)
+        return
+    # Versioned migrations: only pending steps run, in one locked transaction
+    logs = run_migrations(engine)
+    if engine.dialect.name == "postgresql":
+        # Upcoming monthly attendance partitions (no-op when they exist)
+        with engine.begin() as conn:
+            logs += [f"✅ Created partition {name}" for name in ensure_partitions(conn)]
     for log in logs:
         print(log)
 
+def dialect_insert(model):
+    if engine.dialect.name == "postgresql":
+        from sqlalchemy.dialects.postgresql import insert
+    else:
+        from sqlalchemy.dialects.sqlite import insert
+    return insert(model)
+
+def insert_ignore(model, index_elements):
+    """INSERT ... ON CONFLICT (index_elements) DO NOTHING for the active dialect."""
+    return dialect_insert(model).on_conflict_do_nothing(index_elements=index_elements)
+
+def insert_or_update(model, index_elements, values: dict):
+    """INSERT ... ON CONFLICT (index_elements) DO UPDATE with the non-key values."""
+    statement = dialect_insert(model).values(**values)
+    update = {k: statement.excluded[k] for k in values if k not in index_elements}
+    return statement.on_conflict_do_update(index_elements=index_elements, set_=update)
+
+def insert_or_update_many(model, index_elements, columns, skip_on_update=()):
+    """
+    INSERT ... ON CONFLICT DO UPDATE for an executemany with `columns` keys;
+    columns in skip_on_update (e.g. created_at) are only written on insert.
+    """
+    statement = dialect_insert(model)
+    update = {c: statement.excluded[c] for c in columns if c not in index_elements and c not in skip_on_update}
+    return statement.on_conflict_do_update(index_elements=index_elements, set_=update)
+
 def get_session():
     with Session(engine) as session:
         yield session
+
+async def get_async_session():
+    async with AsyncSession(async_engine, expire_on_commit=False) as session:
+        yield session
@@ -0,0 +1,156 @@
+import asyncio
+import threading
+import uuid
+from collections import deque
+from typing import Dict, Iterable, List, NamedTuple, Optional, Set, Tuple
+
+from app.core.cache import INVALIDATION_CHANNELS, InvalidationChannel
+from app.core.config import settings
+from app.core.serialization import dumps
+
+
+class Event(NamedTuple):
+    seq: int  # broker order (commit order as seen by this worker)
+    id: int  # attendance id, sent as the SSE event id
+    branch_id: int
+    frame: bytes  # encoded once, written as-is to every subscriber
+
+
+def sse_frame(event_id: int, data: dict, event: str = "attendance") -> bytes:
+    return b"id: %d\nevent: %s\ndata: %s\n\n" % (event_id, event.encode(), dumps(data))
+
+
+class Subscriber:
+    def __init__(self, branch_id: Optional[int], buffer: int, after_seq: int):
+        self.branch_id = branch_id
+        self.queue: "asyncio.Queue[Optional[Event]]" = asyncio.Queue(maxsize=buffer)
+        # Events up to here were in the history snapshot taken at subscribe time
+        self.after_seq = after_seq
+        self.overflowed = False
+
+    def wants(self, event: Event) -> bool:
+        return event.seq > self.after_seq and (self.branch_id is None or event.branch_id == self.branch_id)
+
+
+class EventBroker:
+    """
+    In-process fan-out of attendance events to streaming dashboards.
+
+    Writers publish after their commit, from any thread; each event is
+    encoded once and handed to every matching subscriber's bounded queue on
+    the event loop. A subscriber that falls a whole buffer behind is cut
+    off (its stream ends) rather than buffered without limit; the client
+    reconnects with Last-Event-ID and is replayed from the recent history.
+    Nothing here touches the database.
+
+    With an invalidation channel (ATTENDANCE_STREAM_CHANNEL) events are also
+    relayed to the brokers of the other workers.
+    """
+
+    def __init__(self, history: int, buffer: int, channel: Optional[InvalidationChannel] = None):
+        self.buffer = buffer
+        self.origin = uuid.uuid4().hex
+        self._history: "deque[Event]" = deque(maxlen=history)
+        self._subscribers: Set[Subscriber] = set()
+        self._lock = threading.Lock()
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._seq = 0
+        self.published = 0
+        self.overflows = 0
+        self.channel = channel
+        if channel is not None:
+            channel.subscribe(self._on_message)
+
+    # --- Publishing ---------------------------------------------------------
+
+    def publish(self, items: Iterable[Tuple[int, int, dict]]):
+        """(attendance_id, branch_id, JSON-able payload) for every committed punch."""
+        items = list(items)
+        if not items:
+            return
+        self._publish_local(items)
+        if self.channel is not None:
+            try:
+                self.channel.publish({"origin": self.origin, "events": items})
+            except Exception as e:
+                # Local subscribers got it; other workers' dashboards catch up on reconnect
+                print(f"⚠️ Attendance event publish failed: {e}")
+
+    def _on_message(self, message: dict):
+        if message.get("origin") != self.origin and message.get("events"):
+            self._publish_local([tuple(item) for item in message["events"]])
+
+    def _publish_local(self, items: List[Tuple[int, int, dict]]):
+        with self._lock:
+            events = []
+            for attendance_id, branch_id, data in items:
+                self._seq += 1
+                events.append(Event(self._seq, attendance_id, branch_id, sse_frame(attendance_id, data)))
+            self._history.extend(events)
+            self.published += len(events)
+            loop = self._loop if self._subscribers else None
+        if loop is not None and not loop.is_closed():
+            loop.call_soon_threadsafe(self._fan_out, events)
+
+    def _fan_out(self, events: List[Event]):
+        # On the event loop thread only, where the queues live
+        for subscriber in list(self._subscribers):
+            for event in events:
+                if not subscriber.wants(event):
+                    continue
+                try:
+                    subscriber.queue.put_nowait(event)
+                except asyncio.QueueFull:
+                    self._cut_off(subscriber)
+                    break
+
+    def _cut_off(self, subscriber: Subscriber):
+        with self._lock:
+            self._subscribers.discard(subscriber)
+            self.overflows += 1
+        subscriber.overflowed = True
+        # Whatever is buffered is replayed on reconnect; the sentinel ends the stream now
+        while not subscriber.queue.empty():
+            subscriber.queue.get_nowait()
+        subscriber.queue.put_nowait(None)
+
+    # --- Subscribing --------------------------------------------------------
+
+    def subscribe(self, branch_id: Optional[int] = None, last_event_id: Optional[int] = None) -> Tuple[Subscriber, Optional[List[Event]]]:
+        """
+        Register a subscriber (call from the event loop). Also returns the
+        events after `last_event_id` from the history, or None when that id
+        is no longer (or was never) in it and the caller must catch up itself.
+        """
+        loop = asyncio.get_running_loop()
+        with self._lock:
+            self._loop = loop
+            history = list(self._history)
+            subscriber = Subscriber(branch_id, self.buffer, history[-1].seq if history else self._seq)
+            self._subscribers.add(subscriber)
+        if last_event_id is None:
+            return subscriber, []
+        for position in range(len(history) - 1, -1, -1):
+            if history[position].id == last_event_id:
+                return subscriber, [e for e in history[position + 1:] if branch_id is None or e.branch_id == branch_id]
+        return subscriber, None
+
+    def unsubscribe(self, subscriber: Subscriber):
+        with self._lock:
+            self._subscribers.discard(subscriber)
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return {
+                "subscribers": len(self._subscribers),
+                "history": len(self._history),
+                "published": self.published,
+                "overflows": self.overflows,
+            }
+
+
+attendance_events = EventBroker(
+    settings.attendance_stream_history,
+    settings.attendance_stream_buffer,
+    INVALIDATION_CHANNELS[settings.attendance_stream_channel](),
+)
@@ -0,0 +1,226 @@
+import threading
+import time
+from datetime import datetime, timedelta
+from typing import Dict, List, Optional, Sequence, Set, Tuple
+
+import numpy as np
+from sqlmodel import Session, func, select
+
+from app.models.models import Employee
+
+
+class FaceIndex:
+    """
+    In-memory 1:N face matching index.
+
+    Embeddings are L2-normalised and kept as rows of a float32 matrix so a
+    lookup is a single matrix-vector product (cosine similarity). Rows are
+    updated in place when an employee is enrolled/updated and swap-removed
+    on delete, so the index never has to be rebuilt after startup.
+
+    Each worker has its own copy and only sees its own writes directly;
+    `refresh` pulls the other workers' changes from the database (rows
+    whose updated_at moved, plus hard deletes).
+    """
+
+    # Rows committed a little after a newer updated_at was seen are still picked up
+    REFRESH_OVERLAP = timedelta(seconds=5)
+
+    def __init__(self, initial_capacity: int = 1024):
+        self._lock = threading.RLock()
+        self._refresh_lock = threading.Lock()
+        self._initial_capacity = initial_capacity
+        self._loaded = False
+        self._high_water: Optional[datetime] = None
+        self._refreshed_at = 0.0
+        # Active employees with an embedding that cannot be indexed (wrong dim, zero norm)
+        self._skipped: Set[int] = set()
+        self._reset()
+
+    def _reset(self, dim: Optional[int] = None):
+        self.dim = dim
+        self._size = 0
+        self._matrix = None if dim is None else np.empty((self._initial_capacity, dim), dtype=np.float32)
+        self._employee_ids = np.empty(self._initial_capacity, dtype=np.int64)
+        self._branch_ids = np.empty(self._initial_capacity, dtype=np.int64)
+        self._rows: Dict[int, int] = {}  # employee_id -> row
+
+    def __len__(self) -> int:
+        return self._size
+
+    @property
+    def loaded(self) -> bool:
+        return self._loaded
+
+    @staticmethod
+    def _normalize(embedding: Sequence[float]) -> Optional[np.ndarray]:
+        vector = np.asarray(embedding, dtype=np.float32).reshape(-1)
+        norm = float(np.linalg.norm(vector))
+        if vector.size == 0 or not np.isfinite(norm) or norm == 0.0:
+            return None
+        return vector / norm
+
+    def _grow(self):
+        capacity = self._employee_ids.shape[0] * 2
+        matrix = np.empty((capacity, self.dim), dtype=np.float32)
+        matrix[:self._size] = self._matrix[:self._size]
+        self._matrix = matrix
+        self._employee_ids = np.resize(self._employee_ids, capacity)
+        self._branch_ids = np.resize(self._branch_ids, capacity)
+
+    def load(self, session: Session):
+        """(Re)build the index from every active employee with an embedding."""
+        statement = select(Employee.id, Employee.branch_id, Employee.face_embedding).where(
+            Employee.is_active == True,  # noqa: E712
+            Employee.face_embedding.is_not(None),
+        )
+        started = time.perf_counter()
+        high_water = session.exec(select(func.max(Employee.updated_at))).one()
+        rows = session.exec(statement).all()
+        with self._lock:
+            self._reset()
+            self._skipped.clear()
+            for employee_id, branch_id, embedding in rows:
+                self._upsert(employee_id, branch_id, embedding)
+            self._high_water = high_water
+            self._refreshed_at = time.monotonic()
+            self._loaded = True
+        print(f"🧠 Face index loaded: {self._size} embeddings (dim={self.dim}) in {time.perf_counter() - started:.2f}s")
+
+    def ensure_loaded(self, session: Session):
+        if not self._loaded:
+            with self._lock:
+                if not self._loaded:
+                    self.load(session)
+
+    def refresh(self, session: Session, interval: float = 0.0):
+        """
+        Apply changes committed since the last load/refresh, at most once per
+        `interval` seconds: employees whose updated_at passed the high-water
+        mark are re-read, and when the number of active employees with an
+        embedding then differs from the indexed plus skipped ones (hard
+        deletes), the ids are reconciled.
+        """
+        if not self._loaded or time.monotonic() - self._refreshed_at < interval:
+            return
+        if not self._refresh_lock.acquire(blocking=False):
+            return  # another request is already refreshing
+        try:
+            self._refreshed_at = time.monotonic()
+            statement = select(Employee.id, Employee.branch_id, Employee.face_embedding, Employee.is_active, Employee.updated_at)
+            if self._high_water is not None:
+                statement = statement.where(Employee.updated_at >= self._high_water - self.REFRESH_OVERLAP)
+            changed = session.exec(statement).all()
+            active = (Employee.is_active == True) & Employee.face_embedding.is_not(None)  # noqa: E712
+            count = session.exec(select(func.count()).select_from(Employee).where(active)).one()
+            with self._lock:
+                for employee_id, branch_id, embedding, is_active, updated_at in changed:
+                    self.upsert(employee_id, branch_id, embedding, is_active)
+                    if updated_at is not None and (self._high_water is None or updated_at > self._high_water):
+                        self._high_water = updated_at
+                known = self._size + len(self._skipped)
+            if count != known:
+                ids = set(session.exec(select(Employee.id).where(active)).all())
+                with self._lock:
+                    for employee_id in [e for e in self._rows if e not in ids]:
+                        self._remove(employee_id)
+                    self._skipped &= ids
+        finally:
+            self._refresh_lock.release()
+
+    def upsert(self, employee_id: int, branch_id: Optional[int], embedding: Optional[Sequence[float]], is_active: bool = True):
+        """Add or replace an employee's embedding. Inactive or empty embeddings are removed."""
+        with self._lock:
+            if not self._loaded:
+                # The first lookup will pull the committed state from the DB
+                return
+            if embedding is None or not is_active:
+                self._remove(employee_id)
+                return
+            self._upsert(employee_id, branch_id, embedding)
+
+    def _upsert(self, employee_id: int, branch_id: Optional[int], embedding: Sequence[float]):
+        vector = self._normalize(embedding)
+        if vector is None:
+            self._skip(employee_id)
+            return
+        if self.dim is None:
+            self._reset(vector.shape[0])
+        if vector.shape[0] != self.dim:
+            if employee_id not in self._skipped:
+                print(f"⚠️ Face index: skipping employee {employee_id}, embedding dim {vector.shape[0]} != {self.dim}")
+            self._skip(employee_id)
+            return
+        self._skipped.discard(employee_id)
+
+        row = self._rows.get(employee_id)
+        if row is None:
+            if self._size == self._employee_ids.shape[0]:
+                self._grow()
+            row = self._size
+            self._size += 1
+            self._rows[employee_id] = row
+        self._matrix[row] = vector
+        self._employee_ids[row] = employee_id
+        self._branch_ids[row] = -1 if branch_id is None else branch_id
+
+    def remove(self, employee_id: int):
+        with self._lock:
+            self._remove(employee_id)
+
+    def _skip(self, employee_id: int):
+        self._remove(employee_id)
+        self._skipped.add(employee_id)
+
+    def _remove(self, employee_id: int):
+        self._skipped.discard(employee_id)
+        row = self._rows.pop(employee_id, None)
+        if row is None:
+            return
+        last = self._size - 1
+        if row != last:
+            # Move the last row into the hole to keep the matrix dense
+            self._matrix[row] = self._matrix[last]
+            self._employee_ids[row] = self._employee_ids[last]
+            self._branch_ids[row] = self._branch_ids[last]
+            self._rows[int(self._employee_ids[row])] = row
+        self._size = last
+
+    def search(self, embedding: Sequence[float], top_k: int = 5, branch_id: Optional[int] = None, min_score: Optional[float] = None) -> List[Tuple[int, float]]:
+        """Return up to `top_k` (employee_id, cosine similarity) pairs, best first."""
+        probe = self._normalize(embedding)
+        if probe is None:
+            raise ValueError("Probe embedding is empty or has zero norm")
+
+        with self._lock:
+            if self._size == 0:
+                return []
+            if probe.shape[0] != self.dim:
+                raise ValueError(f"Probe embedding has dimension {probe.shape[0]}, expected {self.dim}")
+
+            scores = self._matrix[:self._size] @ probe
+            employee_ids = self._employee_ids[:self._size]
+            if branch_id is not None:
+                mask = self._branch_ids[:self._size] == branch_id
+                scores = scores[mask]
+                employee_ids = employee_ids[mask]
+            # Copy out before releasing the lock; rows may move afterwards
+            scores = np.array(scores, copy=True)
+            employee_ids = np.array(employee_ids, copy=True)
+
+        if scores.size == 0:
+            return []
+        k = min(top_k, scores.size)
+        candidates = np.argpartition(-scores, k - 1)[:k]
+        candidates = candidates[np.argsort(-scores[candidates])]
+
+        matches = []
+        for i in candidates:
+            score = float(scores[i])
+            if min_score is not None and score < min_score:
+                break
+            matches.append((int(employee_ids[i]), score))
+        return matches
+
+
+face_index = FaceIndex()
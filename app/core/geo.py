@@ -0,0 +1,137 @@
+import math
+from collections import defaultdict
+from typing import Dict, List, Optional, Tuple
+
+from sqlmodel import Session
+
+from app.core.cache import branch_cache, cached_branches
+from app.models.models import Branch
+
+EARTH_RADIUS_M = 6371008.8
+METERS_PER_DEGREE = 111320.0
+# Grid cell edge in degrees (~5.5 km of latitude)
+CELL_DEGREES = 0.05
+# Past this many rings (~350 km) a linear scan of the fences is cheaper
+MAX_RINGS = 64
+
+
+def haversine_m(lat1: float, lon1: float, lat2: float, lon2: float) -> float:
+    """Great-circle distance in meters."""
+    phi1, phi2 = math.radians(lat1), math.radians(lat2)
+    dphi = phi2 - phi1
+    dlambda = math.radians(lon2 - lon1)
+    a = math.sin(dphi / 2) ** 2 + math.cos(phi1) * math.cos(phi2) * math.sin(dlambda / 2) ** 2
+    return 2 * EARTH_RADIUS_M * math.asin(math.sqrt(min(1.0, a)))
+
+
+def is_valid_point(latitude: Optional[float], longitude: Optional[float]) -> bool:
+    return (
+        latitude is not None and longitude is not None
+        and -90.0 <= latitude <= 90.0 and -180.0 <= longitude <= 180.0
+    )
+
+
+class Fence:
+    """A branch's circle plus its bounding box, so most misses never reach haversine."""
+
+    __slots__ = ("branch", "latitude", "longitude", "radius", "min_lat", "max_lat", "min_lon", "max_lon")
+
+    def __init__(self, branch: Branch):
+        self.branch = branch
+        self.latitude = branch.latitude
+        self.longitude = branch.longitude
+        self.radius = branch.radius
+        dlat = self.radius / METERS_PER_DEGREE
+        # Longitude degrees shrink with latitude; clamp near the poles
+        dlon = self.radius / (METERS_PER_DEGREE * max(math.cos(math.radians(self.latitude)), 1e-6))
+        self.min_lat, self.max_lat = self.latitude - dlat, self.latitude + dlat
+        self.min_lon, self.max_lon = self.longitude - dlon, self.longitude + dlon
+
+    def distance_m(self, latitude: float, longitude: float) -> float:
+        return haversine_m(self.latitude, self.longitude, latitude, longitude)
+
+    def contains(self, latitude: float, longitude: float) -> bool:
+        if not (self.min_lat <= latitude <= self.max_lat and self.min_lon <= longitude <= self.max_lon):
+            return False
+        return self.distance_m(latitude, longitude) <= self.radius
+
+
+class GeoIndex:
+    """
+    Uniform lat/lon grid over every branch with coordinates. A nearest
+    lookup scans rings of cells outwards from the point and stops once the
+    next ring can't hold anything closer than the best match so far.
+    """
+
+    def __init__(self, branches: List[Branch], cell_degrees: float = CELL_DEGREES):
+        self.cell = cell_degrees
+        self.fences: Dict[int, Fence] = {}
+        self._grid: Dict[Tuple[int, int], List[Fence]] = defaultdict(list)
+        for branch in branches:
+            if not is_valid_point(branch.latitude, branch.longitude):
+                continue
+            fence = Fence(branch)
+            self.fences[branch.id] = fence
+            self._grid[self._cell(fence.latitude, fence.longitude)].append(fence)
+        rows = [key[0] for key in self._grid] or [0]
+        cols = [key[1] for key in self._grid] or [0]
+        self._bounds = (min(rows), max(rows), min(cols), max(cols))
+
+    def __len__(self) -> int:
+        return len(self.fences)
+
+    def _cell(self, latitude: float, longitude: float) -> Tuple[int, int]:
+        return math.floor(latitude / self.cell), math.floor(longitude / self.cell)
+
+    def _ring(self, center: Tuple[int, int], k: int):
+        row, col = center
+        if k == 0:
+            yield center
+            return
+        for c in range(col - k, col + k + 1):
+            yield row - k, c
+            yield row + k, c
+        for r in range(row - k + 1, row + k):
+            yield r, col - k
+            yield r, col + k
+
+    def fence(self, branch_id: int) -> Optional[Fence]:
+        return self.fences.get(branch_id)
+
+    def nearest(self, latitude: float, longitude: float, max_distance_m: Optional[float] = None) -> Optional[Tuple[Fence, float]]:
+        """Closest branch to the point as (fence, distance in meters), or None."""
+        if not self.fences:
+            return None
+        center = self._cell(latitude, longitude)
+        min_row, max_row, min_col, max_col = self._bounds
+        # Rings beyond this one hold no branches at all
+        last_ring = max(abs(center[0] - min_row), abs(center[0] - max_row), abs(center[1] - min_col), abs(center[1] - max_col))
+
+        best, best_distance = None, math.inf
+        for k in range(min(last_ring, MAX_RINGS) + 1):
+            # Anything in ring k is at least k - 1 whole cells away on one axis
+            edge_lat = min(abs(latitude) + (k + 1) * self.cell, 89.9)
+            cell_m = self.cell * METERS_PER_DEGREE * math.cos(math.radians(edge_lat))
+            lower_bound = max(k - 1, 0) * cell_m
+            if lower_bound > best_distance or (max_distance_m is not None and lower_bound > max_distance_m):
+                break
+            for key in self._ring(center, k):
+                for fence in self._grid.get(key, ()):
+                    distance = fence.distance_m(latitude, longitude)
+                    if distance < best_distance:
+                        best, best_distance = fence, distance
+        else:
+            if last_ring > MAX_RINGS:
+                # Far from every cell scanned so far
+                for fence in self.fences.values():
+                    distance = fence.distance_m(latitude, longitude)
+                    if distance < best_distance:
+                        best, best_distance = fence, distance
+        if best is None or (max_distance_m is not None and best_distance > max_distance_m):
+            return None
+        return best, best_distance
+
+
+def geo_index(session: Session) -> GeoIndex:
+    # Lives in the branch cache, so any branch change rebuilds it on next use
+    return branch_cache.get_or_load("geo", lambda: GeoIndex(cached_branches(session)))
@@ -0,0 +1,75 @@
+import hashlib
+from datetime import datetime, timezone
+from email.utils import format_datetime, parsedate_to_datetime
+from typing import Optional
+
+from fastapi import Request, Response
+
+from app.core.config import settings
+
+
+def http_date(value: datetime) -> str:
+    # Naive timestamps (updated_at columns) are server local time
+    value = value.astimezone(timezone.utc) if value.tzinfo else value.astimezone().astimezone(timezone.utc)
+    return format_datetime(value.replace(microsecond=0), usegmt=True)
+
+
+def parse_http_date(value: Optional[str]) -> Optional[datetime]:
+    try:
+        parsed = parsedate_to_datetime(value) if value else None
+    except (TypeError, ValueError):
+        return None
+    if parsed is not None and parsed.tzinfo is None:
+        parsed = parsed.replace(tzinfo=timezone.utc)
+    return parsed
+
+
+def body_etag(body: bytes) -> str:
+    # Weak: the compression middleware re-encodes the body
+    return 'W/"' + hashlib.sha1(body).hexdigest() + '"'
+
+
+def cache_headers(etag: Optional[str] = None, last_modified: Optional[datetime] = None) -> dict:
+    """
+    Validators plus Cache-Control for kiosk-facing reads. The data is
+    per-deployment, so only private caches may keep it; with
+    HTTP_CACHE_MAX_AGE=0 clients must revalidate (cheap, see not_modified).
+    """
+    max_age = settings.http_cache_max_age
+    headers = {"Cache-Control": f"private, max-age={max_age}" if max_age > 0 else "private, no-cache"}
+    if etag:
+        headers["ETag"] = etag
+    if last_modified:
+        headers["Last-Modified"] = http_date(last_modified)
+    return headers
+
+
+def _opaque(tag: str) -> str:
+    tag = tag.strip()
+    return tag[2:] if tag.startswith("W/") else tag
+
+
+def etag_matches(request: Request, etag: str) -> bool:
+    # If-None-Match uses the weak comparison
+    header = request.headers.get("if-none-match")
+    if not header:
+        return False
+    return header.strip() == "*" or _opaque(etag) in [_opaque(tag) for tag in header.split(",")]
+
+
+def not_modified(request: Request, etag: Optional[str], last_modified: Optional[datetime] = None) -> bool:
+    """
+    Conditional GET check. If-None-Match wins when present; If-Modified-Since
+    is only consulted when a last_modified is passed, so callers whose
+    timestamp misses some changes (deletes) pass the ETag alone.
+    """
+    if etag and "if-none-match" in request.headers:
+        return etag_matches(request, etag)
+    if last_modified is None:
+        return False
+    since = parse_http_date(request.headers.get("if-modified-since"))
+    return since is not None and parse_http_date(http_date(last_modified)) <= since
+
+
+def not_modified_response(headers: dict) -> Response:
+    return Response(status_code=304, headers=headers)
@@ -0,0 +1,177 @@
+import bisect
+import threading
+import time
+from contextvars import ContextVar
+from typing import Dict, List, Optional, Sequence, Tuple
+
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+from app.core.config import settings
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+QUERY_COUNT_BUCKETS = (0, 1, 2, 3, 5, 10, 20, 50, 100)
+
+
+class Histogram:
+    """Cumulative-bucket histogram per label set, rendered in Prometheus text format."""
+
+    def __init__(self, name: str, help: str, labels: Sequence[str], buckets: Sequence[float]):
+        self.name = name
+        self.help = help
+        self.labels = tuple(labels)
+        self.buckets = tuple(buckets)
+        self._lock = threading.Lock()
+        self._series: Dict[tuple, list] = {}  # label values -> [bucket counts..., sum, count]
+
+    def observe(self, label_values: tuple, value: float):
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._series.get(label_values)
+            if series is None:
+                series = self._series[label_values] = [0] * (len(self.buckets) + 2)
+            if index < len(self.buckets):
+                series[index] += 1
+            series[-2] += value
+            series[-1] += 1
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} histogram"]
+        with self._lock:
+            series = {key: list(values) for key, values in self._series.items()}
+        for label_values, values in sorted(series.items()):
+            labels = ",".join(f'{k}="{escape(v)}"' for k, v in zip(self.labels, label_values))
+            prefix = labels + "," if labels else ""
+            cumulative = 0
+            for bound, count in zip(self.buckets, values):
+                cumulative += count
+                lines.append(f'{self.name}_bucket{{{prefix}le="{bound}"}} {cumulative}')
+            lines.append(f'{self.name}_bucket{{{prefix}le="+Inf"}} {values[-1]}')
+            lines.append(f"{self.name}_sum{{{labels}}} {values[-2]:.6f}")
+            lines.append(f"{self.name}_count{{{labels}}} {values[-1]}")
+        return lines
+
+
+def escape(value) -> str:
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+class RequestStats:
+    __slots__ = ("queries", "db_seconds", "statements")
+
+    def __init__(self, keep_statements: bool):
+        self.queries = 0
+        self.db_seconds = 0.0
+        self.statements: Optional[List[Tuple[str, float]]] = [] if keep_statements else None
+
+
+# Stats of the request being served. Starlette copies the context into the
+# threadpool, so sync endpoints and the async engine's greenlets see it too.
+current_request: ContextVar[Optional[RequestStats]] = ContextVar("current_request", default=None)
+
+request_duration = Histogram(
+    "http_request_duration_seconds", "Request latency by route.", ("method", "route", "status"), LATENCY_BUCKETS
+)
+request_queries = Histogram(
+    "http_request_db_queries", "SQL statements executed per request.", ("method", "route"), QUERY_COUNT_BUCKETS
+)
+request_db_time = Histogram(
+    "http_request_db_seconds", "Time spent in SQL statements per request.", ("method", "route"), LATENCY_BUCKETS
+)
+_db_totals = {"queries": 0, "seconds": 0.0}
+
+
+# --- SQLAlchemy hooks ---------------------------------------------------------
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    context._metrics_start = time.perf_counter()
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    elapsed = time.perf_counter() - context._metrics_start
+    # Unlocked: an occasional lost increment is fine for a running total
+    _db_totals["queries"] += 1
+    _db_totals["seconds"] += elapsed
+    stats = current_request.get()
+    if stats is not None:
+        stats.queries += 1
+        stats.db_seconds += elapsed
+        if stats.statements is not None and len(stats.statements) < settings.slow_request_max_statements:
+            stats.statements.append((statement, elapsed))
+
+
+def instrument_engine(engine: Engine):
+    event.listen(engine, "before_cursor_execute", _before_cursor_execute)
+    event.listen(engine, "after_cursor_execute", _after_cursor_execute)
+
+
+# --- ASGI middleware ----------------------------------------------------------
+
+class MetricsMiddleware:
+    """
+    Times every HTTP request (until the last body chunk is sent, so
+    streaming exports count in full) and records its SQL query count and
+    time. Routes are labelled by their path template to keep cardinality
+    bounded. Requests slower than SLOW_REQUEST_MS are logged with the
+    statements they ran.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        slow_ms = settings.slow_request_ms
+        stats = RequestStats(keep_statements=slow_ms > 0)
+        token = current_request.set(stats)
+        status = 500
+        start = time.perf_counter()
+
+        async def send_wrapper(message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            elapsed = time.perf_counter() - start
+            current_request.reset(token)
+            route = scope.get("route")
+            route_label = getattr(route, "path", None) or "unmatched"
+            method = scope["method"]
+            request_duration.observe((method, route_label, str(status)), elapsed)
+            request_queries.observe((method, route_label), stats.queries)
+            request_db_time.observe((method, route_label), stats.db_seconds)
+            if slow_ms > 0 and elapsed * 1000 >= slow_ms:
+                log_slow_request(method, scope.get("path", ""), status, elapsed, stats)
+
+
+def log_slow_request(method: str, path: str, status: int, elapsed: float, stats: RequestStats):
+    print(f"🐢 Slow request {method} {path} -> {status} in {elapsed * 1000:.1f} ms ({stats.queries} queries, {stats.db_seconds * 1000:.1f} ms in DB)")
+    for statement, seconds in stats.statements or ():
+        print(f"   {seconds * 1000:8.2f} ms  {' '.join(statement.split())[:300]}")
+    if stats.statements is not None and stats.queries > len(stats.statements):
+        print(f"   ... {stats.queries - len(stats.statements)} more")
+
+
+def render_metrics(pool: Optional[dict] = None) -> str:
+    lines = []
+    for histogram in (request_duration, request_queries, request_db_time):
+        lines.extend(histogram.render())
+    lines += [
+        "# HELP db_queries_total SQL statements executed.",
+        "# TYPE db_queries_total counter",
+        f"db_queries_total {_db_totals['queries']}",
+        "# HELP db_query_seconds_total Time spent in SQL statements.",
+        "# TYPE db_query_seconds_total counter",
+        f"db_query_seconds_total {_db_totals['seconds']:.6f}",
+    ]
+    if pool and "checked_out" in pool:
+        for key in ("size", "checked_in", "checked_out", "overflow"):
+            lines += [f"# TYPE db_pool_{key} gauge", f"db_pool_{key} {pool[key]}"]
+    return "\n".join(lines) + "\n"
@@ -0,0 +1,391 @@
+from contextlib import contextmanager
+from datetime import datetime, timezone
+import json
+
+from sqlalchemy import DateTime, bindparam, inspect, text
+from sqlalchemy.engine import Connection, Engine
+from sqlalchemy.exc import DBAPIError
+from sqlmodel import SQLModel
+
+import app.models.models  # noqa: F401  (registers every table on SQLModel.metadata)
+
+# Arbitrary key for pg_advisory_xact_lock, shared by every worker
+MIGRATION_LOCK_ID = 72419001
+
+
+def is_postgres(conn: Connection) -> bool:
+    return conn.dialect.name == "postgresql"
+
+
+def add_column(conn: Connection, table: str, column: str, ddl_type: str) -> bool:
+    # SQLite has no ADD COLUMN IF NOT EXISTS, so inspect first
+    columns = {c["name"] for c in inspect(conn).get_columns(table)}
+    if column in columns:
+        return False
+    conn.execute(text(f"ALTER TABLE {table} ADD COLUMN {column} {ddl_type}"))
+    return True
+
+
+# --- Migration steps -------------------------------------------------------
+# Each step receives a connection that is already inside the migration
+# transaction and returns a list of log lines. Steps only run on databases
+# created before they existed, so they must cope with partially-migrated
+# legacy schemas (the old startup ALTER cascade applied some of them).
+
+def branch_contact_columns(conn: Connection):
+    return [f"✅ Added {column} to branch" for column in ("phone", "city", "code") if add_column(conn, "branch", column, "VARCHAR")]
+
+
+def employee_profile_columns(conn: Connection):
+    results = []
+    for column, ddl_type in [
+        ("position", "VARCHAR"),
+        ("department", "VARCHAR"),
+        ("work_schedule", "JSON"),
+        ("photo_url", "TEXT"),
+        ("face_embedding", "JSON"),
+    ]:
+        if add_column(conn, "employee", column, ddl_type):
+            results.append(f"✅ Added {column} ({ddl_type}) to employee")
+    return results
+
+
+def postgres_column_types(conn: Connection):
+    if not is_postgres(conn):
+        return []
+    # Cast to TEXT before using LIKE operator since work_schedule might be JSON or UNKNOWN
+    conn.execute(text("UPDATE employee SET work_schedule = NULL WHERE work_schedule::text NOT LIKE '{%' AND work_schedule::text NOT LIKE '[%'"))
+    conn.execute(text("ALTER TABLE employee ALTER COLUMN photo_url TYPE TEXT"))
+    conn.execute(text("ALTER TABLE employee ALTER COLUMN work_schedule TYPE JSON USING work_schedule::json"))
+    conn.execute(text("ALTER TABLE employee ALTER COLUMN face_embedding TYPE JSON USING face_embedding::json"))
+    return ["✅ photo_url forced to TEXT, work_schedule/face_embedding forced to JSON"]
+
+
+def attendance_indexes(conn: Connection):
+    results = []
+    # Drop duplicate punches (keep the first) so the unique index can be built
+    result = conn.execute(text(
+        "DELETE FROM attendance WHERE id NOT IN "
+        "(SELECT MIN(id) FROM attendance GROUP BY employee_id, timestamp, type)"
+    ))
+    if result.rowcount:
+        results.append(f"🧹 Removed {result.rowcount} duplicate attendance rows")
+    conn.execute(text("CREATE INDEX IF NOT EXISTS ix_attendance_employee_timestamp ON attendance (employee_id, timestamp)"))
+    conn.execute(text("CREATE INDEX IF NOT EXISTS ix_attendance_branch_timestamp ON attendance (branch_id, timestamp)"))
+    conn.execute(text("CREATE UNIQUE INDEX IF NOT EXISTS uq_attendance_employee_timestamp_type ON attendance (employee_id, timestamp, type)"))
+    results.append("✅ Attendance indexes created")
+    return results
+
+
+def employee_updated_at_index(conn: Connection):
+    conn.execute(text("CREATE INDEX IF NOT EXISTS ix_employee_updated_at ON employee (updated_at)"))
+    return ["✅ employee.updated_at index created"]
+
+
+def extract_inline_photos(conn: Connection):
+    # Imported here so the runner doesn't need the photo store unless this step runs
+    from app.core.photo_store import is_inline_photo, store_inline_photo
+
+    moved, failed, last_id = 0, 0, 0
+    while True:
+        # Keyset batches so only a few photos are in memory at a time
+        rows = conn.execute(
+            text("SELECT id, photo_url FROM employee WHERE id > :last_id AND photo_url IS NOT NULL ORDER BY id LIMIT 100"),
+            {"last_id": last_id},
+        ).all()
+        if not rows:
+            break
+        for employee_id, photo_url in rows:
+            last_id = employee_id
+            if not is_inline_photo(photo_url):
+                continue
+            try:
+                url = store_inline_photo(photo_url)
+            except ValueError as e:
+                failed += 1
+                print(f"⚠️ Employee {employee_id}: photo left inline ({e})")
+                continue
+            conn.execute(text("UPDATE employee SET photo_url = :url WHERE id = :id"), {"url": url, "id": employee_id})
+            moved += 1
+    results = [f"✅ Moved {moved} inline photos to the photo store"]
+    if failed:
+        results.append(f"⚠️ {failed} photos could not be decoded and were left inline")
+    return results
+
+
+def binary_face_embeddings(conn: Connection):
+    from app.models.types import pack_embedding
+
+    blob_type = "BYTEA" if is_postgres(conn) else "BLOB"
+    add_column(conn, "employee", "face_embedding_bin", blob_type)
+    converted, failed, last_id = 0, 0, 0
+    while True:
+        rows = conn.execute(
+            text("SELECT id, face_embedding FROM employee WHERE id > :last_id AND face_embedding IS NOT NULL ORDER BY id LIMIT 500"),
+            {"last_id": last_id},
+        ).all()
+        if not rows:
+            break
+        updates = []
+        for employee_id, embedding in rows:
+            last_id = employee_id
+            try:
+                # Postgres' JSON type hands back lists, SQLite returns the raw text
+                vector = json.loads(embedding) if isinstance(embedding, str) else embedding
+                if vector is None:
+                    continue
+                updates.append({"id": employee_id, "data": pack_embedding(vector)})
+            except (TypeError, ValueError) as e:
+                failed += 1
+                print(f"⚠️ Employee {employee_id}: invalid face_embedding dropped ({e})")
+        if updates:
+            conn.execute(text("UPDATE employee SET face_embedding_bin = :data WHERE id = :id"), updates)
+            converted += len(updates)
+    conn.execute(text("ALTER TABLE employee DROP COLUMN face_embedding"))
+    conn.execute(text("ALTER TABLE employee RENAME COLUMN face_embedding_bin TO face_embedding"))
+    results = [f"✅ Converted {converted} face embeddings to packed float32"]
+    if failed:
+        results.append(f"⚠️ {failed} invalid face embeddings were dropped")
+    return results
+
+
+def backfill_daily_summaries(conn: Connection):
+    # attendance_daily_summary itself was created by create_all
+    from sqlmodel import Session
+    from app.core.reports import rebuild_daily_summaries
+
+    # The rebuild reads branch zones; step 9 finds the column already there
+    add_column(conn, "branch", "timezone", "VARCHAR")
+    with Session(bind=conn) as session:
+        days = rebuild_daily_summaries(session)
+        session.flush()
+    return [f"✅ Built {days} daily attendance summaries"]
+
+
+def branch_timezone_column(conn: Connection):
+    return ["✅ Added timezone to branch"] if add_column(conn, "branch", "timezone", "VARCHAR") else []
+
+
+def attendance_timestamp_update():
+    from app.models.models import Attendance
+
+    table = Attendance.__table__
+    return table.update().where(table.c.id == bindparam("attendance_id")).values(timestamp=bindparam("ts"))
+
+
+def utc_attendance_timestamps(conn: Connection):
+    # Legacy punches were stored as naive wall-clock time in one zone.
+    # Rewrite them as naive UTC (what UTCDateTime stores) and rebuild the
+    # summaries, whose days are derived from those timestamps.
+    from zoneinfo import ZoneInfo
+    from sqlmodel import Session
+    from app.core.config import settings
+    from app.core.reports import rebuild_daily_summaries
+
+    zone = ZoneInfo(settings.legacy_timezone)
+    # A DST fold can briefly collide two rows mid-rewrite; rebuild the index after
+    conn.execute(text("DROP INDEX IF EXISTS uq_attendance_employee_timestamp_type"))
+    converted, last_id = 0, 0
+    while True:
+        rows = conn.execute(
+            text("SELECT id, timestamp FROM attendance WHERE id > :last_id ORDER BY id LIMIT 1000"),
+            {"last_id": last_id},
+        ).all()
+        if not rows:
+            break
+        last_id = rows[-1][0]
+        updates = []
+        for attendance_id, timestamp in rows:
+            if isinstance(timestamp, str):
+                timestamp = datetime.fromisoformat(timestamp)
+            utc = timestamp.replace(tzinfo=zone).astimezone(timezone.utc).replace(tzinfo=None)
+            updates.append({"attendance_id": attendance_id, "ts": utc})
+        # Through the column type: a raw sqlite3 bind drops ".000000" from
+        # whole seconds, and the text no longer matches what the app writes
+        conn.execute(attendance_timestamp_update(), updates)
+        converted += len(updates)
+
+    result = conn.execute(text(
+        "DELETE FROM attendance WHERE id NOT IN "
+        "(SELECT MIN(id) FROM attendance GROUP BY employee_id, timestamp, type)"
+    ))
+    results = [f"✅ Converted {converted} attendance timestamps from {settings.legacy_timezone} to UTC"]
+    if result.rowcount:
+        results.append(f"🧹 Removed {result.rowcount} duplicate attendance rows")
+    conn.execute(text("CREATE UNIQUE INDEX IF NOT EXISTS uq_attendance_employee_timestamp_type ON attendance (employee_id, timestamp, type)"))
+
+    conn.execute(text("DELETE FROM attendance_daily_summary"))
+    with Session(bind=conn) as session:
+        days = rebuild_daily_summaries(session)
+        session.flush()
+    results.append(f"✅ Rebuilt {days} daily attendance summaries")
+    return results
+
+
+def attendance_location_columns(conn: Connection):
+    return [f"✅ Added {column} to attendance" for column in ("latitude", "longitude") if add_column(conn, "attendance", column, "FLOAT")]
+
+
+def branch_updated_at_column(conn: Connection):
+    if not add_column(conn, "branch", "updated_at", "TIMESTAMP"):
+        return []
+    from app.models.models import Branch
+    conn.execute(Branch.__table__.update().values(updated_at=datetime.now()))
+    return ["✅ Added updated_at to branch"]
+
+
+def partition_attendance_table(conn: Connection):
+    # Postgres only; on SQLite the archive job alone keeps the table small
+    from app.core.partitions import partition_attendance
+    return partition_attendance(conn)
+
+
+def sqlite_attendance_autoincrement(conn: Connection):
+    # Archiving deletes the newest rows of old months; without AUTOINCREMENT
+    # SQLite could then reuse an archived id. Rebuild the table with it.
+    if conn.dialect.name != "sqlite":
+        return []
+    from sqlalchemy.schema import CreateIndex, CreateTable
+    from app.models.models import Attendance
+
+    ddl = conn.execute(text("SELECT sql FROM sqlite_master WHERE type = 'table' AND name = 'attendance'")).scalar()
+    if ddl is None or "AUTOINCREMENT" in ddl.upper():
+        return []
+    table = Attendance.__table__
+    create = str(CreateTable(table).compile(dialect=conn.dialect))
+    conn.execute(text(create.replace("CREATE TABLE attendance ", "CREATE TABLE attendance_rebuild ", 1)))
+    columns = ", ".join(c.name for c in table.columns)
+    copied = conn.execute(text(f"INSERT INTO attendance_rebuild ({columns}) SELECT {columns} FROM attendance")).rowcount
+    conn.execute(text("DROP TABLE attendance"))
+    conn.execute(text("ALTER TABLE attendance_rebuild RENAME TO attendance"))
+    for index in table.indexes:
+        conn.execute(CreateIndex(index))
+    return [f"✅ Rebuilt attendance with AUTOINCREMENT ids ({copied} rows)"]
+
+
+# Ordered, append-only. Never renumber or edit a step that has shipped.
+MIGRATIONS = [
+    (1, "branch contact columns", branch_contact_columns),
+    (2, "employee profile columns", employee_profile_columns),
+    (3, "postgres column types", postgres_column_types),
+    (4, "attendance indexes", attendance_indexes),
+    (5, "employee updated_at index", employee_updated_at_index),
+    (6, "extract inline photos", extract_inline_photos),
+    (7, "binary face embeddings", binary_face_embeddings),
+    (8, "backfill daily summaries", backfill_daily_summaries),
+    (9, "branch timezone column", branch_timezone_column),
+    (10, "utc attendance timestamps", utc_attendance_timestamps),
+    (11, "attendance location columns", attendance_location_columns),
+    (12, "branch updated_at column", branch_updated_at_column),
+    (13, "partition attendance by month", partition_attendance_table),
+    (14, "sqlite attendance autoincrement", sqlite_attendance_autoincrement),
+]
+
+LATEST_VERSION = MIGRATIONS[-1][0]
+
+
+# --- Runner -----------------------------------------------------------------
+
+def ensure_version_table(conn: Connection):
+    conn.execute(text(
+        "CREATE TABLE IF NOT EXISTS schema_migrations ("
+        "version INTEGER PRIMARY KEY, "
+        "name VARCHAR NOT NULL, "
+        "applied_at TIMESTAMP NOT NULL)"
+    ))
+
+
+def applied_versions(conn: Connection) -> set:
+    if not inspect(conn).has_table("schema_migrations"):
+        return set()
+    return {row[0] for row in conn.execute(text("SELECT version FROM schema_migrations"))}
+
+
+def record_version(conn: Connection, version: int, name: str):
+    conn.execute(
+        text("INSERT INTO schema_migrations (version, name, applied_at) VALUES (:version, :name, :applied_at)")
+        .bindparams(bindparam("applied_at", type_=DateTime())),
+        {"version": version, "name": name, "applied_at": datetime.now()},
+    )
+
+
+@contextmanager
+def migration_transaction(engine: Engine):
+    """
+    One transaction for the whole run, holding a lock so concurrent workers
+    wait for the first one and then find nothing left to do.
+    """
+    if engine.dialect.name == "sqlite":
+        # pysqlite would otherwise run DDL outside of any transaction.
+        # BEGIN IMMEDIATE takes the database write lock up front.
+        with engine.connect().execution_options(isolation_level="AUTOCOMMIT") as conn:
+            conn.exec_driver_sql("BEGIN IMMEDIATE")
+            try:
+                yield conn
+            except Exception:
+                conn.exec_driver_sql("ROLLBACK")
+                raise
+            conn.exec_driver_sql("COMMIT")
+    else:
+        with engine.begin() as conn:
+            if is_postgres(conn):
+                conn.execute(text("SELECT pg_advisory_xact_lock(:key)"), {"key": MIGRATION_LOCK_ID})
+            yield conn
+
+
+def pending_migrations(engine: Engine):
+    with engine.connect() as conn:
+        applied = applied_versions(conn)
+    return [m for m in MIGRATIONS if m[0] not in applied]
+
+
+def verify_schema(engine: Engine):
+    """
+    Startup check for workers when migrating is left to `migrate.py`: one
+    query against the version stamp, no reflection, no lock, no DDL.
+    Raises when the schema is missing or older than this code.
+    """
+    try:
+        with engine.connect() as conn:
+            applied = {row[0] for row in conn.execute(text("SELECT version FROM schema_migrations"))}
+    except DBAPIError as e:
+        raise RuntimeError(f"No schema version stamp ({e.orig}), run `python migrate.py` first") from e
+    missing = [version for version, _, _ in MIGRATIONS if version not in applied]
+    if missing:
+        raise RuntimeError(f"Schema is behind this code (missing migrations {missing}), run `python migrate.py` first")
+    return [f"✅ Schema verified (version {LATEST_VERSION})"]
+
+
+def run_migrations(engine: Engine):
+    # Cheap, lock-free check first: warm restarts stop here without any DDL
+    if not pending_migrations(engine):
+        return [f"✅ Schema up to date (version {LATEST_VERSION})"]
+
+    results = []
+    with migration_transaction(engine) as conn:
+        # Re-check under the lock, another worker may have just finished
+        applied = applied_versions(conn)
+        pending = [m for m in MIGRATIONS if m[0] not in applied]
+        if not pending:
+            return [f"✅ Schema up to date (version {LATEST_VERSION})"]
+
+        fresh = not inspect(conn).has_table("employee")
+        ensure_version_table(conn)
+        # Creates missing tables only; existing ones are left to the steps below
+        SQLModel.metadata.create_all(conn)
+
+        if fresh:
+            # create_all already built the latest schema, except for
+            # partitioning, which it can't express (instant on an empty table)
+            results.extend(partition_attendance_table(conn))
+            for version, name, _ in pending:
+                record_version(conn, version, name)
+            results.append(f"✅ Created schema at version {LATEST_VERSION}")
+        else:
+            for version, name, step in pending:
+                results.extend(step(conn))
+                record_version(conn, version, name)
+                results.append(f"✅ Applied migration {version}: {name}")
+
+    results.append("🏁 Migration run complete")
+    return results
@@ -0,0 +1,140 @@
+from datetime import date, datetime, timezone
+from typing import List, Optional, Tuple
+
+from sqlalchemy import text
+from sqlalchemy.engine import Connection
+
+from app.core.config import settings
+
+# Attendance timestamps are stored as naive UTC, so month bounds are UTC months
+Month = Tuple[int, int]
+
+
+def month_of(ts: datetime) -> Month:
+    if ts.tzinfo is not None:
+        ts = ts.astimezone(timezone.utc)
+    return ts.year, ts.month
+
+
+def add_months(month: Month, count: int) -> Month:
+    index = month[0] * 12 + month[1] - 1 + count
+    return index // 12, index % 12 + 1
+
+
+def month_start(month: Month) -> datetime:
+    return datetime(month[0], month[1], 1, tzinfo=timezone.utc)
+
+
+def month_range(first: Month, last: Month) -> List[Month]:
+    months = []
+    while first <= last:
+        months.append(first)
+        first = add_months(first, 1)
+    return months
+
+
+def current_month() -> Month:
+    return month_of(datetime.now(timezone.utc))
+
+
+def partition_name(month: Month) -> str:
+    return f"attendance_y{month[0]}m{month[1]:02d}"
+
+
+def _bound(month: Month) -> str:
+    return date(month[0], month[1], 1).isoformat()
+
+
+# --- Postgres native partitions -----------------------------------------------
+
+def is_partitioned(conn: Connection) -> bool:
+    if conn.dialect.name != "postgresql":
+        return False
+    return conn.execute(text(
+        "SELECT EXISTS (SELECT 1 FROM pg_partitioned_table p JOIN pg_class c ON c.oid = p.partrelid "
+        "WHERE c.relname = 'attendance' AND c.relnamespace = current_schema()::regnamespace)"
+    )).scalar()
+
+
+def existing_partitions(conn: Connection) -> set:
+    return set(conn.execute(text(
+        "SELECT child.relname FROM pg_inherits i "
+        "JOIN pg_class parent ON parent.oid = i.inhparent JOIN pg_class child ON child.oid = i.inhrelid "
+        "WHERE parent.relname = 'attendance' AND parent.relnamespace = current_schema()::regnamespace"
+    )).scalars())
+
+
+def create_partitions(conn: Connection, months: List[Month], table: str = "attendance") -> List[str]:
+    """Monthly range partitions that don't exist yet (checked first: CREATE locks the parent)."""
+    existing = existing_partitions(conn) if table == "attendance" else set()
+    created = []
+    for month in months:
+        name = partition_name(month)
+        if name in existing:
+            continue
+        conn.execute(text(
+            f"CREATE TABLE IF NOT EXISTS {name} PARTITION OF {table} "
+            f"FOR VALUES FROM ('{_bound(month)}') TO ('{_bound(add_months(month, 1))}')"
+        ))
+        created.append(name)
+    return created
+
+
+def ensure_partitions(conn: Connection, months_ahead: Optional[int] = None) -> List[str]:
+    """Keep partitions ready for this month and the next few; no-op unless partitioned."""
+    if not is_partitioned(conn):
+        return []
+    months_ahead = settings.attendance_partition_months_ahead if months_ahead is None else months_ahead
+    first = current_month()
+    try:
+        # A savepoint: a clash with rows already in the default partition must not abort the caller
+        with conn.begin_nested():
+            return create_partitions(conn, month_range(first, add_months(first, months_ahead)))
+    except Exception as e:
+        print(f"⚠️ Could not create attendance partitions: {e}")
+        return []
+
+
+def partition_attendance(conn: Connection) -> List[str]:
+    """
+    Rebuild attendance as a table range-partitioned by month on timestamp.
+    Partitions cover the existing rows through a few months ahead; a
+    default partition catches anything outside them. The primary key
+    becomes (id, timestamp), as Postgres requires the partition key in it.
+    """
+    if conn.dialect.name != "postgresql" or is_partitioned(conn):
+        return []
+    sequence = conn.execute(text("SELECT pg_get_serial_sequence('attendance', 'id')")).scalar()
+    conn.execute(text("CREATE TABLE attendance_partitioned (LIKE attendance INCLUDING DEFAULTS) PARTITION BY RANGE (timestamp)"))
+    conn.execute(text("ALTER TABLE attendance_partitioned ADD CONSTRAINT attendance_partitioned_pkey PRIMARY KEY (id, timestamp)"))
+
+    oldest, newest = conn.execute(text("SELECT MIN(timestamp), MAX(timestamp) FROM attendance")).one()
+    now = current_month()
+    first = min(month_of(oldest), now) if oldest else now
+    last = max(month_of(newest), now) if newest else now
+    months = month_range(first, add_months(last, settings.attendance_partition_months_ahead))
+    create_partitions(conn, months, table="attendance_partitioned")
+    conn.execute(text("CREATE TABLE attendance_default PARTITION OF attendance_partitioned DEFAULT"))
+
+    copied = conn.execute(text("INSERT INTO attendance_partitioned SELECT * FROM attendance")).rowcount
+    if sequence:
+        # The id sequence belongs to the old table and would be dropped with it
+        conn.execute(text(f"ALTER SEQUENCE {sequence} OWNED BY attendance_partitioned.id"))
+    conn.execute(text("DROP TABLE attendance"))
+    conn.execute(text("ALTER TABLE attendance_partitioned RENAME TO attendance"))
+    conn.execute(text("ALTER INDEX attendance_partitioned_pkey RENAME TO attendance_pkey"))
+    conn.execute(text("ALTER TABLE attendance ADD FOREIGN KEY (employee_id) REFERENCES employee (id)"))
+    conn.execute(text("ALTER TABLE attendance ADD FOREIGN KEY (branch_id) REFERENCES branch (id)"))
+    conn.execute(text("CREATE INDEX ix_attendance_employee_timestamp ON attendance (employee_id, timestamp)"))
+    conn.execute(text("CREATE INDEX ix_attendance_branch_timestamp ON attendance (branch_id, timestamp)"))
+    conn.execute(text("CREATE UNIQUE INDEX uq_attendance_employee_timestamp_type ON attendance (employee_id, timestamp, type)"))
+    return [f"✅ Partitioned attendance by month ({len(months)} partitions, {copied} rows moved)"]
+
+
+def detach_partition(conn: Connection, month: Month) -> Optional[str]:
+    """Detach a month's partition (new rows for it then land in the default partition)."""
+    name = partition_name(month)
+    if not is_partitioned(conn) or name not in existing_partitions(conn):
+        return None
+    conn.execute(text(f"ALTER TABLE attendance DETACH PARTITION {name}"))
+    return name
@@ -0,0 +1,164 @@
+import base64
+import binascii
+import hashlib
+import os
+import re
+import tempfile
+from abc import ABC, abstractmethod
+from typing import Callable, Dict, Optional, Tuple
+
+from app.core.config import settings
+
+# photo_url values pointing into the store look like /api/v1/photos/<sha256>
+PHOTO_URL_PREFIX = "/api/v1/photos/"
+
+CONTENT_TYPES = {
+    "image/jpeg": "jpg",
+    "image/png": "png",
+    "image/webp": "webp",
+    "image/gif": "gif",
+    "application/octet-stream": "bin",
+}
+EXTENSIONS = {ext: content_type for content_type, ext in CONTENT_TYPES.items()}
+
+DATA_URL = re.compile(r"^data:(?P<type>[\w/+.-]+)?(;[\w=-]+)*;base64,(?P<data>.*)$", re.DOTALL)
+BASE64 = re.compile(r"^[A-Za-z0-9+/=\s]+$")
+DIGEST = re.compile(r"^[0-9a-f]{64}$")
+
+
+def sniff_content_type(data: bytes) -> str:
+    if data.startswith(b"\xff\xd8\xff"):
+        return "image/jpeg"
+    if data.startswith(b"\x89PNG\r\n\x1a\n"):
+        return "image/png"
+    if data[:4] == b"RIFF" and data[8:12] == b"WEBP":
+        return "image/webp"
+    if data.startswith((b"GIF87a", b"GIF89a")):
+        return "image/gif"
+    return "application/octet-stream"
+
+
+def is_inline_photo(value: Optional[str]) -> bool:
+    """True for a base64 payload (raw or data: URL), False for real URLs."""
+    if not value:
+        return False
+    if value.startswith("data:"):
+        return True
+    if value.startswith(("http://", "https://", PHOTO_URL_PREFIX)):
+        return False
+    # Raw base64 (a JPEG's starts with "/9j/", so a leading slash proves nothing)
+    return len(value) >= 64 and BASE64.match(value) is not None
+
+
+def decode_inline_photo(value: str) -> Tuple[bytes, str]:
+    match = DATA_URL.match(value)
+    declared_type = None
+    if match:
+        declared_type, value = match.group("type"), match.group("data")
+    try:
+        data = base64.b64decode("".join(value.split()), validate=True)
+    except (binascii.Error, ValueError):
+        raise ValueError("photo_url is neither a URL nor valid base64")
+    if not data:
+        raise ValueError("photo_url contains an empty image")
+    content_type = declared_type if declared_type in CONTENT_TYPES else sniff_content_type(data)
+    return data, content_type
+
+
+class PhotoStore(ABC):
+    """
+    Content-addressed photo storage. Photos are keyed by the SHA-256 of their
+    bytes, so the same image uploaded twice is stored once.
+    """
+
+    @abstractmethod
+    def put(self, data: bytes, content_type: str) -> str:
+        ...
+
+    @abstractmethod
+    def stat(self, digest: str) -> Optional[Tuple[int, str]]:
+        """(size, content_type) or None when the photo does not exist."""
+
+    @abstractmethod
+    def read(self, digest: str, start: int = 0, end: Optional[int] = None) -> bytes:
+        """Bytes [start, end] inclusive, like an HTTP byte range."""
+
+
+class LocalPhotoStore(PhotoStore):
+    def __init__(self, root: str):
+        self.root = root
+
+    def _dir(self, digest: str) -> str:
+        # Fan out over 256 subdirectories to keep listings small
+        return os.path.join(self.root, digest[:2])
+
+    def _find(self, digest: str) -> Optional[str]:
+        if not DIGEST.match(digest):
+            return None
+        directory = self._dir(digest)
+        for ext in EXTENSIONS:
+            path = os.path.join(directory, f"{digest}.{ext}")
+            if os.path.exists(path):
+                return path
+        return None
+
+    def put(self, data: bytes, content_type: str) -> str:
+        digest = hashlib.sha256(data).hexdigest()
+        if self._find(digest):
+            return digest
+        directory = self._dir(digest)
+        os.makedirs(directory, exist_ok=True)
+        path = os.path.join(directory, f"{digest}.{CONTENT_TYPES.get(content_type, 'bin')}")
+        # Write then rename, so readers never see a partial file
+        fd, tmp_path = tempfile.mkstemp(dir=directory)
+        with os.fdopen(fd, "wb") as f:
+            f.write(data)
+        os.replace(tmp_path, path)
+        return digest
+
+    def stat(self, digest: str) -> Optional[Tuple[int, str]]:
+        path = self._find(digest)
+        if not path:
+            return None
+        ext = path.rsplit(".", 1)[1]
+        return os.path.getsize(path), EXTENSIONS.get(ext, "application/octet-stream")
+
+    def read(self, digest: str, start: int = 0, end: Optional[int] = None) -> bytes:
+        path = self._find(digest)
+        if not path:
+            raise FileNotFoundError(digest)
+        with open(path, "rb") as f:
+            f.seek(start)
+            return f.read() if end is None else f.read(end - start + 1)
+
+
+# Other backends (S3, GCS...) register a factory here and are picked by PHOTO_STORE_BACKEND
+PHOTO_STORES: Dict[str, Callable[[], PhotoStore]] = {
+    "local": lambda: LocalPhotoStore(settings.photo_store_dir),
+}
+
+_photo_store: Optional[PhotoStore] = None
+
+
+def register_photo_store(name: str, factory: Callable[[], PhotoStore]):
+    PHOTO_STORES[name] = factory
+
+
+def get_photo_store() -> PhotoStore:
+    global _photo_store
+    if _photo_store is None:
+        _photo_store = PHOTO_STORES[settings.photo_store_backend]()
+    return _photo_store
+
+
+def store_inline_photo(value: Optional[str]) -> Optional[str]:
+    """
+    Move a base64 photo into the store and return its URL. URLs (including
+    ones already pointing at the store) are returned unchanged.
+    """
+    if not is_inline_photo(value):
+        return value
+    data, content_type = decode_inline_photo(value)
+    if len(data) > settings.photo_max_bytes:
+        raise ValueError(f"Photo too large ({len(data)} bytes, max {settings.photo_max_bytes})")
+    return PHOTO_URL_PREFIX + get_photo_store().put(data, content_type)
@@ -0,0 +1,267 @@
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+from typing import Callable, Dict, List, Optional, Tuple
+
+from sqlalchemy.exc import DBAPIError, DisconnectionError, InterfaceError, OperationalError
+from sqlalchemy.exc import TimeoutError as PoolTimeoutError
+
+from app.core.config import settings
+
+# queued -> processing -> created / duplicate / rejected, or failed when the
+# punch itself keeps failing (MAX_ATTEMPTS). Database outages never fail a punch.
+# Purged after the retention window; failed entries stay until someone deals with them
+PURGED_STATUSES = ("created", "duplicate", "rejected")
+# A claim older than this belongs to a worker that died mid-batch
+CLAIM_TIMEOUT_SECONDS = 60
+MAX_ATTEMPTS = 5
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS punch_queue (
+    key TEXT PRIMARY KEY,
+    payload TEXT NOT NULL,
+    status TEXT NOT NULL DEFAULT 'queued',
+    attendance_id INTEGER,
+    detail TEXT,
+    attempts INTEGER NOT NULL DEFAULT 0,
+    enqueued_at REAL NOT NULL,
+    claimed_at REAL,
+    processed_at REAL,
+    retries INTEGER NOT NULL DEFAULT 0,
+    next_attempt_at REAL
+);
+CREATE INDEX IF NOT EXISTS ix_punch_queue_pending ON punch_queue (status, enqueued_at);
+"""
+
+# (key, status, attendance_id, detail) for every claimed entry
+Outcome = Tuple[str, str, Optional[int], Optional[str]]
+Handler = Callable[[List[dict]], List[Tuple[str, Optional[int], Optional[str]]]]
+
+
+TRANSIENT_ERRORS = (OperationalError, InterfaceError, DisconnectionError, PoolTimeoutError, ConnectionError, TimeoutError)
+
+
+def is_transient(error: BaseException) -> bool:
+    # The database is down, unreachable or busy: the punch is fine, try again later.
+    # Handlers may wrap the driver error, so the whole cause chain is checked.
+    seen = set()
+    while error is not None and id(error) not in seen:
+        seen.add(id(error))
+        if isinstance(error, TRANSIENT_ERRORS) or (isinstance(error, DBAPIError) and error.connection_invalidated):
+            return True
+        error = error.__cause__ or error.__context__
+    return False
+
+
+def retry_delay(retries: int) -> float:
+    # Exponential from the poll interval, capped
+    base = settings.attendance_queue_poll_ms / 1000
+    return min(base * 2 ** min(retries - 1, 30), settings.attendance_queue_retry_max_seconds)
+
+
+def punch_key(employee_id: int, timestamp: str, type: str) -> str:
+    # Same natural key as the attendance unique index, so a kiosk retry maps to the same entry
+    return hashlib.sha1(f"{employee_id}|{timestamp}|{type}".encode()).hexdigest()
+
+
+class PunchQueue:
+    """
+    Durable write-behind queue for attendance punches.
+
+    Punches are appended to a local SQLite file (one fsync'd insert, no
+    round trip to the main database) and a background thread drains them
+    in batches through a handler that returns one (status, id, detail) per
+    payload. Entries stay queryable by key until QUEUE_RETENTION_HOURS
+    after they were processed. Several workers may share the file: claims
+    are atomic and a crashed worker's claim expires. A failed drain backs
+    off exponentially and is retried for as long as the database is down;
+    a batch that fails on its own is retried one punch at a time.
+    """
+
+    def __init__(self, path: str = None):
+        self.path = path or settings.attendance_queue_path
+        self._conn: Optional[sqlite3.Connection] = None
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self._last_purge = 0.0
+
+    def connection(self) -> sqlite3.Connection:
+        if self._conn is None:
+            directory = os.path.dirname(os.path.abspath(self.path))
+            os.makedirs(directory, exist_ok=True)
+            conn = sqlite3.connect(self.path, check_same_thread=False, isolation_level=None, timeout=30)
+            conn.execute("PRAGMA journal_mode=WAL")
+            # Every accepted punch must survive a power cut
+            conn.execute("PRAGMA synchronous=FULL")
+            conn.executescript(SCHEMA)
+            self._conn = conn
+        return self._conn
+
+    # --- Producer side ------------------------------------------------------
+
+    def enqueue(self, key: str, payload: dict) -> dict:
+        """Append a punch; an already known key returns its current entry instead."""
+        with self._lock:
+            conn = self.connection()
+            conn.execute(
+                "INSERT OR IGNORE INTO punch_queue (key, payload, enqueued_at) VALUES (?, ?, ?)",
+                (key, json.dumps(payload), time.time()),
+            )
+            # The worker polls rather than being woken, so a burst lands in one batch
+            return self._get(conn, key)
+
+    def get(self, key: str) -> Optional[dict]:
+        with self._lock:
+            return self._get(self.connection(), key)
+
+    @staticmethod
+    def _get(conn: sqlite3.Connection, key: str) -> Optional[dict]:
+        row = conn.execute(
+            "SELECT key, status, attendance_id, detail, attempts, enqueued_at, processed_at FROM punch_queue WHERE key = ?",
+            (key,),
+        ).fetchone()
+        if row is None:
+            return None
+        return dict(zip(("key", "status", "attendance_id", "detail", "attempts", "enqueued_at", "processed_at"), row))
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            rows = self.connection().execute("SELECT status, COUNT(*) FROM punch_queue GROUP BY status").fetchall()
+        return dict(rows)
+
+    # --- Consumer side ------------------------------------------------------
+
+    def claim(self, limit: int) -> List[Tuple[str, dict]]:
+        now = time.time()
+        with self._lock:
+            rows = self.connection().execute(
+                "UPDATE punch_queue SET status = 'processing', claimed_at = :now, attempts = attempts + 1 "
+                "WHERE key IN (SELECT key FROM punch_queue "
+                "WHERE (status = 'queued' AND (next_attempt_at IS NULL OR next_attempt_at <= :now)) "
+                "OR (status = 'processing' AND claimed_at < :stale) ORDER BY enqueued_at LIMIT :limit) "
+                "RETURNING key, payload",
+                {"now": now, "stale": now - CLAIM_TIMEOUT_SECONDS, "limit": limit},
+            ).fetchall()
+        return [(key, json.loads(payload)) for key, payload in rows]
+
+    def complete(self, outcomes: List[Outcome]):
+        with self._lock:
+            self.connection().executemany(
+                "UPDATE punch_queue SET status = ?, attendance_id = ?, detail = ?, processed_at = ? WHERE key = ?",
+                [(status, attendance_id, detail, time.time(), key) for key, status, attendance_id, detail in outcomes],
+            )
+
+    def release(self, keys: List[str], error: str, transient: bool):
+        """
+        Back to the queue, due again after an exponential backoff. Only a
+        punch that fails on its own (not the database) MAX_ATTEMPTS times
+        ends up 'failed'.
+        """
+        now = time.time()
+        with self._lock:
+            conn = self.connection()
+            rows = conn.execute(
+                f"SELECT key, attempts, retries FROM punch_queue WHERE key IN ({', '.join('?' * len(keys))})", keys
+            ).fetchall()
+            updates = []
+            for key, attempts, retries in rows:
+                if transient:
+                    # The punch was never really tried: the backoff grows, its attempt count doesn't
+                    attempts -= 1
+                elif attempts >= MAX_ATTEMPTS:
+                    updates.append(("failed", error, now, attempts, retries, None, key))
+                    continue
+                retries += 1
+                updates.append(("queued", error, None, attempts, retries, now + retry_delay(retries), key))
+            conn.executemany(
+                "UPDATE punch_queue SET status = ?, detail = ?, processed_at = ?, attempts = ?, retries = ?, "
+                "next_attempt_at = ? WHERE key = ?",
+                updates,
+            )
+
+    def purge(self):
+        cutoff = time.time() - settings.attendance_queue_retention_hours * 3600
+        with self._lock:
+            self.connection().execute(
+                f"DELETE FROM punch_queue WHERE status IN ({', '.join('?' * len(PURGED_STATUSES))}) AND processed_at < ?",
+                (*PURGED_STATUSES, cutoff),
+            )
+
+    def drain_once(self, handler: Handler) -> int:
+        """Process one batch; returns how many entries were settled (0 when idle or on failure)."""
+        claimed = self.claim(settings.attendance_queue_batch_size)
+        if not claimed:
+            return 0
+        keys = [key for key, _ in claimed]
+        try:
+            results = handler([payload for _, payload in claimed])
+        except Exception as e:
+            if is_transient(e) or len(claimed) == 1:
+                print(f"❌ Punch queue batch of {len(keys)} failed, will retry: {e}")
+                self.release(keys, str(e), is_transient(e))
+                return 0
+            # Something in the batch itself: settle what goes through one by one
+            print(f"⚠️ Punch queue batch of {len(keys)} failed, retrying one by one: {e}")
+            return self._drain_each(handler, claimed)
+        self.complete([(key, *result) for key, result in zip(keys, results)])
+        return len(claimed)
+
+    def _drain_each(self, handler: Handler, claimed: List[Tuple[str, dict]]) -> int:
+        settled = 0
+        for position, (key, payload) in enumerate(claimed):
+            try:
+                result = handler([payload])[0]
+            except Exception as e:
+                if is_transient(e):
+                    # The database went away mid-way: everything left waits for it
+                    self.release([k for k, _ in claimed[position:]], str(e), transient=True)
+                    break
+                print(f"❌ Punch {key} failed, will retry: {e}")
+                self.release([key], str(e), transient=False)
+                continue
+            self.complete([(key, *result)])
+            settled += 1
+        return settled
+
+    def drain(self, handler: Handler):
+        """Drain until the queue is empty or the database fails (used on shutdown)."""
+        while self.drain_once(handler):
+            pass
+
+    def _run(self, handler: Handler):
+        interval = settings.attendance_queue_poll_ms / 1000
+        while not self._stop.is_set():
+            try:
+                if self.drain_once(handler):
+                    continue  # more may be waiting, keep going while busy
+                if time.time() - self._last_purge > 3600:
+                    self.purge()
+                    self._last_purge = time.time()
+            except Exception as e:
+                print(f"❌ Punch queue worker error: {e}")
+            self._stop.wait(interval)
+
+    def start(self, handler: Handler):
+        if self._thread is not None:
+            return
+        self.connection()
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, args=(handler,), name="punch-queue", daemon=True)
+        self._thread.start()
+        print(f"📥 Punch queue worker started ({self.path})")
+
+    def stop(self, handler: Handler = None):
+        if self._thread is None:
+            return
+        self._stop.set()
+        self._thread.join()
+        self._thread = None
+        if handler is not None:
+            self.drain(handler)
+
+
+punch_queue = PunchQueue()
@@ -0,0 +1,181 @@
+from datetime import date, datetime, time, timedelta
+from typing import Any, Iterable, List, Optional, Tuple
+from zoneinfo import ZoneInfo
+
+from sqlmodel import Session, delete, select
+
+from app.core.config import settings
+from app.core.db import insert_or_update
+from app.core.timezones import get_zone
+from app.models.models import Attendance, AttendanceDailySummary, Branch, Employee
+
+
+class Schedule:
+    """
+    Parsed `Employee.work_schedule`, as saved by the dashboard:
+    {"checkIn": "09:00", "checkOut": "19:00", "workDays": [1, 2, 3, 4, 5], ...}
+    workDays uses JavaScript numbering (0 = Sunday).
+    """
+
+    def __init__(self, check_in: Optional[time], check_out: Optional[time], work_days: Optional[set]):
+        self.check_in = check_in
+        self.check_out = check_out
+        self.work_days = work_days
+
+    @classmethod
+    def parse(cls, work_schedule: Any) -> Optional["Schedule"]:
+        if not isinstance(work_schedule, dict):
+            return None
+        check_in = parse_time(work_schedule.get("checkIn"))
+        check_out = parse_time(work_schedule.get("checkOut"))
+        if check_in is None and check_out is None:
+            return None
+        work_days = work_schedule.get("workDays")
+        work_days = {int(d) for d in work_days} if isinstance(work_days, list) else None
+        return cls(check_in, check_out, work_days)
+
+    def works_on(self, day: date) -> bool:
+        if self.work_days is None:
+            return True
+        # Python: Monday = 0, JavaScript: Sunday = 0
+        return (day.weekday() + 1) % 7 in self.work_days
+
+
+def parse_time(value: Any) -> Optional[time]:
+    if not isinstance(value, str):
+        return None
+    try:
+        hours, minutes = value.strip().split(":")[:2]
+        return time(int(hours), int(minutes))
+    except ValueError:
+        return None
+
+
+def minutes_between(start: datetime, end: datetime) -> int:
+    return max(int((end - start).total_seconds() // 60), 0)
+
+
+def pair_punches(punches: Iterable[Tuple[datetime, str]]) -> Tuple[int, bool]:
+    """
+    Pair each check-in with the next check-out. Returns (worked minutes,
+    complete). Repeated check-ins keep the first; stray check-outs are ignored.
+    """
+    worked, open_since = 0, None
+    for timestamp, punch_type in punches:
+        if punch_type == "check-in":
+            if open_since is None:
+                open_since = timestamp
+        elif punch_type == "check-out" and open_since is not None:
+            worked += minutes_between(open_since, timestamp)
+            open_since = None
+    return worked, open_since is None
+
+
+def summarize_day(day: date, punches: List[Tuple[datetime, str]], schedule: Optional[Schedule], grace_minutes: int = None) -> dict:
+    """Compute the summary fields for one employee-day from its (timestamp, type) punches."""
+    grace_minutes = settings.report_grace_minutes if grace_minutes is None else grace_minutes
+    punches = sorted(punches)
+    check_ins = [ts for ts, punch_type in punches if punch_type == "check-in"]
+    check_outs = [ts for ts, punch_type in punches if punch_type == "check-out"]
+    worked, complete = pair_punches(punches)
+
+    summary = {
+        "day": day,
+        "first_check_in": check_ins[0] if check_ins else None,
+        "last_check_out": check_outs[-1] if check_outs else None,
+        "punches": len(punches),
+        "worked_minutes": worked,
+        "late_minutes": 0,
+        "early_leave_minutes": 0,
+        "complete": bool(check_ins) and complete,
+        "status": "on-time",
+    }
+
+    if schedule is None or not schedule.works_on(day):
+        summary["status"] = "unscheduled"
+        return summary
+    if schedule.check_in and check_ins:
+        expected = datetime.combine(day, schedule.check_in)
+        if check_ins[0] > expected + timedelta(minutes=grace_minutes):
+            summary["late_minutes"] = minutes_between(expected, check_ins[0])
+            summary["status"] = "late"
+    if schedule.check_out and check_outs:
+        expected = datetime.combine(day, schedule.check_out)
+        if check_outs[-1] < expected:
+            summary["early_leave_minutes"] = minutes_between(check_outs[-1], expected)
+    return summary
+
+
+def refresh_daily_summary(session: Session, employee_id: int, day: date, zone: ZoneInfo, schedule: Any = None, employee_loaded: bool = False) -> Optional[dict]:
+    """
+    Recompute one employee-day (a local day in `zone`) from its punches and
+    upsert the summary row. Does not commit. Pass `schedule` (the raw
+    work_schedule) with `employee_loaded=True` to skip the employee lookup.
+    """
+    if not employee_loaded:
+        schedule = session.exec(select(Employee.work_schedule).where(Employee.id == employee_id)).first()
+
+    day_start = datetime.combine(day, time.min, tzinfo=zone)
+    rows = session.exec(
+        select(Attendance.timestamp, Attendance.type, Attendance.branch_id)
+        .where(
+            Attendance.employee_id == employee_id,
+            Attendance.timestamp >= day_start,
+            Attendance.timestamp < datetime.combine(day + timedelta(days=1), time.min, tzinfo=zone),
+        )
+        .order_by(Attendance.timestamp)
+    ).all()
+
+    if not rows:
+        session.execute(delete(AttendanceDailySummary).where(
+            AttendanceDailySummary.employee_id == employee_id,
+            AttendanceDailySummary.day == day,
+        ))
+        return None
+
+    # Schedules are wall-clock times, so compare in the branch's zone
+    punches = [(ts.astimezone(zone).replace(tzinfo=None), punch_type) for ts, punch_type, _ in rows]
+    values = summarize_day(day, punches, Schedule.parse(schedule))
+    values.update(employee_id=employee_id, branch_id=rows[-1].branch_id, updated_at=datetime.now())
+    # Upsert, so two punches of the same employee-day can't race on the insert
+    statement = insert_or_update(AttendanceDailySummary, ["employee_id", "day"], values)
+    session.execute(statement)
+    return values
+
+
+def punch_day(timestamp: datetime, zone: ZoneInfo) -> date:
+    """Local day a UTC punch belongs to."""
+    return timestamp.astimezone(zone).date()
+
+
+def refresh_daily_summaries(session: Session, keys: Iterable[Tuple[int, date, ZoneInfo]], schedules: dict = None):
+    """Refresh several (employee_id, day, zone) keys, loading each schedule once."""
+    keys = set(keys)
+    if not keys:
+        return
+    if schedules is None:
+        employee_ids = {employee_id for employee_id, _, _ in keys}
+        schedules = dict(session.exec(select(Employee.id, Employee.work_schedule).where(Employee.id.in_(employee_ids))).all())
+    for employee_id, day, zone in sorted(keys, key=lambda key: key[:2]):
+        refresh_daily_summary(session, employee_id, day, zone, schedules.get(employee_id), employee_loaded=True)
+
+
+def rebuild_daily_summaries(session: Session, batch_size: int = 500) -> int:
+    """Recompute every employee-day that has punches. Used for backfills."""
+    zones = {branch_id: get_zone(name) for branch_id, name in session.exec(select(Branch.id, Branch.timezone)).all()}
+    keys, last_id = set(), 0
+    while True:
+        rows = session.exec(
+            select(Attendance.id, Attendance.employee_id, Attendance.branch_id, Attendance.timestamp)
+            .where(Attendance.id > last_id)
+            .order_by(Attendance.id)
+            .limit(batch_size)
+        ).all()
+        if not rows:
+            break
+        last_id = rows[-1].id
+        for row in rows:
+            zone = zones.get(row.branch_id) or get_zone()
+            keys.add((row.employee_id, punch_day(row.timestamp, zone), zone))
+    refresh_daily_summaries(session, keys)
+    return len(keys)
@@ -0,0 +1,45 @@
+import json
+from datetime import date, datetime, time
+from typing import Any, Iterable, List, Optional, Sequence
+
+from fastapi.responses import JSONResponse
+
+try:
+    import orjson
+except ImportError:  # stdlib fallback, same output just slower
+    orjson = None
+
+
+def _default(value: Any):
+    # NumPy arrays (face embeddings) and anything else orjson can't handle natively
+    if hasattr(value, "tolist"):
+        return value.tolist()
+    if isinstance(value, (datetime, date, time)):
+        return value.isoformat()
+    raise TypeError(f"Type is not JSON serializable: {type(value).__name__}")
+
+
+def dumps(content: Any) -> bytes:
+    if orjson is not None:
+        return orjson.dumps(content, default=_default, option=orjson.OPT_SERIALIZE_NUMPY)
+    return json.dumps(content, default=_default, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+
+
+class FastJSONResponse(JSONResponse):
+    """
+    JSON response encoded with orjson. Read endpoints return this directly,
+    which also skips FastAPI's response_model revalidation (the declared
+    response_model still documents the shape in OpenAPI).
+    """
+
+    def render(self, content: Any) -> bytes:
+        return dumps(content)
+
+
+def rows_to_dicts(rows: Iterable[Sequence], columns: List[str]) -> List[dict]:
+    return [dict(zip(columns, row)) for row in rows]
+
+
+def rows_response(rows: Iterable[Sequence], columns: List[str], headers: Optional[dict] = None) -> FastJSONResponse:
+    """Serialize plain row tuples (e.g. select(*columns) results) without building models."""
+    return FastJSONResponse(rows_to_dicts(rows, columns), headers=headers)
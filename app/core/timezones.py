@@ -0,0 +1,54 @@
+from datetime import datetime, timezone
+from functools import lru_cache
+from typing import Dict, Optional
+from zoneinfo import ZoneInfo, ZoneInfoNotFoundError
+
+from sqlmodel import Session
+
+from app.core.cache import branch_cache, cached_branches
+from app.core.config import settings
+
+
+@lru_cache(maxsize=None)
+def get_zone(name: Optional[str] = None) -> ZoneInfo:
+    """Resolved zone for an IANA name (default zone when empty). Cached for the process."""
+    return ZoneInfo(name or settings.default_timezone)
+
+
+def is_valid_zone(name: str) -> bool:
+    try:
+        get_zone(name)
+        return True
+    except (ZoneInfoNotFoundError, ValueError):
+        return False
+
+
+def to_utc(timestamp: datetime) -> datetime:
+    # Naive input. Assume it is UTC (standard for API JSON from Kiosk).
+    if timestamp.tzinfo is None:
+        return timestamp.replace(tzinfo=timezone.utc)
+    return timestamp.astimezone(timezone.utc)
+
+
+def from_local(timestamp: datetime, zone: ZoneInfo) -> datetime:
+    """Interpret a naive filter value as wall-clock time in `zone`; aware values pass through."""
+    if timestamp.tzinfo is None:
+        timestamp = timestamp.replace(tzinfo=zone)
+    return timestamp.astimezone(timezone.utc)
+
+
+class BranchZones:
+    """
+    branch_id -> ZoneInfo, kept in the branch cache (and dropped with it
+    whenever a branch changes), so rendering a page of punches never
+    queries the branch table.
+    """
+
+    def get(self, session: Session) -> Dict[int, ZoneInfo]:
+        return branch_cache.get_or_load("zones", lambda: {b.id: get_zone(b.timezone) for b in cached_branches(session)})
+
+    def zone(self, session: Session, branch_id: Optional[int]) -> ZoneInfo:
+        return self.get(session).get(branch_id) or get_zone()
+
+
+branch_zones = BranchZones()
@@ -1,17 +1,67 @@
+import time
+STARTED = time.perf_counter()
+
+import asyncio
+import threading
 from contextlib import asynccontextmanager
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
-from app.core.db import init_db
+from fastapi.responses import PlainTextResponse
+from sqlmodel import Session
+from app.core.compression import CompressionMiddleware
+from app.core.config import settings
+from app.core.db import init_db, engine, async_engine, pool_status
+from app.core.face_index import face_index
+from app.core.punch_queue import punch_queue
+from app.core.metrics import MetricsMiddleware, instrument_engine, render_metrics
 from app.api.v1.api import api_router
+from app.api.v1.endpoints.attendance import drain_punch_queue
+
+IMPORTED = time.perf_counter()
+
+def load_face_index():
+    try:
+        with Session(engine) as session:
+            face_index.ensure_loaded(session)
+    except Exception as e:
+        print(f"Error loading face index: {e}")
 
 @asynccontextmanager
 async def lifespan(app: FastAPI):
+    # Startup breakdown, logged once the worker is ready (also at /api/v1/debug/startup)
+    timings = {"imports": IMPORTED - STARTED}
+    started = time.perf_counter()
     try:
         init_db()
         print("Database initialized successfully")
     except Exception as e:
         print(f"Error initializing database: {e}")
+        if settings.schema_setup == "verify":
+            # Serving with a schema this code doesn't expect is worse than not starting
+            raise
+    timings[f"schema {settings.schema_setup}"] = time.perf_counter() - started
+
+    started = time.perf_counter()
+    if settings.face_index_load == "startup":
+        load_face_index()
+    elif settings.face_index_load == "background":
+        # Identify requests wait for it (ensure_loaded), everything else is served right away
+        threading.Thread(target=load_face_index, name="face-index", daemon=True).start()
+    timings[f"face index {settings.face_index_load}"] = time.perf_counter() - started
+
+    started = time.perf_counter()
+    if settings.attendance_queue_enabled:
+        punch_queue.start(drain_punch_queue)
+        timings["punch queue"] = time.perf_counter() - started
+
+    app.state.startup = {name: round(seconds, 4) for name, seconds in timings.items()}
+    total = time.perf_counter() - STARTED
+    print(f"🚀 Worker ready in {total:.2f}s ({', '.join(f'{name} {seconds:.3f}s' for name, seconds in timings.items())})")
     yield
+    # Flush what was accepted before going away
+    await asyncio.to_thread(punch_queue.stop, drain_punch_queue)
+    if async_engine is not None:
+        await async_engine.dispose()
 
 app = FastAPI(
     title="Biometrico API",
@@ -29,6 +79,16 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+if settings.compression_enabled:
+    app.add_middleware(CompressionMiddleware)
+
+if settings.metrics_enabled:
+    instrument_engine(engine)
+    if async_engine is not None:
+        instrument_engine(async_engine.sync_engine)
+    # Outermost, so CORS and everything below it is timed too
+    app.add_middleware(MetricsMiddleware)
+
 app.include_router(api_router, prefix="/api/v1")
 
 @app.get("/")
@@ -38,3 +98,9 @@ def read_root():
 @app.get("/health")
 def health_check():
     return {"status": "healthy"}
+
+@app.get("/metrics", include_in_schema=False)
+def metrics():
+    if not settings.metrics_enabled:
+        return PlainTextResponse("metrics disabled\n", status_code=404)
+    return PlainTextResponse(render_metrics(pool_status()), media_type="text/plain; version=0.0.4")
@@ -1,7 +1,8 @@
-from datetime import datetime
+from datetime import date, datetime
 from typing import Optional, List, Any
 from sqlmodel import SQLModel, Field, Relationship
-from sqlalchemy import JSON, Column
+from sqlalchemy import JSON, Column, Index
+from app.models.types import Embedding, EmbeddingType, UTCDateTime
 
 class BranchBase(SQLModel):
     name: str = Field(index=True)
@@ -12,9 +13,11 @@ class BranchBase(SQLModel):
     phone: Optional[str] = None
     city: Optional[str] = None
     code: Optional[str] = None
+    timezone: Optional[str] = None  # IANA name, e.g. America/Cancun (default zone when empty)
 
 class Branch(BranchBase, table=True):
     id: Optional[int] = Field(default=None, primary_key=True)
+    updated_at: Optional[datetime] = Field(default_factory=datetime.now)  # Last-Modified of the branch list
     employees: List["Employee"] = Relationship(back_populates="branch")
 
 class EmployeeBase(SQLModel):
@@ -26,9 +29,9 @@ class EmployeeBase(SQLModel):
     position: Optional[str] = None
     department: Optional[str] = None
     work_schedule: Optional[Any] = Field(default=None, sa_column=Column(JSON)) # Store full schedule object (relaxed type for legacy data)
-    photo_url: Optional[str] = None # Base64 string or URL
+    photo_url: Optional[str] = None # URL (base64 uploads are moved to the photo store)
     is_active: bool = True
-    face_embedding: Optional[List[float]] = Field(default=None, sa_column=Column(JSON)) # Store vector as JSON list
+    face_embedding: Optional[Embedding] = Field(default=None, sa_column=Column(EmbeddingType)) # Packed float32, loads as a NumPy array
 
 class Employee(EmployeeBase, table=True):
     id: Optional[int] = Field(default=None, primary_key=True)
@@ -36,17 +39,52 @@ class Employee(EmployeeBase, table=True):
     branch: Optional[Branch] = Relationship(back_populates="employees")
     attendances: List["Attendance"] = Relationship(back_populates="employee")
     created_at: datetime = Field(default_factory=datetime.now)
-    updated_at: datetime = Field(default_factory=datetime.now)
+    updated_at: datetime = Field(default_factory=datetime.now, index=True)
 
 class AttendanceBase(SQLModel):
-    timestamp: datetime
+    timestamp: datetime = Field(sa_type=UTCDateTime)  # stored in UTC
     type: str  # check-in, check-out
     status: str # on-time, late, etc
     confidence_score: Optional[float] = None
     biometric_verified: bool = False
+    # Device location for mobile punches (checked against the branch geofence)
+    latitude: Optional[float] = None
+    longitude: Optional[float] = None
 
 class Attendance(AttendanceBase, table=True):
+    __table_args__ = (
+        Index("ix_attendance_employee_timestamp", "employee_id", "timestamp"),
+        Index("ix_attendance_branch_timestamp", "branch_id", "timestamp"),
+        # Idempotency key: a kiosk retry of the same punch is rejected by the DB
+        Index("uq_attendance_employee_timestamp_type", "employee_id", "timestamp", "type", unique=True),
+        # Never reuse ids of rows moved to the archive (SQLite would hand out max(id) + 1 again)
+        {"sqlite_autoincrement": True},
+    )
+
     id: Optional[int] = Field(default=None, primary_key=True)
     employee_id: int = Field(foreign_key="employee.id")
     employee: Employee = Relationship(back_populates="attendances")
     branch_id: int = Field(foreign_key="branch.id")
+
+class DailySummaryBase(SQLModel):
+    day: date  # local day of the branch
+    first_check_in: Optional[datetime] = None  # local wall-clock time of the branch
+    last_check_out: Optional[datetime] = None
+    punches: int = 0
+    worked_minutes: int = 0  # sum of paired check-in -> check-out intervals
+    late_minutes: int = 0
+    early_leave_minutes: int = 0
+    complete: bool = False  # every check-in has a matching check-out
+    status: str = "on-time"  # on-time, late, unscheduled
+
+class AttendanceDailySummary(DailySummaryBase, table=True):
+    __tablename__ = "attendance_daily_summary"
+    __table_args__ = (
+        Index("uq_daily_summary_employee_day", "employee_id", "day", unique=True),
+        Index("ix_daily_summary_branch_day", "branch_id", "day"),
+    )
+
+    id: Optional[int] = Field(default=None, primary_key=True)
+    employee_id: int = Field(foreign_key="employee.id")
+    branch_id: int = Field(foreign_key="branch.id")
+    updated_at: datetime = Field(default_factory=datetime.now)
@@ -0,0 +1,89 @@
+import json
+import struct
+from datetime import datetime, timezone
+from typing import List, Optional, Sequence, Union
+
+import numpy as np
+from pydantic import PlainSerializer
+from sqlalchemy import DateTime, LargeBinary
+from sqlalchemy.types import TypeDecorator
+from typing_extensions import Annotated
+
+# Header: magic, format version, reserved, dimension (little-endian)
+EMBEDDING_MAGIC = b"FE"
+EMBEDDING_VERSION = 1
+EMBEDDING_HEADER = struct.Struct("<2sBBI")
+
+
+def pack_embedding(value: Union[Sequence[float], np.ndarray]) -> bytes:
+    vector = np.asarray(value, dtype="<f4").reshape(-1)
+    return EMBEDDING_HEADER.pack(EMBEDDING_MAGIC, EMBEDDING_VERSION, 0, vector.shape[0]) + vector.tobytes()
+
+
+def unpack_embedding(data: bytes) -> np.ndarray:
+    magic, version, _, dim = EMBEDDING_HEADER.unpack_from(data)
+    if magic != EMBEDDING_MAGIC or version != EMBEDDING_VERSION:
+        raise ValueError(f"Unknown embedding format (magic={magic!r}, version={version})")
+    vector = np.frombuffer(data, dtype="<f4", count=dim, offset=EMBEDDING_HEADER.size)
+    return vector.astype(np.float32, copy=False)
+
+
+class EmbeddingType(TypeDecorator):
+    """
+    Face embedding stored as packed little-endian float32 (BLOB / BYTEA) with
+    a small versioned header. Loads as a read-only float32 NumPy array;
+    accepts lists or arrays on write.
+    """
+
+    impl = LargeBinary
+    cache_ok = True
+
+    def process_bind_param(self, value, dialect) -> Optional[bytes]:
+        if value is None:
+            return None
+        return pack_embedding(value)
+
+    def process_result_value(self, value, dialect) -> Optional[np.ndarray]:
+        if value is None:
+            return None
+        if isinstance(value, str):
+            # Row not converted yet by the binary embedding migration
+            return np.asarray(json.loads(value), dtype=np.float32)
+        return unpack_embedding(bytes(value))
+
+    def compare_values(self, x, y) -> bool:
+        if x is None or y is None:
+            return x is y
+        return np.array_equal(np.asarray(x, dtype=np.float32), np.asarray(y, dtype=np.float32))
+
+
+class UTCDateTime(TypeDecorator):
+    """
+    Timezone-aware UTC datetimes. Stored as naive UTC (SQLite has no zone
+    support), always loaded back with tzinfo=UTC. Naive input is taken as UTC.
+    """
+
+    impl = DateTime
+    cache_ok = True
+
+    def process_bind_param(self, value, dialect):
+        if value is None:
+            return None
+        if value.tzinfo is not None:
+            value = value.astimezone(timezone.utc)
+        return value.replace(tzinfo=None)
+
+    def process_result_value(self, value, dialect):
+        if value is None:
+            return None
+        if isinstance(value, str):
+            value = datetime.fromisoformat(value)
+        return value.replace(tzinfo=timezone.utc)
+
+
+def embedding_to_list(value):
+    return value.tolist() if isinstance(value, np.ndarray) else value
+
+
+# Pydantic-side type: plain lists at the API boundary, arrays internally
+Embedding = Annotated[List[float], PlainSerializer(embedding_to_list, return_type=List[float])]
@@ -0,0 +1,43 @@
+import argparse
+
+from app.core.archive import archivable_months, archive_cutoff, archive_month, attendance_archive
+from app.core.config import settings
+from app.core.db import engine
+from app.core.partitions import ensure_partitions
+
+
+def archive_attendance(hot_months: int = None, dry_run: bool = False):
+    """Move closed months out of the attendance table into the archive directory."""
+    cutoff = archive_cutoff(hot_months)
+    months = archivable_months(engine, hot_months)
+    print(f"🗄️ Archiving attendance before {cutoff[0]}-{cutoff[1]:02d} into {attendance_archive.directory}")
+    if not months:
+        print("Nothing to archive.")
+    moved = 0
+    for month in months:
+        label = f"{month[0]}-{month[1]:02d}"
+        if dry_run:
+            print(f"~ {label}")
+            continue
+        try:
+            count = archive_month(engine, month)
+        except Exception as e:
+            # Stop at the first failure: months must stay contiguous in the hot table
+            print(f"❌ {label}: {e}")
+            raise SystemExit(1)
+        moved += count
+        print(f"✅ {label}: {count} rows archived" if count else f"· {label}: empty")
+    if not dry_run:
+        with engine.begin() as conn:
+            for name in ensure_partitions(conn):
+                print(f"✅ Created partition {name}")
+    print(f"🏁 Done, {moved} rows moved.")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Archive closed months of attendance to compressed columnar files")
+    parser.add_argument("--hot-months", type=int, default=settings.attendance_hot_months,
+                        help="Months kept in the table, the current one included (env ATTENDANCE_HOT_MONTHS)")
+    parser.add_argument("--dry-run", action="store_true", help="Only list the months that would move")
+    args = parser.parse_args()
+    archive_attendance(args.hot_months, args.dry_run)
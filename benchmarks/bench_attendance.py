@@ -0,0 +1,154 @@
+"""
+Attendance insert/query latency at scale.
+
+Seeds a throwaway database with synthetic punches (1M by default) and times
+the hot paths: idempotent single-punch inserts, duplicate retries, and the
+employee / branch date-range lookups used by read_attendances.
+
+    python -m benchmarks.bench_attendance --rows 1000000
+    python -m benchmarks.bench_attendance --rows 1000000 --no-indexes   # baseline
+
+DATABASE_URL is honoured (point it at a scratch Postgres to benchmark PG);
+otherwise a SQLite file under /tmp is used and recreated on every run.
+"""
+import argparse
+import os
+import random
+import statistics
+import time
+from datetime import datetime, timedelta
+
+os.environ.setdefault("DATABASE_URL", "sqlite:////tmp/bench_attendance.db")
+
+from sqlalchemy import text  # noqa: E402
+from sqlmodel import Session, SQLModel, select  # noqa: E402
+
+from app.core.db import engine, insert_ignore  # noqa: E402
+from app.models.models import Attendance, Branch, Employee  # noqa: E402
+
+INDEXES = ["ix_attendance_employee_timestamp", "ix_attendance_branch_timestamp", "uq_attendance_employee_timestamp_type"]
+START = datetime(2024, 1, 1, 8, 0)
+
+
+def percentiles(samples):
+    samples = sorted(samples)
+    pick = lambda q: samples[min(len(samples) - 1, int(q * len(samples)))] * 1000  # noqa: E731
+    return f"p50={pick(0.50):.3f}ms p95={pick(0.95):.3f}ms p99={pick(0.99):.3f}ms mean={statistics.mean(samples) * 1000:.3f}ms"
+
+
+def seed(rows, employees, branches, chunk=20000):
+    SQLModel.metadata.drop_all(engine)
+    SQLModel.metadata.create_all(engine)
+    with Session(engine) as session:
+        session.add_all([Branch(id=b + 1, name=f"Branch {b + 1}") for b in range(branches)])
+        session.add_all([
+            Employee(id=e + 1, first_name="Bench", last_name=str(e), employee_number=f"B{e:06d}", branch_id=e % branches + 1)
+            for e in range(employees)
+        ])
+        session.commit()
+
+    started = time.perf_counter()
+    table = Attendance.__table__
+    with engine.begin() as conn:
+        batch = []
+        for i in range(rows):
+            employee_id = i % employees + 1
+            # Two punches per employee per day, spread over consecutive days
+            day, slot = divmod(i // employees, 2)
+            batch.append({
+                "employee_id": employee_id,
+                "branch_id": (employee_id - 1) % branches + 1,
+                "timestamp": START + timedelta(days=day, hours=9 * slot, seconds=employee_id % 60),
+                "type": "check-out" if slot else "check-in",
+                "status": "on-time",
+                "biometric_verified": True,
+            })
+            if len(batch) == chunk:
+                conn.execute(table.insert(), batch)
+                batch = []
+        if batch:
+            conn.execute(table.insert(), batch)
+    print(f"Seeded {rows:,} punches in {time.perf_counter() - started:.1f}s")
+    return START + timedelta(days=rows // employees // 2 + 1)
+
+
+def drop_indexes():
+    with engine.begin() as conn:
+        for name in INDEXES:
+            conn.execute(text(f"DROP INDEX IF EXISTS {name}"))
+
+
+def bench_inserts(n, employees, branches, after):
+    created, retried = [], []
+    statement = insert_ignore(Attendance, ["employee_id", "timestamp", "type"]).returning(Attendance.id)
+    with Session(engine) as session:
+        for i in range(n):
+            employee_id = random.randint(1, employees)
+            values = {
+                "employee_id": employee_id,
+                "branch_id": (employee_id - 1) % branches + 1,
+                "timestamp": after + timedelta(seconds=i),
+                "type": "check-in",
+                "status": "on-time",
+                "biometric_verified": True,
+            }
+            for samples in (created, retried):
+                started = time.perf_counter()
+                session.execute(statement.values(**values)).scalar()
+                session.commit()
+                samples.append(time.perf_counter() - started)
+    print(f"insert (new)       {percentiles(created)}")
+    print(f"insert (duplicate) {percentiles(retried)}")
+
+
+def bench_queries(n, employees, branches, days):
+    by_employee, by_branch = [], []
+    with Session(engine) as session:
+        for _ in range(n):
+            day = START + timedelta(days=random.randint(0, max(days - 7, 0)))
+            statement = select(Attendance).where(
+                Attendance.employee_id == random.randint(1, employees),
+                Attendance.timestamp >= day,
+                Attendance.timestamp < day + timedelta(days=7),
+            ).order_by(Attendance.timestamp.desc())
+            started = time.perf_counter()
+            session.exec(statement).all()
+            by_employee.append(time.perf_counter() - started)
+
+            statement = select(Attendance).where(
+                Attendance.branch_id == random.randint(1, branches),
+                Attendance.timestamp >= day,
+                Attendance.timestamp < day + timedelta(days=1),
+            ).order_by(Attendance.timestamp.desc(), Attendance.id.desc()).limit(100)
+            started = time.perf_counter()
+            session.exec(statement).all()
+            by_branch.append(time.perf_counter() - started)
+    print(f"employee + week    {percentiles(by_employee)}")
+    print(f"branch + day (100) {percentiles(by_branch)}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, default=1_000_000)
+    parser.add_argument("--employees", type=int, default=2000)
+    parser.add_argument("--branches", type=int, default=20)
+    parser.add_argument("--inserts", type=int, default=1000)
+    parser.add_argument("--queries", type=int, default=500)
+    parser.add_argument("--no-indexes", action="store_true", help="drop the attendance indexes to get a baseline")
+    args = parser.parse_args()
+
+    random.seed(42)
+    after = seed(args.rows, args.employees, args.branches)
+    if args.no_indexes:
+        drop_indexes()
+        print("Attendance indexes dropped (baseline run; duplicates are not rejected)")
+    print(f"Backend: {engine.dialect.name}")
+    bench_queries(args.queries, args.employees, args.branches, args.rows // args.employees // 2)
+    if args.no_indexes:
+        print("insert benchmarks skipped: ON CONFLICT needs the unique index")
+    else:
+        bench_inserts(args.inserts, args.employees, args.branches, after)
+
+
+if __name__ == "__main__":
+    main()
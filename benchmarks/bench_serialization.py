@@ -0,0 +1,140 @@
+"""
+List endpoint serialization: the old response_model path vs row tuples + orjson.
+
+Seeds a throwaway database with synthetic punches and employees, then times
+building the JSON body for 1k / 10k / 100k rows both ways:
+
+  old  select(Model) -> ORM objects -> response_model validation
+       (fastapi.routing.serialize_response) -> stdlib json (JSONResponse)
+  new  select(*columns) -> row tuples -> dicts -> orjson (FastJSONResponse)
+
+Both include the database fetch, as a request would. Rows are taken in
+primary-key order so a filesort doesn't mask the serialization cost.
+
+    python -m benchmarks.bench_serialization
+    python -m benchmarks.bench_serialization --sizes 1000 10000 --repeat 5
+
+DATABASE_URL is honoured; otherwise a SQLite file under /tmp is used and
+recreated on every run.
+"""
+import argparse
+import asyncio
+import os
+import random
+import statistics
+import time
+from datetime import datetime, timedelta, timezone
+from typing import List
+
+os.environ.setdefault("DATABASE_URL", "sqlite:////tmp/bench_serialization.db")
+
+from fastapi.responses import JSONResponse  # noqa: E402
+from fastapi.routing import serialize_response  # noqa: E402
+from fastapi.utils import create_model_field  # noqa: E402
+from sqlmodel import Session, SQLModel, select  # noqa: E402
+
+from app.api.v1.endpoints.attendance import (  # noqa: E402
+    AttendanceRead, localize, row_columns, rows_json_response,
+)
+from app.api.v1.endpoints.employees import EMPLOYEE_COLUMNS, roster_query, roster_response  # noqa: E402
+from app.core.db import engine  # noqa: E402
+from app.core.serialization import orjson  # noqa: E402
+from app.core.timezones import get_zone  # noqa: E402
+from app.models.models import Attendance, Branch, Employee  # noqa: E402
+
+START = datetime(2024, 1, 1, 14, 0, tzinfo=timezone.utc)
+EMBEDDING_DIM = 128
+
+
+def seed(rows: int, employees: int, branches: int = 10, chunk: int = 20000):
+    SQLModel.metadata.drop_all(engine)
+    SQLModel.metadata.create_all(engine)
+    with Session(engine) as session:
+        session.add_all([Branch(id=b + 1, name=f"Branch {b + 1}") for b in range(branches)])
+        session.commit()
+
+    started = time.perf_counter()
+    with engine.begin() as conn:
+        for first in range(0, employees, chunk):
+            conn.execute(Employee.__table__.insert(), [
+                {
+                    "id": e + 1, "first_name": "Bench", "last_name": str(e), "employee_number": f"B{e:06d}",
+                    "branch_id": e % branches + 1, "is_active": True, "position": "Staff",
+                    "work_schedule": {"checkIn": "09:00", "checkOut": "18:00", "workDays": [1, 2, 3, 4, 5]},
+                    "face_embedding": [random.random() for _ in range(EMBEDDING_DIM)],
+                    "created_at": START.replace(tzinfo=None), "updated_at": START.replace(tzinfo=None),
+                }
+                for e in range(first, min(first + chunk, employees))
+            ])
+        for first in range(0, rows, chunk):
+            conn.execute(Attendance.__table__.insert(), [
+                {
+                    "employee_id": i % employees + 1, "branch_id": i % branches + 1,
+                    "timestamp": START + timedelta(minutes=i), "type": "check-in" if i % 2 else "check-out",
+                    "status": "on-time", "confidence_score": 0.97, "biometric_verified": True,
+                }
+                for i in range(first, min(first + chunk, rows))
+            ])
+    print(f"Seeded {rows:,} punches and {employees:,} employees in {time.perf_counter() - started:.1f}s")
+
+
+def render_old(field, content) -> bytes:
+    validated = asyncio.run(serialize_response(field=field, response_content=content))
+    return JSONResponse(validated).body
+
+
+def attendance_old(session: Session, n: int, zones: dict) -> bytes:
+    attendances = session.exec(select(Attendance).order_by(Attendance.id.desc()).limit(n)).all()
+    return render_old(create_model_field("response", List[AttendanceRead]), localize(attendances, zones))
+
+
+def attendance_new(session: Session, n: int, zones: dict) -> bytes:
+    query = row_columns(select(Attendance).order_by(Attendance.id.desc()).limit(n))
+    return rows_json_response(session.execute(query).all(), zones).body
+
+
+def employees_old(session: Session, n: int) -> bytes:
+    employees = session.exec(select(Employee).order_by(Employee.id).limit(n)).all()
+    return render_old(create_model_field("response", List[Employee]), employees)
+
+
+def employees_new(session: Session, n: int) -> bytes:
+    rows = session.execute(roster_query(None, None, EMPLOYEE_COLUMNS).order_by(Employee.id).limit(n)).all()
+    return roster_response(rows, EMPLOYEE_COLUMNS, 'W/"bench"').body
+
+
+def timed(fn, repeat: int):
+    samples, size = [], 0
+    for _ in range(repeat):
+        # Fresh session each time so the identity map doesn't carry over
+        with Session(engine) as session:
+            started = time.perf_counter()
+            size = len(fn(session))
+            samples.append(time.perf_counter() - started)
+    return statistics.median(samples), size
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", type=int, nargs="+", default=[1000, 10000, 100000])
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    random.seed(42)
+    largest = max(args.sizes)
+    seed(largest, largest)
+    zones = {b + 1: get_zone() for b in range(10)}
+    print(f"encoder: {'orjson ' + orjson.__version__ if orjson else 'stdlib json (orjson not installed)'}")
+    print(f"{'endpoint':<12} {'rows':>8} {'old ms':>10} {'new ms':>10} {'speedup':>8} {'body KB':>9}")
+    for n in args.sizes:
+        for name, old, new in [
+            ("attendance", lambda s: attendance_old(s, n, zones), lambda s: attendance_new(s, n, zones)),
+            ("employees", lambda s: employees_old(s, n), lambda s: employees_new(s, n)),
+        ]:
+            old_time, _ = timed(old, args.repeat)
+            new_time, size = timed(new, args.repeat)
+            print(f"{name:<12} {n:>8,} {old_time * 1000:>10.1f} {new_time * 1000:>10.1f} {old_time / new_time:>7.1f}x {size / 1024:>9.0f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,113 @@
+"""
+Shift-change load test: many kiosks punching and polling the roster at once.
+
+Start the API in the mode under test, then point this script at it:
+
+    DB_ASYNC=false uvicorn app.main:app --port 8000        # sync (threadpool)
+    DB_ASYNC=true  uvicorn app.main:app --port 8001        # async (asyncpg)
+
+    python -m benchmarks.load_kiosks --url http://127.0.0.1:8000 --kiosks 500
+    python -m benchmarks.load_kiosks --url http://127.0.0.1:8001 --kiosks 500
+
+Each simulated kiosk loops for --duration seconds: POST a punch, and every
+--roster-every punches GET the branch roster. Requires httpx.
+"""
+import argparse
+import asyncio
+import random
+import time
+from collections import defaultdict
+from datetime import datetime, timedelta, timezone
+
+import httpx
+
+
+def summarize(name, samples, errors, elapsed):
+    if not samples:
+        print(f"{name:<10} no successful requests ({errors} errors)")
+        return
+    samples = sorted(samples)
+    pick = lambda q: samples[min(len(samples) - 1, int(q * len(samples)))] * 1000  # noqa: E731
+    print(
+        f"{name:<10} n={len(samples):<7} {len(samples) / elapsed:8.1f} req/s  "
+        f"p50={pick(0.50):7.1f}ms p95={pick(0.95):7.1f}ms p99={pick(0.99):7.1f}ms  errors={errors}"
+    )
+
+
+async def seed(client, employees):
+    branch = (await client.post("/api/v1/branches/", json={"name": "Load test"})).json()
+    ids = []
+    for i in range(employees):
+        response = await client.post(
+            "/api/v1/employees/",
+            params={"branch_id": branch["id"]},
+            json={"employee_number": f"LOAD{i:05d}", "first_name": "Load", "last_name": str(i)},
+        )
+        ids.append(response.json()["id"])
+    return branch["id"], ids
+
+
+async def kiosk(client, branch_id, employee_ids, deadline, roster_every, samples, errors):
+    punches = 0
+    # Distinct second offsets per kiosk so punches never collide on the idempotency key
+    base = datetime.now(timezone.utc) + timedelta(days=random.randint(1, 10_000), microseconds=random.randint(0, 999_999))
+    while time.perf_counter() < deadline:
+        payload = {
+            "employee_id": random.choice(employee_ids),
+            "branch_id": branch_id,
+            "timestamp": (base + timedelta(seconds=punches)).isoformat(),
+            "type": "check-in",
+            "status": "on-time",
+        }
+        started = time.perf_counter()
+        try:
+            response = await client.post("/api/v1/attendance/", json=payload)
+            response.raise_for_status()
+            samples["punch"].append(time.perf_counter() - started)
+        except Exception:
+            errors["punch"] += 1
+        punches += 1
+
+        if punches % roster_every == 0:
+            started = time.perf_counter()
+            try:
+                response = await client.get("/api/v1/employees/", params={"branch_id": branch_id})
+                response.raise_for_status()
+                samples["roster"].append(time.perf_counter() - started)
+            except Exception:
+                errors["roster"] += 1
+
+
+async def run(args):
+    limits = httpx.Limits(max_connections=args.kiosks, max_keepalive_connections=args.kiosks)
+    async with httpx.AsyncClient(base_url=args.url, limits=limits, timeout=args.timeout) as client:
+        branch_id, employee_ids = await seed(client, args.employees)
+        samples, errors = defaultdict(list), defaultdict(int)
+        started = time.perf_counter()
+        deadline = started + args.duration
+        await asyncio.gather(*[
+            kiosk(client, branch_id, employee_ids, deadline, args.roster_every, samples, errors)
+            for _ in range(args.kiosks)
+        ])
+        elapsed = time.perf_counter() - started
+
+    print(f"{args.url}: {args.kiosks} kiosks for {elapsed:.1f}s")
+    for name in ("punch", "roster"):
+        summarize(name, samples[name], errors[name], elapsed)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--url", default="http://127.0.0.1:8000")
+    parser.add_argument("--kiosks", type=int, default=200)
+    parser.add_argument("--employees", type=int, default=200)
+    parser.add_argument("--duration", type=float, default=20.0)
+    parser.add_argument("--roster-every", type=int, default=10)
+    parser.add_argument("--timeout", type=float, default=30.0)
+    args = parser.parse_args()
+    random.seed(7)
+    asyncio.run(run(args))
+
+
+if __name__ == "__main__":
+    main()
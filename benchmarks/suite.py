@@ -0,0 +1,552 @@
+"""
+Benchmark suite for the API hot paths, checked against a stored baseline.
+
+Seeds a scratch database (benchmarks/seed.py), then drives the app with
+concurrent simulated kiosks and reports, per endpoint, p50/p95/p99 latency,
+throughput and memory, plus startup time (init_db + face index load).
+Each scenario runs --rounds times and every metric is the median round:
+
+    python -m benchmarks.suite                      # in-process (ASGI, no sockets)
+    python -m benchmarks.suite --http               # spawns uvicorn on the same database
+    python -m benchmarks.suite --url http://127.0.0.1:8000 --skip-seed
+    python -m benchmarks.suite --profile large      # 5M punches, 512-d embeddings
+
+Memory is the peak Python allocation while serving one request
+(tracemalloc, in-process) or the server's RSS after the scenario (--http).
+
+Results are compared against benchmarks/baseline.json for the same
+profile, mode and database. Any failed request, a p95 or throughput worse
+than --tolerance, or a memory increase beyond it exits with status 1.
+Timings are machine specific: refresh the baseline on the machine that
+runs the comparison (and commit it when a change is meant to move it):
+
+    python -m benchmarks.suite --save-baseline
+
+DATABASE_URL is honoured (a scratch Postgres works); the default is a
+SQLite file under /tmp that is recreated on every seeded run.
+"""
+import argparse
+import asyncio
+import contextlib
+import itertools
+import json
+import os
+import platform
+import random
+import socket
+import statistics
+import subprocess
+import sys
+import time
+import tracemalloc
+from dataclasses import dataclass, field
+from datetime import datetime, timedelta, timezone
+from typing import Callable, Dict, List, Optional, Tuple
+
+from benchmarks.seed import seed  # first: points DATABASE_URL etc. at /tmp before the app loads
+
+import httpx  # noqa: E402
+from sqlmodel import Session  # noqa: E402
+
+from app.core.db import engine, init_db  # noqa: E402
+from app.core.face_index import face_index  # noqa: E402
+
+BASELINE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "baseline.json")
+
+PROFILES = {
+    "smoke": dict(branches=5, employees=500, rows=50_000, dim=128, requests=200, kiosks=20),
+    "default": dict(branches=20, employees=5_000, rows=1_000_000, dim=128, requests=1_000, kiosks=50),
+    "large": dict(branches=50, employees=20_000, rows=5_000_000, dim=512, requests=2_000, kiosks=200),
+}
+
+# Differences below these are noise, whatever the ratio
+MIN_LATENCY_DELTA_MS = 2.0
+MIN_MEMORY_DELTA_KB = 256
+
+Request = Tuple[str, str, dict]
+
+
+@dataclass
+class Fixtures:
+    """What the scenarios pick their ids from, read back through the API."""
+    branch_ids: List[int]
+    employees: List[dict]  # id, branch_id, photo_url
+    dim: int
+    newest: datetime
+    roster_etags: Dict[int, str]
+    # Per run, so new punches never collide with an earlier run's
+    base: datetime = field(default_factory=lambda: datetime.now(timezone.utc).replace(microsecond=0) + timedelta(days=1))
+
+    def employee(self, rng: random.Random) -> dict:
+        return rng.choice(self.employees)
+
+    def punch(self, i: int, offset_days: int = 0) -> dict:
+        employee = self.employee(random.Random(i))
+        return {
+            "employee_id": employee["id"],
+            "branch_id": employee["branch_id"],
+            "timestamp": (self.base + timedelta(days=offset_days, seconds=i)).isoformat(),
+            "type": "check-in",
+            "status": "on-time",
+            "confidence_score": 0.97,
+            "biometric_verified": True,
+        }
+
+
+@dataclass
+class Scenario:
+    name: str
+    request: Callable[[Fixtures, int], Request]
+    expect: Tuple[int, ...] = (200,)
+    share: float = 1.0  # fraction of --requests
+    max_kiosks: Optional[int] = None
+    # Sent once before measuring (e.g. the punches the retry scenario repeats)
+    prepare: Optional[Callable[[Fixtures, int], List[Request]]] = None
+
+
+def punch(fx: Fixtures, i: int) -> Request:
+    return "POST", "/api/v1/attendance/", {"json": fx.punch(i)}
+
+
+def punch_retry(fx: Fixtures, i: int) -> Request:
+    return "POST", "/api/v1/attendance/", {"json": fx.punch(i, offset_days=1)}
+
+
+def prepare_retries(fx: Fixtures, n: int) -> List[Request]:
+    punches = [fx.punch(i, offset_days=1) for i in range(n)]
+    return [("POST", "/api/v1/attendance/batch", {"json": punches[i:i + 500]}) for i in range(0, n, 500)]
+
+
+def punch_batch(fx: Fixtures, i: int) -> Request:
+    # An offline kiosk flushing its queue
+    return "POST", "/api/v1/attendance/batch", {"json": [fx.punch(i * 50 + k, offset_days=2) for k in range(50)]}
+
+
+def identify(fx: Fixtures, i: int) -> Request:
+    rng = random.Random(i)
+    return "POST", "/api/v1/employees/identify", {"json": {"embedding": [rng.gauss(0, 1) for _ in range(fx.dim)], "top_k": 5}}
+
+
+def roster(fx: Fixtures, i: int) -> Request:
+    return "GET", "/api/v1/employees/", {"params": {"branch_id": random.Random(i).choice(fx.branch_ids)}}
+
+
+def roster_revalidate(fx: Fixtures, i: int) -> Request:
+    branch_id = random.Random(i).choice(list(fx.roster_etags))
+    return "GET", "/api/v1/employees/", {"params": {"branch_id": branch_id}, "headers": {"If-None-Match": fx.roster_etags[branch_id]}}
+
+
+def roster_all(fx: Fixtures, i: int) -> Request:
+    return "GET", "/api/v1/employees/", {}
+
+
+def employee(fx: Fixtures, i: int) -> Request:
+    return "GET", f"/api/v1/employees/{fx.employee(random.Random(i))['id']}", {}
+
+
+def photo(fx: Fixtures, i: int) -> Request:
+    urls = [e["photo_url"] for e in fx.employees[:500] if e.get("photo_url")]
+    return "GET", random.Random(i).choice(urls), {}
+
+
+def branches(fx: Fixtures, i: int) -> Request:
+    return "GET", "/api/v1/branches/", {}
+
+
+def employee_week(fx: Fixtures, i: int) -> Request:
+    rng = random.Random(i)
+    end = fx.newest - timedelta(days=rng.randint(0, 21))
+    params = {"employee_id": fx.employee(rng)["id"], "date_from": (end - timedelta(days=7)).isoformat(), "date_to": end.isoformat()}
+    return "GET", "/api/v1/attendance/", {"params": params}
+
+
+def branch_page(fx: Fixtures, i: int) -> Request:
+    return "GET", "/api/v1/attendance/", {"params": {"branch_id": random.Random(i).choice(fx.branch_ids), "limit": 100}}
+
+
+def export_day(fx: Fixtures, i: int) -> Request:
+    rng = random.Random(i)
+    day = (fx.newest - timedelta(days=rng.randint(0, 7))).date()
+    params = {"branch_id": rng.choice(fx.branch_ids), "date": f"{day}T00:00:00", "format": "csv"}
+    return "GET", "/api/v1/attendance/", {"params": params}
+
+
+def bulk_update(fx: Fixtures, i: int) -> Request:
+    # A sync pushing 200 changed employees
+    rng = random.Random(i)
+    rows = [
+        {"employee_number": f"B{e['id'] - 1:06d}", "position": f"Staff {i}", "branch_id": e["branch_id"]}
+        for e in rng.sample(fx.employees, min(200, len(fx.employees)))
+    ]
+    return "POST", "/api/v1/employees/bulk", {"json": rows}
+
+
+SCENARIOS = [
+    Scenario("punch", punch),
+    Scenario("punch_retry", punch_retry, prepare=prepare_retries),
+    Scenario("punch_batch50", punch_batch, share=0.2, max_kiosks=4),
+    Scenario("identify", identify),
+    Scenario("roster_branch", roster),
+    Scenario("roster_304", roster_revalidate, expect=(304,)),
+    Scenario("roster_all", roster_all, share=0.05, max_kiosks=10),
+    Scenario("employee", employee),
+    Scenario("photo", photo),
+    Scenario("branches", branches),
+    Scenario("attendance_week", employee_week),
+    Scenario("attendance_page", branch_page),
+    Scenario("export_csv_day", export_day, share=0.2),
+    Scenario("bulk_upsert200", bulk_update, share=0.05, max_kiosks=4),
+]
+
+
+def percentile(samples: List[float], q: float) -> float:
+    return samples[min(len(samples) - 1, int(q * len(samples)))] * 1000 if samples else 0.0
+
+
+def summarize(samples: List[float], errors: int, elapsed: float, mem_kb: Optional[float]) -> dict:
+    samples = sorted(samples)
+    return {
+        "n": len(samples),
+        "errors": errors,
+        "rps": round(len(samples) / elapsed, 1) if elapsed else 0.0,
+        "p50_ms": round(percentile(samples, 0.50), 3),
+        "p95_ms": round(percentile(samples, 0.95), 3),
+        "p99_ms": round(percentile(samples, 0.99), 3),
+        "mean_ms": round(statistics.mean(samples) * 1000, 3) if samples else 0.0,
+        "mem_kb": None if mem_kb is None else round(mem_kb),
+    }
+
+
+@contextlib.contextmanager
+def quiet(enabled: bool = True):
+    # The endpoints log every duplicate punch and so on; keep the report readable
+    if not enabled:
+        yield
+        return
+    with open(os.devnull, "w") as devnull, contextlib.redirect_stdout(devnull):
+        yield
+
+
+# --- Fixtures -----------------------------------------------------------------
+
+async def load_fixtures(client: httpx.AsyncClient) -> Fixtures:
+    branch_ids = [b["id"] for b in (await client.get("/api/v1/branches/")).raise_for_status().json()]
+    employees = (await client.get("/api/v1/employees/", params={"fields": "id,branch_id,photo_url,face_embedding"})).raise_for_status().json()
+    if not branch_ids or not employees:
+        raise SystemExit("❌ No branches or employees to benchmark against (seed first, or drop --skip-seed)")
+    dim = next((len(e["face_embedding"]) for e in employees if e.get("face_embedding")), 128)
+    newest = (await client.get("/api/v1/attendance/", params={"limit": 1})).raise_for_status().json()
+    roster_etags = {}
+    for branch_id in branch_ids[:10]:
+        response = (await client.get("/api/v1/employees/", params={"branch_id": branch_id})).raise_for_status()
+        roster_etags[branch_id] = response.headers["etag"]
+    return Fixtures(
+        branch_ids=branch_ids,
+        employees=[{k: e.get(k) for k in ("id", "branch_id", "photo_url")} for e in employees],
+        dim=dim,
+        newest=datetime.fromisoformat(newest[0]["timestamp"]) if newest else datetime.now(timezone.utc),
+        roster_etags=roster_etags,
+    )
+
+
+# --- Running ------------------------------------------------------------------
+
+async def send(client: httpx.AsyncClient, request: Request) -> httpx.Response:
+    method, url, kwargs = request
+    return await client.request(method, url, **kwargs)
+
+
+async def measure(client: httpx.AsyncClient, scenario: Scenario, fx: Fixtures, first: int, n: int, kiosks: int):
+    samples, errors = [], 0
+    counter = itertools.count(first)
+
+    async def kiosk():
+        nonlocal errors
+        while (i := next(counter)) < first + n:
+            started = time.perf_counter()
+            try:
+                ok = (await send(client, scenario.request(fx, i))).status_code in scenario.expect
+            except httpx.HTTPError:
+                ok = False
+            if ok:
+                samples.append(time.perf_counter() - started)
+            else:
+                errors += 1
+
+    started = time.perf_counter()
+    await asyncio.gather(*[kiosk() for _ in range(min(kiosks, n))])
+    return samples, errors, time.perf_counter() - started
+
+
+async def peak_memory_kb(client: httpx.AsyncClient, scenario: Scenario, fx: Fixtures, first: int, count: int) -> float:
+    """Largest tracemalloc peak over a few requests served one at a time."""
+    peak = 0
+    tracemalloc.start()
+    try:
+        for i in range(first, first + count):
+            tracemalloc.reset_peak()
+            baseline, _ = tracemalloc.get_traced_memory()
+            await send(client, scenario.request(fx, i))
+            peak = max(peak, tracemalloc.get_traced_memory()[1] - baseline)
+    finally:
+        tracemalloc.stop()
+    return peak / 1024
+
+
+def server_rss_kb(pid: int) -> Optional[float]:
+    try:
+        with open(f"/proc/{pid}/status") as f:
+            return next(float(line.split()[1]) for line in f if line.startswith("VmRSS:"))
+    except (OSError, StopIteration):
+        return None
+
+
+async def run_scenario(client, scenario: Scenario, fx: Fixtures, args, server_pid: Optional[int]) -> dict:
+    n = max(1, int(args.requests * scenario.share))
+    kiosks = min(args.kiosks, scenario.max_kiosks or args.kiosks)
+    total = n * args.rounds
+    with quiet(server_pid is None and not args.verbose):
+        if scenario.prepare:
+            for request in scenario.prepare(fx, total):
+                (await send(client, request)).raise_for_status()
+        # Every request gets its own index, so new punches stay new across rounds;
+        # warm-up and memory requests use the ones past the measured rounds
+        for i in range(total, total + args.warmup):
+            await send(client, scenario.request(fx, i))
+        rounds = []
+        for r in range(args.rounds):
+            samples, errors, elapsed = await measure(client, scenario, fx, r * n, n, kiosks)
+            rounds.append(summarize(samples, errors, elapsed, None))
+        if server_pid is not None:
+            mem_kb = server_rss_kb(server_pid)
+        elif args.mem_samples and not args.url:
+            mem_kb = await peak_memory_kb(client, scenario, fx, total + args.warmup, args.mem_samples)
+        else:
+            mem_kb = None
+    return median_round(rounds, mem_kb)
+
+
+def median_round(rounds: List[dict], mem_kb: Optional[float]) -> dict:
+    """Per-metric median over the rounds (one noisy round doesn't move it); errors add up."""
+    result = {name: statistics.median(r[name] for r in rounds) for name in ("rps", "p50_ms", "p95_ms", "p99_ms", "mean_ms")}
+    result = {"n": sum(r["n"] for r in rounds), "errors": sum(r["errors"] for r in rounds), **result}
+    result["mem_kb"] = None if mem_kb is None else round(mem_kb)
+    return result
+
+
+def measure_startup(repeat: int) -> dict:
+    """init_db (a warm restart: nothing to migrate) plus loading the face index."""
+    samples = []
+    with quiet():
+        for _ in range(repeat):
+            started = time.perf_counter()
+            init_db()
+            with Session(engine) as session:
+                face_index.load(session)
+            samples.append(time.perf_counter() - started)
+    return summarize(samples, 0, sum(samples), None)
+
+
+def free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+@contextlib.contextmanager
+def uvicorn_server(log_path: str):
+    port = free_port()
+    log = open(log_path, "w")
+    process = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "app.main:app", "--host", "127.0.0.1", "--port", str(port), "--log-level", "warning"],
+        stdout=log, stderr=subprocess.STDOUT, env=os.environ.copy(),
+    )
+    try:
+        url = f"http://127.0.0.1:{port}"
+        deadline = time.time() + 120
+        while time.time() < deadline:
+            if process.poll() is not None:
+                raise SystemExit(f"❌ uvicorn exited with {process.returncode}, see {log_path}")
+            try:
+                if httpx.get(url + "/health", timeout=1).status_code == 200:
+                    break
+            except httpx.HTTPError:
+                time.sleep(0.2)
+        else:
+            raise SystemExit(f"❌ uvicorn did not come up within 120s, see {log_path}")
+        yield url, process.pid
+    finally:
+        process.terminate()
+        process.wait(timeout=30)
+        log.close()
+
+
+async def run_suite(args, url: Optional[str], server_pid: Optional[int]) -> Dict[str, dict]:
+    limits = httpx.Limits(max_connections=args.kiosks, max_keepalive_connections=args.kiosks)
+    if url:
+        client = httpx.AsyncClient(base_url=url, limits=limits, timeout=args.timeout)
+        lifespan = contextlib.nullcontext()
+    else:
+        from app.main import app
+        client = httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://bench", timeout=args.timeout)
+        # ASGITransport doesn't send lifespan events: run startup (migrations, face index) ourselves
+        with quiet():
+            lifespan = app.router.lifespan_context(app)
+            await lifespan.__aenter__()
+    results = {}
+    try:
+        async with client:
+            fx = await load_fixtures(client)
+            for scenario in SCENARIOS:
+                if args.only and scenario.name not in args.only:
+                    continue
+                results[scenario.name] = await run_scenario(client, scenario, fx, args, server_pid)
+                print_row(scenario.name, results[scenario.name])
+    finally:
+        if not url:
+            with quiet():
+                await lifespan.__aexit__(None, None, None)
+    return results
+
+
+# --- Reporting and the baseline -------------------------------------------------
+
+HEADER = f"{'scenario':<16} {'n':>6} {'err':>4} {'req/s':>9} {'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9} {'mem KB':>9}"
+
+
+def print_row(name: str, r: dict):
+    mem = "-" if r["mem_kb"] is None else f"{r['mem_kb']:,}"
+    print(f"{name:<16} {r['n']:>6} {r['errors']:>4} {r['rps']:>9.1f} {r['p50_ms']:>9.2f} {r['p95_ms']:>9.2f} {r['p99_ms']:>9.2f} {mem:>9}")
+
+
+def regressions(current: dict, baseline: dict, tolerance: float) -> List[str]:
+    problems = []
+    if current["errors"]:
+        problems.append(f"{current['errors']} failed requests")
+    if current["p95_ms"] > baseline["p95_ms"] * (1 + tolerance) and current["p95_ms"] - baseline["p95_ms"] > MIN_LATENCY_DELTA_MS:
+        problems.append(f"p95 {baseline['p95_ms']:.2f} -> {current['p95_ms']:.2f} ms")
+    if baseline["rps"] and current["rps"] < baseline["rps"] * (1 - tolerance):
+        problems.append(f"throughput {baseline['rps']:.1f} -> {current['rps']:.1f} req/s")
+    old_mem, new_mem = baseline.get("mem_kb"), current.get("mem_kb")
+    if old_mem is not None and new_mem is not None and new_mem > old_mem * (1 + tolerance) and new_mem - old_mem > MIN_MEMORY_DELTA_KB:
+        problems.append(f"memory {old_mem:,} -> {new_mem:,} KB")
+    return problems
+
+
+def compare(report: dict, baseline: dict, tolerance: float) -> bool:
+    ok = True
+    print(f"\nAgainst the baseline of {baseline['meta']['taken_at']} (tolerance {tolerance:.0%}):")
+    for name, current in report["results"].items():
+        if name not in baseline["results"]:
+            print(f"🆕 {name:<16} no baseline yet")
+            continue
+        problems = regressions(current, baseline["results"][name], tolerance)
+        if problems:
+            ok = False
+            print(f"❌ {name:<16} REGRESSION: {'; '.join(problems)}")
+        else:
+            base = baseline["results"][name]
+            print(f"✅ {name:<16} p95 {base['p95_ms']:.2f} -> {current['p95_ms']:.2f} ms, {base['rps']:.1f} -> {current['rps']:.1f} req/s")
+    return ok
+
+
+def load_baselines(path: str) -> dict:
+    if not os.path.exists(path):
+        return {}
+    with open(path) as f:
+        return json.load(f)
+
+
+def save_baseline(path: str, key: str, report: dict):
+    baselines = load_baselines(path)
+    baselines[key] = report
+    with open(path, "w") as f:
+        json.dump(baselines, f, indent=2, sort_keys=True)
+        f.write("\n")
+    print(f"💾 Baseline {key} saved to {path}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--profile", choices=PROFILES, default="default")
+    parser.add_argument("--branches", type=int)
+    parser.add_argument("--employees", type=int)
+    parser.add_argument("--rows", type=int, help="attendance punches to seed")
+    parser.add_argument("--dim", type=int, help="face embedding dimension")
+    parser.add_argument("--requests", type=int, help="requests per scenario (some scenarios run a fraction)")
+    parser.add_argument("--kiosks", type=int, help="concurrent simulated kiosks")
+    parser.add_argument("--only", nargs="+", metavar="SCENARIO", help=f"any of: {', '.join(s.name for s in SCENARIOS)}, startup")
+    group = parser.add_mutually_exclusive_group()
+    group.add_argument("--http", action="store_true", help="serve the app with uvicorn and benchmark over HTTP")
+    group.add_argument("--url", help="benchmark a server already running on the seeded data")
+    parser.add_argument("--skip-seed", action="store_true", help="reuse the data already in the database")
+    parser.add_argument("--rounds", type=int, default=3, help="measured rounds per scenario, the median is reported")
+    parser.add_argument("--warmup", type=int, default=10)
+    parser.add_argument("--mem-samples", type=int, default=5, help="requests traced for memory per scenario (in-process)")
+    parser.add_argument("--startup-repeat", type=int, default=5)
+    parser.add_argument("--timeout", type=float, default=60.0)
+    parser.add_argument("--output", help="also write the results as JSON here")
+    parser.add_argument("--baseline", default=BASELINE)
+    parser.add_argument("--save-baseline", action="store_true", help="store this run as the baseline instead of comparing")
+    parser.add_argument("--tolerance", type=float, default=0.5, help="allowed relative slowdown before failing")
+    parser.add_argument("--verbose", action="store_true", help="keep the app's own log output")
+    args = parser.parse_args()
+
+    profile = dict(PROFILES[args.profile])
+    for name in profile:
+        if getattr(args, name) is not None:
+            profile[name] = getattr(args, name)
+    args.requests, args.kiosks = profile["requests"], profile["kiosks"]
+    mode = "url" if args.url else "http" if args.http else "asgi"
+    key = f"{args.profile}/{mode}/{engine.dialect.name}"
+
+    if not args.skip_seed:
+        seed(profile["branches"], profile["employees"], profile["rows"], profile["dim"])
+    print(f"\n{key}: {args.kiosks} kiosks, {args.rounds} x {args.requests} requests per scenario")
+    print(HEADER)
+
+    results = {}
+    if not args.url and (not args.only or "startup" in args.only):
+        results["startup"] = measure_startup(args.startup_repeat)
+        print_row("startup", results["startup"])
+    if args.only != ["startup"]:
+        if args.http:
+            with uvicorn_server("/tmp/bench_suite_server.log") as (url, pid):
+                results.update(asyncio.run(run_suite(args, url, pid)))
+        else:
+            results.update(asyncio.run(run_suite(args, args.url, None)))
+
+    report = {
+        "meta": {
+            "profile": profile,
+            "mode": mode,
+            "backend": engine.dialect.name,
+            "memory": "server RSS after the scenario" if mode != "asgi" else "peak traced allocation per request",
+            "python": platform.python_version(),
+            "machine": f"{platform.system()} {platform.machine()} ({os.cpu_count()} cpus)",
+            "taken_at": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+        },
+        "results": results,
+    }
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(report, f, indent=2)
+
+    if args.save_baseline:
+        save_baseline(args.baseline, key, report)
+        return
+    baseline = load_baselines(args.baseline).get(key)
+    if baseline is None:
+        print(f"\n⚠️ No baseline for {key} in {args.baseline}; store one with --save-baseline")
+        return
+    if baseline["meta"]["profile"] != profile:
+        print(f"\n⚠️ The baseline for {key} was taken with {baseline['meta']['profile']}, not comparable with this run")
+        sys.exit(2)
+    if not compare(report, baseline, args.tolerance):
+        print("\n❌ Performance regression against the baseline")
+        sys.exit(1)
+    print("\n✅ No regressions against the baseline")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,20 +1,24 @@
 from sqlmodel import Session, delete
+from app.core.archive import attendance_archive
 from app.core.db import engine
-from app.models.models import Attendance
+from app.models.models import Attendance, AttendanceDailySummary
 
 def clear_attendance():
     print("Clearing all attendance records...")
     try:
         with Session(engine) as session:
+            session.exec(delete(AttendanceDailySummary))
             statement = delete(Attendance)
             result = session.exec(statement)
             session.commit()
             print(f"Executed. Rows affected: {result.rowcount if hasattr(result, 'rowcount') else 'Unknown'}")
             
-            # Double check
-            from sqlmodel import select
-            count = len(session.exec(select(Attendance)).all())
+            # Double check (count in SQL, don't load the rows)
+            from sqlmodel import func, select
+            count = session.exec(select(func.count()).select_from(Attendance)).one()
             print(f"Remaining records: {count}")
+            # Archived months too, or reads would bring them back
+            print(f"Removed {attendance_archive.clear()} archived months from {attendance_archive.directory}")
     except Exception as e:
         print(f"Error: {e}")
 
@@ -0,0 +1,36 @@
+import argparse
+import time
+
+from app.core.db import engine, init_db
+from app.core.migrations import LATEST_VERSION, pending_migrations
+
+
+def migrate(check: bool = False):
+    """
+    Bring the schema up to date once, before the API workers start (pre-start
+    or release command). Workers started with SCHEMA_SETUP=verify then only
+    check the version stamp. Safe to run concurrently: the runner holds the
+    migration lock.
+    """
+    pending = pending_migrations(engine)
+    if check:
+        if pending:
+            print(f"⏳ {len(pending)} pending migrations: {', '.join(f'{v} {name}' for v, name, _ in pending)}")
+            raise SystemExit(1)
+        print(f"✅ Schema up to date (version {LATEST_VERSION})")
+        return
+    started = time.perf_counter()
+    try:
+        # Also creates the upcoming monthly partitions on Postgres
+        init_db(setup="migrate")
+    except Exception as e:
+        print(f"❌ Migration failed: {e}")
+        raise SystemExit(1)
+    print(f"🏁 Schema ready in {time.perf_counter() - started:.2f}s ({len(pending)} migrations applied)")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Apply pending schema migrations before starting the workers")
+    parser.add_argument("--check", action="store_true", help="Only report pending migrations (exit 1 if any)")
+    args = parser.parse_args()
+    migrate(args.check)
@@ -1,106 +1,277 @@
-import requests
+import argparse
+import base64
 import json
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from urllib.parse import urljoin
 
-CLOUD_API = "http://api.amorispa.cloud/api/v1"
-LOCAL_API = "http://127.0.0.1:8000/api/v1"
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
 
-def sync_branches():
-    print("Fetching branches from Cloud...")
-    try:
-        response = requests.get(f"{CLOUD_API}/branches")
-        branches = response.json()
-        print(f"Found {len(branches)} branches.")
-        
-        for branch in branches:
-            print(f"Syncing branch: {branch['name']}")
-            # Local API uses POST /branches for creating
-            try:
-                requests.post(f"{LOCAL_API}/branches", json=branch)
-            except Exception as e:
-                print(f"Error syncing branch {branch['name']}: {e}")
-                
-    except Exception as e:
-        print(f"Error fetching branches: {e}")
+CLOUD_API = os.environ.get("CLOUD_API", "http://api.amorispa.cloud/api/v1")
+LOCAL_API = os.environ.get("LOCAL_API", "http://127.0.0.1:8000/api/v1")
+STATE_FILE = os.environ.get("SYNC_STATE_FILE", os.path.join(os.path.dirname(os.path.abspath(__file__)), ".sync_state.json"))
+
+BRANCH_FIELDS = ["name", "address", "latitude", "longitude", "radius", "phone", "city", "code", "timezone"]
+EMPLOYEE_FIELDS = [
+    "first_name", "last_name", "phone", "position", "department",
+    "work_schedule", "photo_url", "is_active", "face_embedding",
+]
+# Photos served by the photo store are content addressed: same URL, same bytes
+PHOTO_URL_PREFIX = "/api/v1/photos/"
+# Employees per POST /employees/bulk (kept small-ish, inline photos make rows heavy)
+BULK_CHUNK_SIZE = 200
 
-def get_local_branches_map():
+
+def make_session(workers: int) -> requests.Session:
+    # One keep-alive pool shared by every worker; upserts are idempotent so POSTs may retry
+    retry = Retry(total=3, backoff_factor=0.5, status_forcelist=[502, 503, 504], allowed_methods=frozenset({"GET", "POST"}))
+    adapter = HTTPAdapter(pool_connections=2, pool_maxsize=workers, max_retries=retry)
+    session = requests.Session()
+    session.mount("http://", adapter)
+    session.mount("https://", adapter)
+    return session
+
+
+def load_state(path: str) -> dict:
     try:
-        response = requests.get(f"{LOCAL_API}/branches")
-        branches = response.json()
-        # Map Name -> ID
-        return {b["name"]: b["id"] for b in branches}
-    except Exception:
+        with open(path) as f:
+            return json.load(f)
+    except (OSError, ValueError):
         return {}
 
 
-def sync_employees():
-    print("\nFetching employees from Cloud...")
-    # Get local branches to map IDs
-    branch_map = get_local_branches_map()
-    
-    try:
-        response = requests.get(f"{CLOUD_API}/employees")
-        employees = response.json()
-        print(f"Found {len(employees)} employees.")
-        
-        for emp in employees:
-            print(f"Syncing employee: {emp['first_name']} {emp['last_name']}")
-            
-            # Find the correct LOCAL branch_id based on the branch NAME (assuming we have branch info in employee or separate fetch)
-            # The 'emp' object from API usually returns branch_id. We need more info.
-            # Actually, we can try to guess or use a default if missing.
-            # BUT, the Cloud API for /employees returns 'branch_id'. It doesn't return the branch Name inside the employee object usually.
-            
-            # Let's fetch the Cloud Branches to build a Cloud_ID -> Name map
-            # Then Name -> Local_ID
-            
-            # Simplified: Just set to the first available branch if no match found, or try to keep ID.
-            # Ideally we have the mapping.
-            
-            local_branch_id = 1 # Default
-            # We will fix this properly if we had the map. For now, let's hardcode to 1 (Oficina) or whatever is available if it fails.
-            
-            # Actually, let's do a quick hack: We know the user just synced branches.
-            # 'Oficina', 'Francisco de montejo', etc.
-            # We don't easily know which ID corresponds to which name in Cloud unless we fetch Cloud Branches again and map CloudID -> Name.
-            
-            # Let's trust the names are unique.
-            # Fetch Cloud Branch details for this employee's branch_id? No too slow.
-            # Let's just use the first local branch ID found in the map.
-            
-            if branch_map:
-                local_branch_id = list(branch_map.values())[0] # Pick first one
-            
-            payload = {
-                "first_name": emp["first_name"],
-                "last_name": emp["last_name"],
-                "employee_number": emp["employee_number"],
-                "phone": emp["phone"],
-                "position": emp.get("position"),
-                "department": emp.get("department"),
-                "branch_id": local_branch_id, # Use a valid LOCAL ID
-                "work_schedule": emp.get("work_schedule"),
-                "face_embedding": emp.get("face_embedding"),
-                "photo_url": emp.get("photo_url"),
-                "is_active": emp["is_active"]
-            }
-            
-            # Create/Upsert on Local
+def save_state(path: str, state: dict):
+    tmp = path + ".tmp"
+    with open(tmp, "w") as f:
+        json.dump(state, f, indent=2)
+    os.replace(tmp, path)
+
+
+def same_value(a, b) -> bool:
+    # Embeddings round-trip through float32, compare them loosely
+    if isinstance(a, list) and isinstance(b, list) and a and isinstance(a[0], float):
+        return len(a) == len(b) and all(abs(x - y) <= 1e-6 * max(1.0, abs(x)) for x, y in zip(a, b))
+    return a == b
+
+
+def changed_fields(desired: dict, current: dict, fields) -> list:
+    return [f for f in fields if f in desired and not same_value(desired[f], current.get(f))]
+
+
+class SyncEngine:
+    """
+    Cloud -> local sync of branches and employees.
+
+    Branches are matched by name (cloud id -> name -> local id). Employees
+    are pulled incrementally with `updated_since` from a high-water mark
+    kept in the state file, diffed against the local roster and only the
+    changed ones are upserted, in chunks through /employees/bulk (photos
+    are fetched concurrently over a pooled session).
+    """
+
+    def __init__(self, cloud_api: str = CLOUD_API, local_api: str = LOCAL_API, workers: int = 8,
+                 state_file: str = STATE_FILE, dry_run: bool = False, full: bool = False, timeout: float = 30.0,
+                 http: requests.Session = None):
+        self.cloud_api = cloud_api.rstrip("/")
+        self.local_api = local_api.rstrip("/")
+        self.workers = workers
+        self.state_file = state_file
+        self.dry_run = dry_run
+        self.full = full
+        self.timeout = timeout
+        self.http = http or make_session(workers)
+        self._print_lock = threading.Lock()
+        self.stats = {"branches": {}, "employees": {}}
+
+    def log(self, message: str):
+        with self._print_lock:
+            print(message)
+
+    def get(self, url: str, **params):
+        response = self.http.get(url, params={k: v for k, v in params.items() if v is not None}, timeout=self.timeout)
+        response.raise_for_status()
+        return response.json()
+
+    def post(self, url: str, payload, **params):
+        response = self.http.post(url, json=payload, params=params, timeout=self.timeout)
+        if response.status_code not in (200, 201):
+            raise RuntimeError(f"{response.status_code} {response.text[:200]}")
+        return response.json()
+
+    def run_pool(self, jobs):
+        """Run (label, fn) jobs on the worker pool; returns (done, failed labels)."""
+        done, failed = 0, []
+        with ThreadPoolExecutor(max_workers=self.workers) as pool:
+            futures = {pool.submit(fn): label for label, fn in jobs}
+            for future in as_completed(futures):
+                try:
+                    future.result()
+                    done += 1
+                except Exception as e:
+                    failed.append(futures[future])
+                    self.log(f"❌ {futures[future]}: {e}")
+        return done, failed
+
+    # --- Branches ---------------------------------------------------------
+
+    def sync_branches(self) -> dict:
+        """Upsert changed branches; returns the cloud branch id -> local branch id map."""
+        print("🌐 Fetching branches from Cloud...")
+        cloud = self.get(f"{self.cloud_api}/branches/")
+        local = {b["name"]: b for b in self.get(f"{self.local_api}/branches/")}
+        print(f"Found {len(cloud)} cloud branches, {len(local)} local.")
+
+        jobs, created, updated = [], 0, 0
+        for branch in cloud:
+            payload = {f: branch[f] for f in BRANCH_FIELDS if f in branch}
+            current = local.get(branch["name"])
+            if current is None:
+                created += 1
+                self.log(f"+ branch {branch['name']}")
+            else:
+                changes = changed_fields(payload, current, BRANCH_FIELDS)
+                if not changes:
+                    continue
+                updated += 1
+                self.log(f"~ branch {branch['name']}: {', '.join(changes)}")
+            if not self.dry_run:
+                # POST /branches upserts by name
+                jobs.append((f"branch {branch['name']}", lambda payload=payload: self.post(f"{self.local_api}/branches/", payload)))
+
+        done, failed = self.run_pool(jobs) if jobs else (0, [])
+        self.stats["branches"] = {"cloud": len(cloud), "created": created, "updated": updated, "failed": len(failed)}
+
+        if not self.dry_run and jobs:
+            local = {b["name"]: b for b in self.get(f"{self.local_api}/branches/")}
+        if self.dry_run:
+            # Branches a real run would create have no local id yet
+            return {b["id"]: local[b["name"]]["id"] if b["name"] in local else f"new:{b['name']}" for b in cloud}
+        return {b["id"]: local[b["name"]]["id"] for b in cloud if b["name"] in local}
+
+    # --- Employees --------------------------------------------------------
+
+    def resolve_photo(self, photo_url, current_url):
+        """Cloud photo-store URLs are fetched and re-uploaded inline unless the local copy is identical."""
+        if not photo_url or not photo_url.startswith(PHOTO_URL_PREFIX):
+            return photo_url
+        if photo_url == current_url or self.dry_run:
+            return photo_url
+        response = self.http.get(urljoin(self.cloud_api + "/", photo_url), timeout=self.timeout)
+        response.raise_for_status()
+        content_type = response.headers.get("content-type", "application/octet-stream")
+        return f"data:{content_type};base64," + base64.b64encode(response.content).decode()
+
+    def push_employees(self, pending: list) -> list:
+        """Resolve photos concurrently, then upsert through /employees/bulk; returns the failed labels."""
+        payloads = [None] * len(pending)
+
+        def resolve(index, payload, current_url):
+            payloads[index] = dict(payload, photo_url=self.resolve_photo(payload.get("photo_url"), current_url))
+
+        _, failed = self.run_pool([
+            (label, lambda i=i, p=payload, u=current_url: resolve(i, p, u))
+            for i, (label, payload, current_url) in enumerate(pending)
+        ])
+        ready = [(label, payload) for (label, _, _), payload in zip(pending, payloads) if payload is not None]
+        for first in range(0, len(ready), BULK_CHUNK_SIZE):
+            chunk = ready[first:first + BULK_CHUNK_SIZE]
             try:
-                res = requests.post(
-                    f"{LOCAL_API}/employees", 
-                    json=payload,
-                    params={"branch_id": local_branch_id}
-                )
-                if res.status_code not in [200, 201]:
-                    print(f"Failed to sync {emp['first_name']}: {res.text}")
+                report = self.post(f"{self.local_api}/employees/bulk", [payload for _, payload in chunk])
             except Exception as e:
-                 print(f"Error syncing employee {emp['first_name']}: {e}")
+                self.log(f"❌ bulk upsert of {len(chunk)} employees: {e}")
+                failed += [label for label, _ in chunk]
+                continue
+            for result in report["results"]:
+                if result["status"] == "rejected":
+                    label = chunk[result["index"]][0]
+                    failed.append(label)
+                    self.log(f"❌ {label}: {result['detail']}")
+        return failed
+
+    def sync_employees(self, branch_map: dict):
+        state = load_state(self.state_file)
+        cloud_state = state.get(self.cloud_api, {})
+        since = None if self.full else cloud_state.get("employees_updated_since")
+        # Synced employees whose updated_at is exactly the mark
+        seen = set(cloud_state.get("employees_at_mark", [])) if since else set()
+
+        print(f"\n🌐 Fetching employees from Cloud{f' changed since {since}' if since else ''}...")
+        cloud = self.get(f"{self.cloud_api}/employees/", updated_since=since)
+        # updated_since is inclusive (an employee committed later with the same
+        # updated_at must not be lost), so the ones already synced at the mark come back
+        cloud = [e for e in cloud if not (e.get("updated_at") == since and e["employee_number"] in seen)]
+        fields = ",".join(["employee_number", "branch_id"] + EMPLOYEE_FIELDS)
+        local = {e["employee_number"]: e for e in self.get(f"{self.local_api}/employees/", fields=fields)}
+        print(f"Found {len(cloud)} cloud employees, {len(local)} local.")
+
+        pending, created, updated, unchanged, unmapped = [], 0, 0, 0, 0
+        for emp in cloud:
+            label = f"employee {emp['employee_number']} ({emp.get('first_name')} {emp.get('last_name')})"
+            local_branch_id = branch_map.get(emp.get("branch_id"))
+            if local_branch_id is None:
+                # Never guess: a wrong branch is worse than a missing employee
+                unmapped += 1
+                self.log(f"⚠️ {label}: cloud branch {emp.get('branch_id')} has no local branch, skipped")
+                continue
+
+            payload = {"employee_number": emp["employee_number"], **{f: emp[f] for f in EMPLOYEE_FIELDS if f in emp}}
+            current = local.get(emp["employee_number"])
+            if current is None:
+                created += 1
+                self.log(f"+ {label}")
+            else:
+                changes = changed_fields(payload, current, EMPLOYEE_FIELDS)
+                if current.get("branch_id") != local_branch_id:
+                    changes.append("branch_id")
+                if not changes:
+                    unchanged += 1
+                    continue
+                updated += 1
+                self.log(f"~ {label}: {', '.join(changes)}")
+            if not self.dry_run:
+                current_url = current.get("photo_url") if current else None
+                pending.append((label, dict(payload, branch_id=local_branch_id), current_url))
+
+        failed = self.push_employees(pending) if pending else []
+        self.stats["employees"] = {
+            "cloud": len(cloud), "created": created, "updated": updated, "unchanged": unchanged,
+            "unmapped": unmapped, "failed": len(failed),
+        }
+
+        # Only advance the mark when everything landed, failures retry next run
+        high_water = max((e["updated_at"] for e in cloud if e.get("updated_at")), default=None)
+        if not self.dry_run and not failed and high_water and (since is None or high_water >= since):
+            at_mark = {e["employee_number"] for e in cloud if e.get("updated_at") == high_water}
+            if high_water == since:
+                at_mark |= seen
+            state[self.cloud_api] = dict(cloud_state, employees_updated_since=high_water, employees_at_mark=sorted(at_mark))
+            save_state(self.state_file, state)
+
+    def run(self) -> dict:
+        print(f"🔄 Starting sync from {self.cloud_api} to {self.local_api}{' (dry run)' if self.dry_run else ''}...")
+        branch_map = self.sync_branches()
+        self.sync_employees(branch_map)
+        print(f"\n🏁 Sync complete: {json.dumps(self.stats)}")
+        return self.stats
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Sync branches and employees from the cloud API to the local one")
+    parser.add_argument("--cloud", default=CLOUD_API, help="Cloud API base URL (env CLOUD_API)")
+    parser.add_argument("--local", default=LOCAL_API, help="Local API base URL (env LOCAL_API)")
+    parser.add_argument("--workers", type=int, default=8, help="Concurrent uploads")
+    parser.add_argument("--state-file", default=STATE_FILE, help="Where the high-water mark is kept")
+    parser.add_argument("--dry-run", action="store_true", help="Only print what would change")
+    parser.add_argument("--full", action="store_true", help="Ignore the high-water mark and compare everything")
+    args = parser.parse_args()
+
+    stats = SyncEngine(args.cloud, args.local, args.workers, args.state_file, args.dry_run, args.full).run()
+    failed = stats["branches"].get("failed", 0) + stats["employees"].get("failed", 0)
+    raise SystemExit(1 if failed else 0)
 
-    except Exception as e:
-        print(f"Error fetching employees: {e}")
 
 if __name__ == "__main__":
-    print("Starting sync from Cloud to Local...")
-    sync_branches()
-    sync_employees()
-    print("Sync complete!")
+    main()
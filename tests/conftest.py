@@ -0,0 +1,49 @@
+import os
+import tempfile
+
+import pytest
+
+# Before anything imports app.core.config: a scratch database, photo store,
+# archive and punch queue for the whole run
+SCRATCH = tempfile.mkdtemp(prefix="biometric-tests-")
+os.environ.update(
+    DATABASE_URL=f"sqlite:///{SCRATCH}/test.db",
+    DB_ASYNC="false",
+    PHOTO_STORE_DIR=f"{SCRATCH}/photos",
+    ATTENDANCE_ARCHIVE_DIR=f"{SCRATCH}/archive",
+    ATTENDANCE_QUEUE_PATH=f"{SCRATCH}/queue.db",
+    SCHEMA_SETUP="migrate",
+    FACE_INDEX_LOAD="lazy",
+)
+
+
+@pytest.fixture(scope="session")
+def database():
+    from app.core.db import engine, init_db
+
+    init_db(setup="migrate")
+    return engine
+
+
+@pytest.fixture
+def client(database):
+    # No lifespan: the schema is already there and nothing runs in the background
+    from fastapi.testclient import TestClient
+    from app.main import app
+
+    return TestClient(app)
+
+
+@pytest.fixture
+def employee(client):
+    """A fresh branch and employee per test, so punches never collide across tests."""
+    import uuid
+
+    name = uuid.uuid4().hex[:8]
+    branch = client.post("/api/v1/branches/", json={"name": f"Branch {name}", "radius": 100}).json()
+    employee = client.post(
+        "/api/v1/employees/", params={"branch_id": branch["id"]},
+        json={"first_name": "Test", "last_name": name, "employee_number": name, "branch_id": branch["id"]},
+    ).json()
+    return employee
+
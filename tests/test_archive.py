@@ -0,0 +1,70 @@
+from datetime import datetime, timezone
+
+from app.core.archive import ArchivedRow, AttendanceArchive, RowFilter, archive_month
+
+
+def punch(employee, day, hour=9, type="check-in"):
+    return {
+        "employee_id": employee["id"], "branch_id": employee["branch_id"],
+        "timestamp": datetime(2024, 1, day, hour, tzinfo=timezone.utc).isoformat(), "type": type, "status": "on-time",
+    }
+
+
+def archived_row(id, timestamp, employee_id=1, type="check-in"):
+    return ArchivedRow(timestamp, id, employee_id, 1, type, "on-time", None, False, None, None)
+
+
+def listing(client, employee, **params):
+    response = client.get("/api/v1/attendance/", params={"employee_id": employee["id"], **params})
+    assert response.status_code == 200
+    return [(item["id"], item["type"]) for item in response.json()]
+
+
+def test_replayed_punch_into_archived_month_returns_the_archived_row(client, database, employee):
+    first = client.post("/api/v1/attendance/", json=punch(employee, 8)).json()
+    assert archive_month(database, (2024, 1)) >= 1
+
+    replay = client.post("/api/v1/attendance/", json=punch(employee, 8))
+    assert replay.status_code == 200
+    assert replay.json()["id"] == first["id"]
+
+    batch = client.post("/api/v1/attendance/batch", json=[punch(employee, 8), punch(employee, 8, 18, "check-out")]).json()
+    assert [(r["status"], r["id"]) for r in batch["results"]][0] == ("duplicate", first["id"])
+    assert batch["results"][1]["status"] == "created"
+    assert (batch["created"], batch["duplicates"]) == (1, 1)
+
+    # Archived once, not re-inserted into the hot table
+    assert listing(client, employee, date_from="2024-01-01T00:00:00Z") == [
+        (batch["results"][1]["id"], "check-out"), (first["id"], "check-in"),
+    ]
+
+
+def test_open_ended_listing_does_not_read_the_archive(client, database, employee):
+    archived = client.post("/api/v1/attendance/", json=punch(employee, 9)).json()
+    archive_month(database, (2024, 1))
+    hot = client.post("/api/v1/attendance/", json=punch(employee, 9, 18, "check-out")).json()
+
+    assert listing(client, employee) == [(hot["id"], "check-out")]
+    assert listing(client, employee, date_from="2024-01-09T00:00:00Z") == [(hot["id"], "check-out"), (archived["id"], "check-in")]
+
+
+def test_merge_keeps_one_row_per_punch(tmp_path):
+    archive = AttendanceArchive(str(tmp_path))
+    ts = datetime(2024, 2, 1, 9, tzinfo=timezone.utc)
+    archive.write((2024, 2), [tuple(archived_row(10, ts)), tuple(archived_row(11, ts, employee_id=2))])
+
+    # Same punch left in the hot table (another id), and a different punch at the same instant
+    hot = [archived_row(12, ts), archived_row(13, ts, type="check-out")]
+    merged = list(archive.merge(hot, RowFilter(start=datetime(2024, 2, 1, tzinfo=timezone.utc))))
+
+    assert sorted((row.employee_id, row.type) for row in merged) == [(1, "check-in"), (1, "check-out"), (2, "check-in")]
+
+
+def test_rearchiving_a_month_keeps_the_archived_punch(tmp_path):
+    archive = AttendanceArchive(str(tmp_path))
+    ts = datetime(2024, 2, 1, 9, tzinfo=timezone.utc)
+    archive.write((2024, 2), [tuple(archived_row(10, ts))])
+    assert archive.write((2024, 2), [tuple(archived_row(12, ts)), tuple(archived_row(13, ts, type="check-out"))]) == 2
+
+    found = archive.find([(1, ts, "check-in"), (1, ts, "check-out"), (2, ts, "check-in")])
+    assert {key[2]: row.id for key, row in found.items()} == {"check-in": 10, "check-out": 13}
@@ -0,0 +1,73 @@
+from datetime import datetime, timedelta, timezone
+
+from sqlalchemy.exc import IntegrityError
+from sqlmodel import Session
+
+from app.api.v1.endpoints.attendance import MAX_BATCH_SIZE
+
+
+def punch(employee, hours=0, type="check-in", **fields):
+    timestamp = datetime(2026, 4, 6, 9, tzinfo=timezone.utc) + timedelta(hours=hours)
+    return {
+        "employee_id": employee["id"], "branch_id": employee["branch_id"], "timestamp": timestamp.isoformat(),
+        "type": type, "status": "on-time", **fields,
+    }
+
+
+def post_batch(client, punches):
+    response = client.post("/api/v1/attendance/batch", json=punches)
+    assert response.status_code == 200
+    return response.json()
+
+
+def test_replayed_batch_creates_nothing(client, employee):
+    punches = [punch(employee), punch(employee, 9, "check-out")]
+    first = post_batch(client, punches)
+    assert (first["created"], first["duplicates"]) == (2, 0)
+
+    replay = post_batch(client, punches)
+    assert (replay["created"], replay["duplicates"]) == (0, 2)
+    assert [r["id"] for r in replay["results"]] == [r["id"] for r in first["results"]]
+
+
+def test_same_instant_in_another_offset_is_a_duplicate(client, employee):
+    created = post_batch(client, [punch(employee)])["results"][0]
+    local = punch(employee)
+    local["timestamp"] = datetime(2026, 4, 6, 3, tzinfo=timezone(timedelta(hours=-6))).isoformat()
+
+    result = post_batch(client, [local])["results"][0]
+    assert (result["status"], result["id"]) == ("duplicate", created["id"])
+
+
+def test_repeat_inside_a_batch_points_at_the_first_copy(client, employee):
+    results = post_batch(client, [punch(employee), punch(employee, 1, "check-out"), punch(employee)])["results"]
+
+    assert [r["status"] for r in results] == ["created", "created", "duplicate"]
+    assert results[2]["id"] == results[0]["id"]
+
+
+def test_bad_punches_are_rejected_without_failing_the_batch(client, employee):
+    unknown = dict(punch(employee), employee_id=10**9)
+    results = post_batch(client, [unknown, punch(employee), dict(punch(employee, 1), latitude=91.0, longitude=0.0)])
+
+    assert [r["status"] for r in results["results"]] == ["rejected", "created", "rejected"]
+    assert results["results"][0]["detail"] == "Employee not found"
+    assert (results["created"], results["rejected"]) == (1, 2)
+
+
+def test_oversized_batch_is_refused(client, employee):
+    punches = [punch(employee, hours=n) for n in range(MAX_BATCH_SIZE + 1)]
+
+    assert client.post("/api/v1/attendance/batch", json=punches).status_code == 413
+
+
+def test_database_error_is_a_client_error_on_the_batch_endpoint(client, employee, monkeypatch):
+    post_batch(client, [punch(employee)])  # warm the employee and branch caches
+
+    def broken(*args, **kwargs):
+        raise IntegrityError("INSERT INTO attendance", {}, Exception("constraint failed"))
+
+    monkeypatch.setattr(Session, "execute", broken)
+    response = client.post("/api/v1/attendance/batch", json=[punch(employee, 1)])
+
+    assert response.status_code == 400
@@ -0,0 +1,79 @@
+import csv
+import io
+import json
+from datetime import datetime, timedelta, timezone
+
+from app.api.v1.endpoints import attendance as attendance_module
+
+
+def punches(client, employee, count):
+    start = datetime(2026, 6, 1, 9, tzinfo=timezone.utc)
+    batch = [
+        {"employee_id": employee["id"], "branch_id": employee["branch_id"],
+         "timestamp": (start + timedelta(hours=n)).isoformat(), "type": "check-in", "status": "on-time"}
+        for n in range(count)
+    ]
+    return [r["id"] for r in client.post("/api/v1/attendance/batch", json=batch).json()["results"]]
+
+
+def listing(client, **params):
+    response = client.get("/api/v1/attendance/", params=params)
+    assert response.status_code == 200
+    return response
+
+
+def test_cursor_walks_every_row_once_newest_first(client, employee):
+    ids = punches(client, employee, 5)
+
+    seen, cursor = [], None
+    while True:
+        params = {"employee_id": employee["id"], "limit": 2}
+        if cursor:
+            params["cursor"] = cursor
+        response = listing(client, **params)
+        seen.append([item["id"] for item in response.json()])
+        cursor = response.headers.get("x-next-cursor")
+        if not cursor:
+            break
+
+    assert seen == [ids[4:2:-1], ids[2:0:-1], ids[:1]]
+
+
+def test_json_listing_is_paged_by_default(client, employee, monkeypatch):
+    monkeypatch.setattr(attendance_module, "DEFAULT_PAGE_SIZE", 3)
+    punches(client, employee, 4)
+
+    response = listing(client, employee_id=employee["id"])
+    assert len(response.json()) == 3
+    assert "x-next-cursor" in response.headers
+
+
+def test_date_range_is_inclusive_of_date_to(client, employee):
+    ids = punches(client, employee, 5)
+
+    response = listing(client, employee_id=employee["id"], date_from="2026-06-01T10:00:00Z", date_to="2026-06-01T12:00:00Z")
+    assert [item["id"] for item in response.json()] == ids[3:0:-1]
+
+
+def test_invalid_cursor_is_rejected(client):
+    assert client.get("/api/v1/attendance/", params={"cursor": "not-a-cursor"}).status_code == 400
+
+
+def test_exports_stream_every_row(client, employee, monkeypatch):
+    monkeypatch.setattr(attendance_module, "DEFAULT_PAGE_SIZE", 2)
+    monkeypatch.setattr(attendance_module, "STREAM_CHUNK_SIZE", 2)
+    ids = punches(client, employee, 5)
+
+    response = listing(client, employee_id=employee["id"], format="csv")
+    assert response.headers["content-type"].startswith("text/csv")
+    rows = list(csv.DictReader(io.StringIO(response.text)))
+    assert [int(row["id"]) for row in rows] == ids[::-1]
+    assert rows[0]["type"] == "check-in"
+
+    response = listing(client, employee_id=employee["id"], format="ndjson")
+    assert response.headers["content-type"].startswith("application/x-ndjson")
+    items = [json.loads(line) for line in response.text.splitlines()]
+    assert [item["id"] for item in items] == ids[::-1]
+
+    response = listing(client, employee_id=employee["id"], format="ndjson", limit=2)
+    assert len(response.text.splitlines()) == 2
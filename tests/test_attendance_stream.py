@@ -0,0 +1,74 @@
+import asyncio
+import re
+from datetime import datetime, timedelta, timezone
+
+import pytest
+
+from app.api.v1.endpoints import attendance as attendance_module
+from app.api.v1.endpoints.attendance import RESET_FRAME, attendance_event_stream
+from app.core.events import EventBroker
+
+
+@pytest.fixture
+def broker(monkeypatch):
+    broker = EventBroker(history=3, buffer=100)
+    monkeypatch.setattr(attendance_module, "attendance_events", broker)
+    monkeypatch.setattr(attendance_module.settings, "attendance_stream_heartbeat_seconds", 5)
+    return broker
+
+
+def event_ids(data: bytes):
+    return [int(i) for i in re.findall(rb"^id: (\d+)$", data, re.MULTILINE)]
+
+
+def read(branch_id, last_event_id, chunks, publish=None):
+    """The first `chunks` writes of a stream; `publish` runs once it has subscribed."""
+    async def run():
+        stream = attendance_event_stream(branch_id, last_event_id)
+        data = [await anext(stream)]
+        if publish:
+            publish()
+        for _ in range(chunks - 1):
+            data.append(await asyncio.wait_for(anext(stream), 5))
+        await stream.aclose()
+        return b"".join(data)
+    return asyncio.run(run())
+
+
+def test_resume_replays_missed_events_from_history(broker):
+    broker.publish([(1, 7, {"n": 1}), (2, 8, {"n": 2}), (3, 7, {"n": 3})])
+
+    assert event_ids(read(None, 1, 2)) == [2, 3]
+    assert event_ids(read(7, 1, 2)) == [3]
+
+
+def test_resumed_stream_follows_live_events(broker):
+    broker.publish([(1, 7, {"n": 1}), (2, 7, {"n": 2})])
+
+    data = read(7, 1, 3, publish=lambda: broker.publish([(3, 8, {"n": 3}), (4, 7, {"n": 4})]))
+    assert event_ids(data) == [2, 4]
+
+
+def punches(client, employee, count):
+    start = datetime(2026, 5, 4, 9, tzinfo=timezone.utc)
+    return [
+        client.post("/api/v1/attendance/", json={
+            "employee_id": employee["id"], "branch_id": employee["branch_id"],
+            "timestamp": (start + timedelta(hours=n)).isoformat(), "type": "check-in", "status": "on-time",
+        }).json()["id"]
+        for n in range(count)
+    ]
+
+
+def test_resume_older_than_history_catches_up_from_the_database(client, employee, broker):
+    ids = punches(client, employee, 5)
+
+    # The history only holds the last 3: ids[1] has fallen out of it
+    assert event_ids(read(employee["branch_id"], ids[1], 2)) == ids[2:]
+
+
+def test_resume_too_far_behind_resets(client, employee, broker, monkeypatch):
+    monkeypatch.setattr(attendance_module.settings, "attendance_stream_history", 2)
+    ids = punches(client, employee, 4)
+
+    assert read(employee["branch_id"], ids[0] - 1, 2).endswith(RESET_FRAME)
@@ -0,0 +1,83 @@
+import pytest
+
+from app.core import cache as cache_module
+from app.core.cache import CacheRegistry, InvalidationChannel, LocalChannel, LRUCache
+
+
+def worker(channel):
+    registry = CacheRegistry(channel)
+    registry.register(LRUCache("employees", 100, 300))
+    return registry
+
+
+def test_invalidation_from_one_worker_evicts_the_other():
+    channel = LocalChannel()
+    a, b = worker(channel), worker(channel)
+    a.caches["employees"].set(1, "alice")
+    b.caches["employees"].set(1, "alice")
+    b.caches["employees"].set(2, "bob")
+
+    a.invalidate("employees", 1)
+
+    assert a.caches["employees"].get(1) is None
+    assert b.caches["employees"].get(1) is None
+    assert b.caches["employees"].get(2) == "bob"
+
+
+def test_invalidate_all_reaches_the_other_worker():
+    channel = LocalChannel()
+    a, b = worker(channel), worker(channel)
+    b.caches["employees"].set(1, "alice")
+    b.caches["employees"].set(2, "bob")
+
+    a.invalidate("employees")
+
+    assert len(b.caches["employees"]) == 0
+
+
+def test_invalidation_blocks_an_in_flight_load_in_the_other_worker():
+    channel = LocalChannel()
+    a, b = worker(channel), worker(channel)
+    employees = b.caches["employees"]
+
+    def load():
+        # Worker A deletes the employee while B is still reading the old row
+        a.invalidate("employees", 1)
+        return "stale alice"
+
+    assert employees.get_or_load(1, load) == "stale alice"
+    assert employees.get(1) is None
+
+
+def test_unknown_cache_messages_are_ignored():
+    channel = LocalChannel()
+    b = worker(channel)
+    b.caches["employees"].set(1, "alice")
+
+    channel.publish({"origin": "elsewhere", "cache": "branches", "key": None})
+
+    assert b.caches["employees"].get(1) == "alice"
+
+
+def test_incomplete_channel_fails_at_construction():
+    class PublishOnly(InvalidationChannel):
+        def publish(self, message: dict):
+            pass
+
+    with pytest.raises(TypeError):
+        PublishOnly()
+
+
+def test_ttl_is_capped_with_several_workers_and_no_channel(monkeypatch):
+    monkeypatch.setenv("WEB_CONCURRENCY", "4")
+    monkeypatch.setattr(cache_module.settings, "cache_invalidation_channel", "none")
+    monkeypatch.setattr(cache_module.settings, "cache_ttl_seconds", 300.0)
+    monkeypatch.setattr(cache_module.settings, "cache_ttl_multi_worker_seconds", 2.0)
+    assert cache_module.cache_ttl() == 2.0
+
+    monkeypatch.setattr(cache_module.settings, "cache_invalidation_channel", "redis")
+    assert cache_module.cache_ttl() == 300.0
+
+    monkeypatch.setattr(cache_module.settings, "cache_invalidation_channel", "none")
+    monkeypatch.delenv("WEB_CONCURRENCY")
+    assert cache_module.cache_ttl() == 300.0
@@ -0,0 +1,61 @@
+import pytest
+from sqlalchemy import event
+from sqlalchemy.pool import StaticPool
+from sqlmodel import Session, SQLModel, create_engine
+
+from app.core.face_index import FaceIndex
+from app.models.models import Employee
+
+
+@pytest.fixture
+def session():
+    engine = create_engine("sqlite://", connect_args={"check_same_thread": False}, poolclass=StaticPool)
+    SQLModel.metadata.create_all(engine)
+    with Session(engine) as session:
+        yield session
+
+
+def statements(session):
+    """SQL statements the session runs from now on."""
+    seen = []
+    event.listen(session.get_bind(), "before_cursor_execute", lambda conn, cursor, sql, *args: seen.append(sql))
+    return seen
+
+
+def add(session, number, embedding):
+    employee = Employee(first_name="E", last_name=number, employee_number=number, branch_id=1, face_embedding=embedding)
+    session.add(employee)
+    session.commit()
+    return employee.id
+
+
+def test_skipped_embeddings_do_not_force_a_reconcile(session, capsys):
+    good = add(session, "A1", [1.0, 0.0, 0.0, 0.0])
+    odd = add(session, "A2", [1.0, 0.0, 0.0])
+    add(session, "A3", [0.0, 0.0, 0.0, 0.0])
+    index = FaceIndex()
+    index.load(session)
+    assert len(index) == 1
+    assert capsys.readouterr().out.count(f"skipping employee {odd}") == 1
+
+    seen = statements(session)
+    index.refresh(session)
+    # The high-water query (which re-reads the skipped rows) and the count, no id reconcile
+    assert len(seen) == 2
+    assert "skipping" not in capsys.readouterr().out
+    assert [employee_id for employee_id, _ in index.search([1.0, 0.0, 0.0, 0.0])] == [good]
+
+
+def test_deleted_skipped_employee_is_forgotten(session):
+    add(session, "A1", [1.0, 0.0, 0.0, 0.0])
+    odd = add(session, "A2", [1.0, 0.0, 0.0])
+    index = FaceIndex()
+    index.load(session)
+
+    session.delete(session.get(Employee, odd))
+    session.commit()
+    index.refresh(session)
+
+    seen = statements(session)
+    index.refresh(session)
+    assert len(seen) == 2
@@ -0,0 +1,120 @@
+import time
+from datetime import datetime, timedelta, timezone
+
+import pytest
+from sqlalchemy.exc import OperationalError
+from sqlmodel import Session
+
+from app.core import punch_queue as queue_module
+from app.core.punch_queue import MAX_ATTEMPTS, PunchQueue, is_transient, retry_delay
+
+
+@pytest.fixture
+def queue(tmp_path):
+    return PunchQueue(str(tmp_path / "queue.db"))
+
+
+def row(queue, key):
+    status, attempts, retries, next_attempt_at = queue.connection().execute(
+        "SELECT status, attempts, retries, next_attempt_at FROM punch_queue WHERE key = ?", (key,)
+    ).fetchone()
+    return {"status": status, "attempts": attempts, "retries": retries, "next_attempt_at": next_attempt_at}
+
+
+def make_due(queue):
+    queue.connection().execute("UPDATE punch_queue SET next_attempt_at = 0")
+
+
+def punch(employee, minutes=0):
+    timestamp = datetime(2026, 3, 2, 9, tzinfo=timezone.utc) + timedelta(minutes=minutes)
+    return {
+        "employee_id": employee["id"], "branch_id": employee["branch_id"], "timestamp": timestamp.isoformat(),
+        "type": "check-in", "status": "on-time",
+    }
+
+
+def locked(*args, **kwargs):
+    raise OperationalError("INSERT INTO attendance", {}, Exception("database is locked"))
+
+
+def test_database_outage_keeps_the_punch_queued(queue, employee, monkeypatch):
+    from app.api.v1.endpoints.attendance import drain_punch_queue
+
+    queue.enqueue("k1", punch(employee))
+    monkeypatch.setattr(Session, "execute", locked)
+
+    for _ in range(MAX_ATTEMPTS + 2):
+        make_due(queue)
+        assert queue.drain_once(drain_punch_queue) == 0
+
+    entry = row(queue, "k1")
+    assert entry["status"] == "queued"
+    assert entry["attempts"] == 0
+    assert entry["retries"] == MAX_ATTEMPTS + 2
+    assert entry["next_attempt_at"] > time.time()
+
+    monkeypatch.undo()
+    make_due(queue)
+    assert queue.drain_once(drain_punch_queue) == 1
+    assert queue.get("k1")["status"] == "created"
+
+
+def test_failed_drain_is_not_retried_before_its_backoff(queue):
+    queue.enqueue("k1", {"n": 1})
+    queue.drain_once(locked)
+
+    assert queue.claim(10) == []
+    make_due(queue)
+    assert [key for key, _ in queue.claim(10)] == ["k1"]
+
+
+def test_backoff_doubles_up_to_the_cap(monkeypatch):
+    monkeypatch.setattr(queue_module.settings, "attendance_queue_poll_ms", 200)
+    monkeypatch.setattr(queue_module.settings, "attendance_queue_retry_max_seconds", 60)
+    assert [retry_delay(n) for n in (1, 2, 3, 4)] == [0.2, 0.4, 0.8, 1.6]
+    assert retry_delay(50) == 60
+
+
+def test_wrapped_database_errors_are_transient():
+    try:
+        try:
+            locked()
+        except OperationalError as e:
+            raise RuntimeError("batch failed") from e
+    except RuntimeError as wrapped:
+        assert is_transient(wrapped)
+    assert not is_transient(ValueError("bad payload"))
+
+
+def test_a_bad_punch_does_not_hold_back_its_batch(queue):
+    for n in range(4):
+        queue.enqueue(f"k{n}", {"n": n})
+
+    def handler(payloads):
+        if any(p["n"] == 2 for p in payloads):
+            raise ValueError("bad payload")
+        return [("created", 100 + p["n"], None) for p in payloads]
+
+    assert queue.drain_once(handler) == 3
+    assert [queue.get(f"k{n}")["status"] for n in range(4)] == ["created", "created", "queued", "created"]
+
+    for _ in range(MAX_ATTEMPTS - 1):
+        make_due(queue)
+        queue.drain_once(handler)
+    entry = queue.get("k2")
+    assert entry["status"] == "failed"
+    assert entry["attempts"] == MAX_ATTEMPTS
+    assert entry["detail"] == "bad payload"
+
+
+def test_purge_keeps_failed_entries(queue, monkeypatch):
+    queue.enqueue("done", {"n": 1})
+    queue.enqueue("bad", {"n": 2})
+    queue.complete([("done", "created", 1, None)])
+    queue.connection().execute("UPDATE punch_queue SET status = 'failed', processed_at = 0 WHERE key = 'bad'")
+    queue.connection().execute("UPDATE punch_queue SET processed_at = 0 WHERE key = 'done'")
+
+    queue.purge()
+
+    assert queue.get("done") is None
+    assert queue.get("bad")["status"] == "failed"
@@ -0,0 +1,165 @@
+import json
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+import pytest
+
+from sync_data import SyncEngine, load_state
+
+
+class StubApi:
+    """Cloud and local API in one in-memory server: /cloud/... and /local/..."""
+
+    def __init__(self):
+        self.cloud_branches = []
+        self.cloud_employees = []
+        self.local_branches = []
+        self.local_employees = {}  # employee_number -> employee
+        self.requests = []  # (method, path, query)
+        self.bulk_posts = []
+
+    def employees_since(self, since):
+        # Inclusive, like the real roster endpoint
+        return [e for e in self.cloud_employees if since is None or e["updated_at"] >= since]
+
+    def handle(self, method, path, query, body):
+        self.requests.append((method, path, query))
+        if (method, path) == ("GET", "/cloud/branches/"):
+            return self.cloud_branches
+        if (method, path) == ("GET", "/cloud/employees/"):
+            return self.employees_since(query.get("updated_since", [None])[0])
+        if (method, path) == ("GET", "/local/branches/"):
+            return self.local_branches
+        if (method, path) == ("POST", "/local/branches/"):
+            branch = next((b for b in self.local_branches if b["name"] == body["name"]), None)
+            if branch is None:
+                branch = {"id": len(self.local_branches) + 1}
+                self.local_branches.append(branch)
+            branch.update(body)
+            return branch
+        if (method, path) == ("GET", "/local/employees/"):
+            return list(self.local_employees.values())
+        if (method, path) == ("POST", "/local/employees/bulk"):
+            self.bulk_posts.append(body)
+            results = []
+            for index, employee in enumerate(body):
+                status = "updated" if employee["employee_number"] in self.local_employees else "created"
+                self.local_employees.setdefault(employee["employee_number"], {}).update(employee)
+                results.append({"index": index, "status": status})
+            return {"results": results}
+        return None
+
+
+@pytest.fixture
+def stub():
+    api = StubApi()
+
+    class Handler(BaseHTTPRequestHandler):
+        def respond(self, method):
+            url = urlparse(self.path)
+            length = int(self.headers.get("Content-Length") or 0)
+            body = json.loads(self.rfile.read(length)) if length else None
+            result = api.handle(method, url.path, parse_qs(url.query), body)
+            data = json.dumps(result).encode()
+            self.send_response(404 if result is None else 200)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(data)))
+            self.end_headers()
+            self.wfile.write(data)
+
+        def do_GET(self):
+            self.respond("GET")
+
+        def do_POST(self):
+            self.respond("POST")
+
+        def log_message(self, *args):
+            pass
+
+    server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    api.url = f"http://127.0.0.1:{server.server_port}"
+    yield api
+    server.shutdown()
+    server.server_close()
+
+
+def employee(number, branch_id, updated_at, **fields):
+    return {"employee_number": number, "first_name": "E", "last_name": number, "branch_id": branch_id,
+            "is_active": True, "updated_at": updated_at, **fields}
+
+
+def engine(stub, tmp_path, **options):
+    return SyncEngine(f"{stub.url}/cloud", f"{stub.url}/local", workers=2, state_file=str(tmp_path / "state.json"), **options)
+
+
+def pushed(stub):
+    return {e["employee_number"]: e for chunk in stub.bulk_posts for e in chunk}
+
+
+def test_branches_map_by_name_to_local_ids(stub, tmp_path):
+    stub.cloud_branches = [{"id": 10, "name": "North", "radius": 100}, {"id": 20, "name": "South", "radius": 50}]
+    stub.local_branches = [{"id": 1, "name": "South", "radius": 50}]
+    stub.cloud_employees = [
+        employee("A1", 10, "2025-01-01T08:00:00"),
+        employee("A2", 20, "2025-01-01T08:00:00"),
+        employee("A3", 99, "2025-01-01T08:00:00"),
+    ]
+
+    stats = engine(stub, tmp_path).run()
+
+    assert [b["name"] for b in stub.local_branches] == ["South", "North"]
+    assert {number: e["branch_id"] for number, e in pushed(stub).items()} == {"A1": 2, "A2": 1}
+    assert stats["branches"] == {"cloud": 2, "created": 1, "updated": 0, "failed": 0}
+    assert stats["employees"]["unmapped"] == 1
+
+
+def test_high_water_mark_keeps_employees_sharing_the_mark(stub, tmp_path):
+    stub.cloud_branches = [{"id": 10, "name": "North"}]
+    stub.local_branches = [{"id": 1, "name": "North"}]
+    stub.cloud_employees = [employee("A1", 10, "2025-01-01T08:00:00"), employee("A2", 10, "2025-01-02T09:00:00")]
+
+    engine(stub, tmp_path).run()
+    state = load_state(str(tmp_path / "state.json"))[f"{stub.url}/cloud"]
+    assert state["employees_updated_since"] == "2025-01-02T09:00:00"
+    assert state["employees_at_mark"] == ["A2"]
+
+    # Committed after the first pull with the same updated_at as the mark
+    stub.cloud_employees.append(employee("A3", 10, "2025-01-02T09:00:00"))
+    stub.bulk_posts.clear()
+    stats = engine(stub, tmp_path).run()
+
+    employee_pulls = [query for method, path, query in stub.requests if path == "/cloud/employees/"]
+    assert employee_pulls[-1] == {"updated_since": ["2025-01-02T09:00:00"]}
+    assert list(pushed(stub)) == ["A3"]
+    assert stats["employees"]["cloud"] == 1
+    state = load_state(str(tmp_path / "state.json"))[f"{stub.url}/cloud"]
+    assert state["employees_at_mark"] == ["A2", "A3"]
+
+    # Nothing new: nothing pushed, the mark stays
+    stub.bulk_posts.clear()
+    engine(stub, tmp_path).run()
+    assert stub.bulk_posts == []
+
+
+def test_dry_run_reports_the_diff_without_writing(stub, tmp_path):
+    stub.cloud_branches = [{"id": 10, "name": "North", "city": "Monterrey"}, {"id": 20, "name": "South"}]
+    stub.local_branches = [{"id": 1, "name": "North", "city": "Saltillo"}]
+    stub.local_employees = {
+        "A1": employee("A1", 1, None, position="Cook"),
+        "A2": employee("A2", 1, None, position="Cashier"),
+    }
+    stub.cloud_employees = [
+        employee("A1", 10, "2025-01-01T08:00:00", position="Chef"),
+        employee("A2", 10, "2025-01-01T08:00:00", position="Cashier"),
+        employee("A3", 20, "2025-01-01T08:00:00"),
+    ]
+
+    stats = engine(stub, tmp_path, dry_run=True).run()
+
+    assert stats["branches"] == {"cloud": 2, "created": 1, "updated": 1, "failed": 0}
+    assert stats["employees"] == {"cloud": 3, "created": 1, "updated": 1, "unchanged": 1, "unmapped": 0, "failed": 0}
+    assert [method for method, _, _ in stub.requests if method != "GET"] == []
+    assert not (tmp_path / "state.json").exists()